@@ -1,12 +1,17 @@
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, request, render_template, jsonify, session, Response, stream_with_context
 import os
-import json
 import logging
 from typing import Dict, List
-from dotenv import load_dotenv
 from profile_agent import get_user_profile_via_chat
-from scheme_search_agent import search_schemes
-from scheme_display_agent import SchemeDisplayAgent, fetch_scheme_details
+from scheme_search_agent import search_schemes_for_profile
+from scheme_display_agent import SchemeDisplayAgent
+from session_store import start_session_job
+from recommendation_jobs import JobManager, JobQueueFull
+from metrics import render_prometheus, timed
+from web_common import (
+    check_api_keys, start_warmup, validate_user_profile, validate_schemes, session_store,
+    register_job_gauge, resolve_chat_action, sse_event
+)
 
 app = Flask(__name__)
 
@@ -18,77 +23,120 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-if not os.getenv("PINECONE_API_KEY") or not os.getenv("GROQ_API_KEY"):
-    logger.error("Missing PINECONE_API_KEY or GROQ_API_KEY in .env")
-    raise ValueError("Missing API keys in .env file")
-
-def validate_user_profile(profile: Dict) -> bool:
-    required_fields = ['name', 'state', 'gender', 'caste', 'occupation', 'category', 'income']
-    missing_fields = [field for field in required_fields if not profile.get(field)]
-    if missing_fields:
-        logger.error(f"Missing required fields in user profile: {missing_fields}")
-        return False
-    return True
-
-def validate_schemes(schemes: List[Dict]) -> List[Dict]:
-    valid_schemes = [
-        scheme for scheme in schemes
-        if scheme.get('metadata', {}).get('scheme_name')
-    ]
-    if len(valid_schemes) < len(schemes):
-        logger.warning(f"Filtered out {len(schemes) - len(valid_schemes)} schemes with missing scheme_name")
-    return valid_schemes
+check_api_keys()
+
+# Per-session agent state lives in web_common.session_store, keyed by this cookie
+app.secret_key = os.getenv("FLASK_SECRET_KEY") or os.urandom(32)
+
+# Recommendation jobs: bounded worker pool; submissions beyond the queue get a 503
+job_manager = JobManager(
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    queue_size=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "600"))
+)
+
+register_job_gauge(job_manager)
 
-# Global agent state
-agent_state = {
-    'schemes': [],
-    'agent': None,
-    'selected_scheme': None
-}
+def get_session_state():
+    """Return (session_id, state) for the current browser session, creating it if needed."""
+    session_id, state = session_store.get_or_create(session.get('sid'))
+    session['sid'] = session_id
+    return session_id, state
 
 @app.route('/', methods=['GET'])
 def index():
     logger.info("Rendering index page")
+    _, agent_state = get_session_state()
     return render_template('index.html', schemes=agent_state['schemes'])
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint: stage latencies, LLM calls and tokens, cache hit ratios, errors."""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def wants_json() -> bool:
+    return 'application/json' in request.headers.get('Accept', '')
+
+def run_recommendation_job(job, profile: Dict, session_id: str, agent_state: Dict) -> List[Dict]:
+    """Job body: search, then attach the display agent to the submitting session."""
+    schemes = search_schemes_for_profile(profile, os.getenv("PERSIST_RECOMMENDATIONS_PATH") or None, progress=job.update)
+    valid_schemes = validate_schemes(schemes)
+    if not valid_schemes:
+        # The previous agent was already cleared when this job was submitted
+        logger.warning("No valid schemes found")
+        return []
+    agent = SchemeDisplayAgent(valid_schemes)
+    with agent_state['lock']:
+        if agent_state.get('job_id') != job.job_id:
+            logger.info(f"Job {job.job_id} was superseded by a newer submission; not attaching its agent")
+            return valid_schemes
+        agent_state['schemes'] = valid_schemes
+        agent_state['agent'] = agent
+        agent_state['selected_scheme'] = None
+    session_store.measure(session_id)
+    logger.info(f"Agent initialized with {len(valid_schemes)} schemes for session {session_id}")
+    return valid_schemes
+
 @app.route('/submit', methods=['POST'])
 def submit_profile():
+    """Queue a recommendation job for the submitted profile and return its id right away.
+
+    JSON clients get 202 with the job id (503 when the queue is full); a plain
+    form post gets the page back, which polls the job.
+    """
+    with timed("http_submit"):
+        return _submit_profile()
+
+def _submit_profile():
     try:
         profile = request.form.to_dict()
         profile['category'] = profile.get('caste', '')  # Align category with caste
         if not validate_user_profile(profile):
             logger.error("Profile validation failed")
+            if wants_json():
+                return jsonify({'error': 'Missing required profile fields'}), 400
             return render_template('index.html', schemes=[], error="Missing required profile fields")
 
-        with open('user_details.json', 'w', encoding='utf-8') as f:
-            json.dump(profile, f, indent=4)
-        logger.info("User profile saved to user_details.json")
-
-        schemes = search_schemes('user_details.json', 'recommended_schemes2.json')
-        valid_schemes = validate_schemes(schemes)
-        if not valid_schemes:
-            logger.warning("No valid schemes found")
-            return render_template('index.html', schemes=[], error="No schemes found matching your profile")
-
-        # Update agent state
-        agent_state['schemes'] = valid_schemes
-        agent_state['agent'] = SchemeDisplayAgent(valid_schemes)
-        logger.info(f"Agent initialized with {len(valid_schemes)} schemes")
-
-        return render_template('index.html', schemes=valid_schemes)
+        session_id, agent_state = get_session_state()
+        # Held until the job is recorded as current, so it cannot attach its agent before that
+        with agent_state['lock']:
+            try:
+                job = job_manager.submit(session_id, lambda job: run_recommendation_job(job, profile, session_id, agent_state))
+            except JobQueueFull as e:
+                if wants_json():
+                    return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+                return render_template('index.html', schemes=[], error=str(e)), 503, {'Retry-After': '5'}
+            start_session_job(agent_state, job.job_id)
+
+        if wants_json():
+            return jsonify({'job_id': job.job_id, 'status': job.status, 'status_url': f"/jobs/{job.job_id}"}), 202
+        return render_template('index.html', schemes=[], job_id=job.job_id)
     except Exception as e:
         logger.error(f"Profile submission failed: {str(e)}")
+        if wants_json():
+            return jsonify({'error': f"Error: {str(e)}"}), 500
         return render_template('index.html', schemes=[], error=f"Error: {str(e)}")
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id: str):
+    """Status of a recommendation job, with vector-ranked results while reranking runs."""
+    job = job_manager.get(job_id, session_id=session.get('sid'))
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.snapshot())
+
 @app.route('/chat', methods=['POST'])
 def chat():
+    with timed("http_chat"):
+        return _chat()
+
+def _chat():
     try:
         user_input = request.json['message'].strip()
         if not user_input:
             return jsonify({'response': 'Please provide a message.', 'action': 'none'})
 
+        session_id, agent_state = get_session_state()
         if not agent_state['agent']:
             logger.warning("Chat attempted before agent initialization")
             return jsonify({
@@ -96,29 +144,9 @@ def chat():
                 'action': 'none'
             })
 
-        response = agent_state['agent'].handle_input(user_input)
-        action = 'none'
-        details = None
-
-        if user_input.lower() == 'show schemes':
-            action = 'show_schemes'
-        elif user_input.lower().startswith('show scheme'):
-            try:
-                scheme_num = int(user_input.split()[-1]) - 1
-                if 0 <= scheme_num < len(agent_state['schemes']):
-                    scheme_id = agent_state['schemes'][scheme_num]['metadata']['scheme_id']
-                    details = fetch_scheme_details(scheme_id)
-                    if details:
-                        action = 'show_details'
-                    else:
-                        response = f"Sorry, no details found for scheme number {scheme_num + 1}."
-            except (ValueError, IndexError):
-                response = "Please specify a valid scheme number (e.g., 'show scheme 3')."
-        elif user_input.lower() in ['quit', 'exit']:
-            action = 'exit'
-            agent_state['schemes'] = []
-            agent_state['agent'] = None
-            agent_state['selected_scheme'] = None
+        with agent_state['lock']:
+            response = agent_state['agent'].handle_input(user_input)
+        response, action, details = resolve_chat_action(session_id, agent_state, user_input, response)
 
         return jsonify({
             'response': response,
@@ -129,5 +157,46 @@ def chat():
         logger.error(f"Chat processing failed: {str(e)}")
         return jsonify({'response':  f'Error: {str(e)}', 'action': 'none'}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Relay the display agent's reply as server-sent events while the LLM generates it.
+
+    Emits `token` events with incremental text, then one `done` event carrying the
+    final response, action and details (the same fields as /chat).
+    """
+    user_input = (request.json or {}).get('message', '').strip()
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if not user_input:
+        return Response(sse_event('done', {'response': 'Please provide a message.', 'action': 'none'}),
+                        mimetype='text/event-stream', headers=headers)
+
+    session_id, agent_state = get_session_state()
+    if not agent_state['agent']:
+        logger.warning("Chat attempted before agent initialization")
+        return Response(sse_event('done', {'response': 'Please submit your profile first.', 'action': 'none'}),
+                        mimetype='text/event-stream', headers=headers)
+
+    def generate():
+        try:
+            parts = []
+            with agent_state['lock']:
+                for token in agent_state['agent'].handle_input_stream(user_input):
+                    parts.append(token)
+                    yield sse_event('token', {'token': token})
+            response, action, details = resolve_chat_action(session_id, agent_state, user_input, "".join(parts).strip())
+            yield sse_event('done', {'response': response, 'action': action, 'details': details})
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {str(e)}")
+            yield sse_event('error', {'response': f'Error: {str(e)}', 'action': 'none'})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+if __name__ != "__main__":
+    # Imported by a WSGI server
+    start_warmup()
+
 if __name__ == "__main__":
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warmup()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""Async (ASGI) serving mode for the web app.
+
+Serves the same routes and template as app.py, but the recommendation
+pipeline and chat replies await the Groq and Pinecone clients instead of
+holding a worker thread, so one process can carry hundreds of in-flight
+requests. Run with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+"""
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from urllib.parse import parse_qs
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.templating import Jinja2Templates
+from starlette.middleware.sessions import SessionMiddleware
+from session_store import start_session_job
+from scheme_search_agent import asearch_schemes_for_profile, open_async_vector_index, close_async_vector_index
+from scheme_display_agent import SchemeDisplayAgent
+from recommendation_jobs import JobManager, JobQueueFull
+from metrics import render_prometheus, timed
+from web_common import (
+    check_api_keys, start_warmup, validate_user_profile, validate_schemes, session_store,
+    register_job_gauge, resolve_chat_action, sse_event
+)
+
+# Logging setup: File only, no console output (same log as the Flask app)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[logging.FileHandler('chatbot.log', encoding='utf-8')]
+)
+logger = logging.getLogger(__name__)
+
+check_api_keys()
+
+# Threads for the blocking steps (embedding, SQLite, local vector search); LLM waits use none
+ASGI_BLOCKING_THREADS = int(os.getenv("ASGI_BLOCKING_THREADS", "32"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASGI_BLOCKING_THREADS, thread_name_prefix="asgi-blocking")
+    )
+    start_warmup()
+    await open_async_vector_index()
+    yield
+    await close_async_vector_index()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(SessionMiddleware, secret_key=os.getenv("FLASK_SECRET_KEY") or os.urandom(32).hex())
+templates = Jinja2Templates(directory="templates")
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+async def get_session_state(request: Request):
+    """Return (session_id, state) for the current browser session, creating it if needed."""
+    # The store takes a thread lock and may evict sessions, so it runs off the event loop
+    session_id, state = await asyncio.to_thread(session_store.get_or_create, request.session.get('sid'))
+    request.session['sid'] = session_id
+    # Created here, on the event loop, rather than in session_store (Flask worker threads have no loop)
+    if 'async_lock' not in state:
+        state['async_lock'] = asyncio.Lock()
+    return session_id, state
+
+# Async jobs hold no thread while they wait on Groq, so far more of them can run at once
+job_manager = JobManager(
+    workers=int(os.getenv("ASGI_JOB_CONCURRENCY", "256")),
+    queue_size=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "600"))
+)
+register_job_gauge(job_manager)
+
+def render_index(request: Request, schemes, error: str = None, job_id: str = None):
+    return templates.TemplateResponse(request, 'index.html', {'schemes': schemes, 'error': error, 'job_id': job_id})
+
+async def read_form(request: Request) -> Dict[str, str]:
+    """Parse an urlencoded form body (first value per field, like Flask's form.to_dict())."""
+    body = (await request.body()).decode('utf-8')
+    return {key: values[0] for key, values in parse_qs(body, keep_blank_values=True).items()}
+
+@app.get('/')
+async def index(request: Request):
+    logger.info("Rendering index page")
+    _, agent_state = await get_session_state(request)
+    return render_index(request, agent_state['schemes'])
+
+@app.get('/metrics')
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type='text/plain; version=0.0.4')
+
+def wants_json(request: Request) -> bool:
+    return 'application/json' in request.headers.get('accept', '')
+
+async def run_recommendation_job(job, profile: Dict, session_id: str, agent_state: Dict) -> List[Dict]:
+    """Job body: search, then attach the display agent to the submitting session."""
+    schemes = await asearch_schemes_for_profile(profile, os.getenv("PERSIST_RECOMMENDATIONS_PATH") or None, progress=job.update)
+    valid_schemes = validate_schemes(schemes)
+    if not valid_schemes:
+        # The previous agent was already cleared when this job was submitted
+        logger.warning("No valid schemes found")
+        return []
+    agent = await asyncio.to_thread(SchemeDisplayAgent, valid_schemes)
+    async with agent_state['async_lock']:
+        if agent_state.get('job_id') != job.job_id:
+            logger.info(f"Job {job.job_id} was superseded by a newer submission; not attaching its agent")
+            return valid_schemes
+        agent_state['schemes'] = valid_schemes
+        agent_state['agent'] = agent
+        agent_state['selected_scheme'] = None
+    await asyncio.to_thread(session_store.measure, session_id)
+    logger.info(f"Agent initialized with {len(valid_schemes)} schemes for session {session_id}")
+    return valid_schemes
+
+@app.post('/submit')
+async def submit_profile(request: Request):
+    """Queue a recommendation job and return its id right away (see app.py)."""
+    with timed("http_submit"):
+        json_client = wants_json(request)
+        try:
+            profile = await read_form(request)
+            profile['category'] = profile.get('caste', '')  # Align category with caste
+            if not validate_user_profile(profile):
+                logger.error("Profile validation failed")
+                if json_client:
+                    return JSONResponse({'error': 'Missing required profile fields'}, status_code=400)
+                return render_index(request, [], error="Missing required profile fields")
+
+            session_id, agent_state = await get_session_state(request)
+            try:
+                job = job_manager.submit_async(
+                    session_id, lambda job: run_recommendation_job(job, profile, session_id, agent_state)
+                )
+            except JobQueueFull as e:
+                if json_client:
+                    return JSONResponse({'error': str(e)}, status_code=503, headers={'Retry-After': '5'})
+                response = render_index(request, [], error=str(e))
+                response.status_code = 503
+                response.headers['Retry-After'] = '5'
+                return response
+            # The job task cannot run before this returns to the event loop, so it always sees its own id
+            start_session_job(agent_state, job.job_id)
+
+            if json_client:
+                return JSONResponse(
+                    {'job_id': job.job_id, 'status': job.status, 'status_url': f"/jobs/{job.job_id}"}, status_code=202
+                )
+            return render_index(request, [], job_id=job.job_id)
+        except Exception as e:
+            logger.error(f"Profile submission failed: {str(e)}")
+            if json_client:
+                return JSONResponse({'error': f"Error: {str(e)}"}, status_code=500)
+            return render_index(request, [], error=f"Error: {str(e)}")
+
+@app.get('/jobs/{job_id}')
+async def job_status(request: Request, job_id: str):
+    job = job_manager.get(job_id, session_id=request.session.get('sid'))
+    if job is None:
+        return JSONResponse({'error': 'Unknown job'}, status_code=404)
+    return JSONResponse(job.snapshot())
+
+async def read_message(request: Request) -> str:
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = {}
+    return str((payload or {}).get('message', '')).strip()
+
+@app.post('/chat')
+async def chat(request: Request):
+    with timed("http_chat"):
+        try:
+            user_input = await read_message(request)
+            if not user_input:
+                return JSONResponse({'response': 'Please provide a message.', 'action': 'none'})
+
+            session_id, agent_state = await get_session_state(request)
+            if not agent_state['agent']:
+                logger.warning("Chat attempted before agent initialization")
+                return JSONResponse({'response': 'Please submit your profile first.', 'action': 'none'})
+
+            async with agent_state['async_lock']:
+                response = await agent_state['agent'].ahandle_input(user_input)
+            # SQLite detail lookups and session accounting block, so they run in a worker thread
+            response, action, details = await asyncio.to_thread(
+                resolve_chat_action, session_id, agent_state, user_input, response
+            )
+            return JSONResponse({'response': response, 'action': action, 'details': details})
+        except Exception as e:
+            logger.error(f"Chat processing failed: {str(e)}")
+            return JSONResponse({'response': f'Error: {str(e)}', 'action': 'none'}, status_code=500)
+
+@app.post('/chat/stream')
+async def chat_stream(request: Request):
+    """Relay the display agent's reply as server-sent events (same events as the Flask app)."""
+    user_input = await read_message(request)
+    if not user_input:
+        return StreamingResponse(iter([sse_event('done', {'response': 'Please provide a message.', 'action': 'none'})]),
+                                 media_type='text/event-stream', headers=SSE_HEADERS)
+
+    session_id, agent_state = await get_session_state(request)
+    if not agent_state['agent']:
+        logger.warning("Chat attempted before agent initialization")
+        return StreamingResponse(iter([sse_event('done', {'response': 'Please submit your profile first.', 'action': 'none'})]),
+                                 media_type='text/event-stream', headers=SSE_HEADERS)
+
+    async def generate():
+        try:
+            parts = []
+            async with agent_state['async_lock']:
+                async for token in agent_state['agent'].ahandle_input_stream(user_input):
+                    parts.append(token)
+                    yield sse_event('token', {'token': token})
+            response, action, details = await asyncio.to_thread(
+                resolve_chat_action, session_id, agent_state, user_input, "".join(parts).strip()
+            )
+            yield sse_event('done', {'response': response, 'action': action, 'details': details})
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {str(e)}")
+            yield sse_event('error', {'response': f'Error: {str(e)}', 'action': 'none'})
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", "8000")))
@@ -0,0 +1,4 @@
+"""Offline benchmarks for the Scheme Saathi search pipeline.
+
+Run from the repository root, e.g. ``python -m benchmarks.startup_benchmark``.
+"""
@@ -0,0 +1,132 @@
+"""Single-query latency and per-process memory of the query encoder backends.
+
+Each backend (ENCODER_BACKEND values: sentence-transformers, onnx) runs in a
+fresh interpreter so the resident set size reflects only that backend. For each
+one the benchmark reports the load time, p50/p95 latency of encoding one query
+at a time (as search_pinecone does), and the RSS after loading and after the
+queries. When both backends run, the cosine similarity between their
+embeddings of the same queries is reported as well (the parity check of
+export_onnx_encoder.py, on benchmark queries).
+
+The ONNX backend needs an export first (python export_onnx_encoder.py).
+
+Usage:
+    python -m benchmarks.encoder_benchmark [--backends sentence-transformers onnx] [--queries 100]
+        [--onnx-dir onnx_encoder] [--threads 0] [--output results.json]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import synthetic_profiles
+from benchmarks.stage_benchmark import git_commit, percentile
+from encoders import ENCODER_BACKENDS
+from query_builder import build_template_query
+
+_SCENARIO = r'''
+import json, sys, time
+import numpy as np
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+backend, model_name, queries_path, vectors_path = sys.argv[1:5]
+with open(queries_path, encoding="utf-8") as f:
+    queries = json.load(f)
+baseline_rss = rss_mb()
+start = time.perf_counter()
+from encoders import create_encoder
+encoder = create_encoder(model_name, backend=backend)
+load_seconds = time.perf_counter() - start
+loaded_rss = rss_mb()
+encoder.encode("warmup", normalize_embeddings=True)
+latencies, vectors = [], []
+for query in queries:
+    start = time.perf_counter()
+    vectors.append(encoder.encode(query, normalize_embeddings=True))
+    latencies.append(time.perf_counter() - start)
+np.save(vectors_path, np.asarray(vectors, dtype=np.float32))
+print(json.dumps({
+    "load_seconds": load_seconds,
+    "latencies": latencies,
+    "baseline_rss_mb": baseline_rss,
+    "loaded_rss_mb": loaded_rss,
+    "final_rss_mb": rss_mb()
+}))
+'''
+
+def run_backend(backend: str, queries_path: str, vectors_path: str, args) -> Dict:
+    env = dict(os.environ)
+    env["ONNX_ENCODER_DIR"] = os.path.abspath(args.onnx_dir)
+    env["ONNX_THREADS"] = str(args.threads)
+    completed = subprocess.run(
+        [sys.executable, "-c", _SCENARIO, backend, args.model, queries_path, vectors_path],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    latencies = result.pop("latencies")
+    result["latency_ms"] = {
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "mean": float(np.mean(latencies)) * 1000
+    }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query encoder backends: latency, RSS and embedding parity")
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS)
+    parser.add_argument("--model", default="BAAI/bge-large-en-v1.5")
+    parser.add_argument("--queries", type=int, default=100, help="Distinct single-query encodes per backend")
+    parser.add_argument("--onnx-dir", default="onnx_encoder")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0: default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    queries: List[str] = [build_template_query(p) for p in synthetic_profiles(args.queries, seed=args.seed)]
+    # Repeated profiles produce repeated queries; suffix them so each encode does real work
+    queries = [f"{query} ({i})" for i, query in enumerate(queries)]
+    workdir = tempfile.mkdtemp(prefix="encoder_benchmark_")
+    queries_path = os.path.join(workdir, "queries.json")
+    with open(queries_path, "w", encoding="utf-8") as f:
+        json.dump(queries, f)
+
+    report = {"commit": git_commit(), "config": vars(args), "backends": {}}
+    vectors = {}
+    for backend in args.backends:
+        vectors_path = os.path.join(workdir, f"{backend}.npy")
+        report["backends"][backend] = run_backend(backend, queries_path, vectors_path, args)
+        vectors[backend] = np.load(vectors_path)
+        result = report["backends"][backend]
+        print(f"{backend:<22} load {result['load_seconds']:6.2f} s  "
+              f"p50 {result['latency_ms']['p50']:7.1f} ms  p95 {result['latency_ms']['p95']:7.1f} ms  "
+              f"RSS {result['loaded_rss_mb']:7.0f} MB loaded, {result['final_rss_mb']:7.0f} MB after queries")
+
+    if len(vectors) == 2:
+        a, b = vectors.values()
+        cosines = (a * b).sum(axis=1)
+        report["parity"] = {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean())}
+        print(f"Parity: min cosine {cosines.min():.4f}, mean {cosines.mean():.4f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Deterministic local stand-ins for Groq, Pinecone and the embedding model.
+
+They let the benchmarks exercise the real pipeline code without network
+access or GPUs. Latencies are simulated with sleeps, so the measurements
+capture the pipeline's own overhead plus a controllable model of the remote calls.
+"""
+import re
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from local_vector_index import LocalVectorIndex
+from profile_extractor import STATE_ALIASES, NATIONAL_LEVEL
+from query_builder import OCCUPATION_TAGS
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for simulated generation time."""
+    return max(1, len(text) // 4)
+
+class FakeMessage:
+    """Minimal stand-in for langchain's AIMessage / AIMessageChunk."""
+
+    def __init__(self, content: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.content = content
+        self.response_metadata = {
+            'token_usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+
+class FakeChatGroq:
+    """ChatGroq stand-in with a configurable first-token latency and generation rate.
+
+    Replies are derived from the prompt: rerank prompts get one deterministic
+    score per "Scheme N:" entry, everything else gets a fixed-length answer.
+    """
+
+    def __init__(self, latency: float = 0.35, tokens_per_second: float = 250.0,
+                 reply_tokens: int = 180, seed: int = 0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.seed = seed
+        self.calls = 0
+
+    def _reply(self, prompt: str) -> str:
+        if "JSON array of integer scores" in prompt:
+            count = len(re.findall(r"Scheme \d+: \{", prompt))
+            scores = [_stable_hash(f"{self.seed}:{prompt}:{i}") % 101 for i in range(count)]
+            return str(scores)
+        if "search query for government schemes" in prompt:
+            return "Government schemes. Tags: Education, Scholarship. State: All India. Eligibility: all castes."
+        words = ["Here", "are", "the", "scheme", "details", "you", "asked", "about."]
+        return " ".join(words[i % len(words)] for i in range(self.reply_tokens))
+
+    def _generation_seconds(self, text: str) -> float:
+        return estimate_tokens(text) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> FakeMessage:
+        self.calls += 1
+        prompt = str(prompt)
+        reply = self._reply(prompt)
+        time.sleep(self.latency + self._generation_seconds(reply))
+        return FakeMessage(reply, estimate_tokens(prompt), estimate_tokens(reply))
+
+    def stream(self, prompt: Any, *args, **kwargs) -> Iterator[FakeMessage]:
+        self.calls += 1
+        reply = self._reply(str(prompt))
+        time.sleep(self.latency)
+        for word in reply.split(" "):
+            chunk = word + " "
+            time.sleep(self._generation_seconds(chunk))
+            yield FakeMessage(chunk)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> FakeMessage:
+        self.calls += 1
+        prompt = str(prompt)
+        reply = self._reply(prompt)
+        await asyncio.sleep(self.latency + self._generation_seconds(reply))
+        return FakeMessage(reply, estimate_tokens(prompt), estimate_tokens(reply))
+
+    async def astream(self, prompt: Any, *args, **kwargs):
+        self.calls += 1
+        reply = self._reply(str(prompt))
+        await asyncio.sleep(self.latency)
+        for word in reply.split(" "):
+            chunk = word + " "
+            await asyncio.sleep(self._generation_seconds(chunk))
+            yield FakeMessage(chunk)
+
+class FakeEncoder:
+    """SentenceTransformer stand-in: hashed bag-of-words vectors, normalized.
+
+    Texts that share words get similar vectors, so retrieval over a fake index
+    still returns plausible neighbours.
+    """
+
+    def __init__(self, dimension: int = 1024, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            h = _stable_hash(token)
+            vector[h % self.dimension] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, normalize_embeddings: bool = True, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dimension), np.float32)
+
+class FakeVectorIndex(LocalVectorIndex):
+    """Pinecone Index stand-in: a LocalVectorIndex plus a simulated network round trip."""
+
+    def __init__(self, store_dir: str, latency: float = 0.04):
+        super().__init__(store_dir)
+        self.latency = latency
+
+    def query(self, *args, **kwargs) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        return super().query(*args, **kwargs)
+
+_CASTE_CLAUSES = [
+    "", "", "The applicant should belong to a Scheduled Caste.", "The applicant should belong to a Scheduled Tribe.",
+    "The applicant should belong to the Other Backward Classes."
+]
+_INCOME_CLAUSES = [
+    "", "The annual family income should not exceed ₹2,50,000.", "The annual family income should be below ₹1 lakh.",
+    "The annual income of the family should not exceed ₹8 lakh per annum."
+]
+
+def synthetic_schemes(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Scheme rows with the dataset's columns, spread over states, occupations and eligibility rules."""
+    rng = random.Random(seed)
+    states = list(STATE_ALIASES) + ["Central"] * 8 + [NATIONAL_LEVEL] * 2
+    occupations = list(OCCUPATION_TAGS)
+    rows = []
+    for scheme_id in range(count):
+        occupation = rng.choice(occupations)
+        state = rng.choice(states)
+        tags = OCCUPATION_TAGS[occupation] + rng.sample(["Women", "Financial Assistance", "Loan", "Training", "Health"], 2)
+        eligibility = " ".join(filter(None, [
+            f"1. The applicant should be a {occupation.lower()}.",
+            f"2. The applicant should be a resident of {state}." if state not in ("Central", NATIONAL_LEVEL) else "",
+            rng.choice(_CASTE_CLAUSES),
+            rng.choice(_INCOME_CLAUSES)
+        ]))
+        rows.append({
+            'Unnamed: 0': scheme_id,
+            'scheme_name': f"{state} {occupation} {rng.choice(['Support', 'Welfare', 'Assistance', 'Scholarship'])} Scheme {scheme_id}",
+            'nodal_ministry': "Ministry of Social Justice and Empowerment",
+            'implementing_agency': f"Department of Welfare, {state}",
+            'target_beneficiaries': occupation,
+            'tags': ", ".join(tags),
+            'state': state,
+            'category': rng.choice(["Education & Learning", "Social welfare & Empowerment", "Agriculture,Rural & Environment"]),
+            'level': "Central" if state in ("Central", NATIONAL_LEVEL) else "State",
+            'brief_description': f"Financial assistance for {occupation.lower()}s in {state}.",
+            'detailed_description': " ".join(f"Sentence {i} describing the scheme benefits and coverage." for i in range(6)),
+            'eligibility_criteria': eligibility,
+            'documents_required': "Aadhaar Card, Income Certificate, Caste Certificate, Bank Passbook, Passport-size Photograph",
+            'application_process': "Step 1: Visit the official portal. Step 2: Register and fill in the form. Step 3: Upload the documents and submit.",
+            'benefits': f"Up to ₹{rng.randint(5, 100) * 1000:,} per year.",
+            'Official Website': "https://example.gov.in",
+            'Application Form': "",
+            'Order/Notice': ""
+        })
+    return rows
+
+def synthetic_profiles(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """User profiles in the shape collected by profile_agent."""
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(count):
+        caste = rng.choice(["SC", "ST", "OBC", "General", ""])
+        profiles.append({
+            'name': f"User {i}",
+            'state': rng.choice(list(STATE_ALIASES)),
+            'gender': rng.choice(["Male", "Female"]),
+            'caste': caste,
+            'category': caste,
+            'occupation': rng.choice(list(OCCUPATION_TAGS)),
+            'income': rng.choice(["under 1 lakh", "50000", "2.5 lakh per annum", "18,000 per month", "8 lakh"]),
+            'additional_details': rng.choice(["", "", "first-generation graduate", "has a disability"])
+        })
+    return profiles
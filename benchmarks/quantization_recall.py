@@ -0,0 +1,139 @@
+"""Recall and latency of the quantized local vector backends against exact search.
+
+For every query, the exact top-k of LocalVectorIndex is compared with the
+top-k of QuantizedVectorIndex (int8 and binary codes, for several shortlist
+sizes). The report lists recall@k, mean query latency, and the memory held by
+the codes compared with the float32 matrix.
+
+By default the benchmark runs offline on a synthetic corpus embedded with the
+fake encoder. ``--store-dir`` evaluates an existing store (e.g. the real
+``scheme_index/`` built by databse_setup.py); its queries are the template
+search queries of synthetic profiles, encoded with the store's model when
+``--real-encoder`` is given and the fake encoder otherwise.
+
+The fake encoder's hashed bag-of-words vectors are sparse, so their sign bits
+carry little information: binary recall on the synthetic corpus understates
+what dense bge embeddings achieve. Use ``--store-dir`` for real numbers.
+
+Usage:
+    python -m benchmarks.quantization_recall [--schemes 5000] [--queries 200] [--k 10 20]
+        [--candidates 50 100 200 400 800] [--store-dir scheme_index --real-encoder] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FakeEncoder, synthetic_profiles
+from benchmarks.stage_benchmark import build_workspace, git_commit
+from local_vector_index import LocalVectorIndex, QuantizedVectorIndex, QUANTIZATIONS
+from query_builder import build_template_query
+
+def encode_queries(args, model_name: str) -> np.ndarray:
+    texts = [build_template_query(profile) for profile in synthetic_profiles(args.queries, seed=args.seed)]
+    if args.real_encoder:
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(model_name)
+    else:
+        encoder = FakeEncoder()
+    return np.asarray(encoder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+def timed_queries(index: LocalVectorIndex, queries: np.ndarray, top_k: int):
+    """Return (result scores per query, mean seconds per query).
+
+    Both index types return exact float32 scores, so results can be compared by score.
+    """
+    results = []
+    start = time.perf_counter()
+    for vector in queries:
+        results.append([match['score'] for match in index.query(vector, top_k=top_k, include_metadata=False)['matches']])
+    return results, (time.perf_counter() - start) / max(len(queries), 1)
+
+def recall(exact: List[List[float]], approximate: List[List[float]], k: int) -> float:
+    """Share of the exact top-k found. A result tied with the k-th exact score counts as
+    found, so the arbitrary order among equal scores does not register as a miss."""
+    hits = total = 0
+    for exact_scores, approximate_scores in zip(exact, approximate):
+        if not exact_scores[:k]:
+            continue
+        threshold = exact_scores[:k][-1] - 1e-5
+        hits += sum(1 for score in approximate_scores[:k] if score >= threshold)
+        total += len(exact_scores[:k])
+    return hits / total if total else 1.0
+
+def run(args) -> Dict:
+    if args.real_encoder and not args.store_dir:
+        raise SystemExit("--real-encoder needs --store-dir (the synthetic store is built with the fake encoder)")
+    store_dir = args.store_dir
+    if not store_dir:
+        workdir = tempfile.mkdtemp(prefix="quantization_recall_")
+        store_dir = build_workspace(workdir, args.schemes, FakeEncoder(), args.seed)
+    exact_index = LocalVectorIndex(store_dir)
+    queries = encode_queries(args, exact_index.model_name)
+    max_k = max(args.k)
+    exact, exact_seconds = timed_queries(exact_index, queries, max_k)
+
+    report = {
+        "commit": git_commit(),
+        "config": {"store_dir": args.store_dir, "schemes": len(exact_index), "queries": len(queries),
+                   "dimension": int(exact_index.embeddings.shape[1]), "seed": args.seed},
+        "float32": {"bytes": int(exact_index.embeddings.nbytes), "query_ms": exact_seconds * 1000},
+        "quantized": []
+    }
+    for quantization in QUANTIZATIONS:
+        for candidates in args.candidates:
+            index = QuantizedVectorIndex(store_dir, quantization, rescore_candidates=candidates)
+            approximate, seconds = timed_queries(index, queries, max_k)
+            report["quantized"].append({
+                "quantization": quantization,
+                "rescore_candidates": candidates,
+                "bytes": int(index.codes_nbytes),
+                "query_ms": seconds * 1000,
+                "recall": {str(k): recall(exact, approximate, k) for k in args.k}
+            })
+    return report
+
+def print_report(report: Dict):
+    config = report["config"]
+    print(f"{config['schemes']} schemes x {config['dimension']} dims, {config['queries']} queries")
+    print(f"float32 exact: {report['float32']['bytes'] / 1e6:.1f} MB, {report['float32']['query_ms']:.2f} ms/query")
+    ks = list(report["quantized"][0]["recall"]) if report["quantized"] else []
+    header = f"{'codes':<8}{'shortlist':>10}{'MB':>9}{'ms/query':>10}" + "".join(f"{'recall@' + k:>11}" for k in ks)
+    print(header)
+    for row in report["quantized"]:
+        line = f"{row['quantization']:<8}{row['rescore_candidates']:>10}{row['bytes'] / 1e6:>9.2f}{row['query_ms']:>10.2f}"
+        line += "".join(f"{row['recall'][k]:>11.3f}" for k in ks)
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k of the int8 and binary local vector backends against exact search")
+    parser.add_argument("--schemes", type=int, default=5000, help="Synthetic schemes (ignored with --store-dir)")
+    parser.add_argument("--queries", type=int, default=200, help="Synthetic profile queries")
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 20], help="Cutoffs to report recall at")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 100, 200, 400, 800],
+                        help="Shortlist sizes re-scored in float32")
+    parser.add_argument("--store-dir", help="Evaluate an existing embedding store instead of a synthetic one")
+    parser.add_argument("--real-encoder", action="store_true", help="Encode queries with the store's SentenceTransformer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    report = run(args)
+    print_report(report)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
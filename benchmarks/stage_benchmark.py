@@ -0,0 +1,192 @@
+"""Stage-level latency benchmark of the recommendation pipeline, fully offline.
+
+Groq, Pinecone and (optionally) the embedding model are replaced by the
+deterministic stand-ins in benchmarks.fakes, and the scheme database is a
+synthetic corpus built with the real databse_setup pipeline in a temporary
+directory. For every synthetic profile the benchmark times:
+
+- ``generate_query``
+- ``encode`` (the embedding model alone)
+- ``retrieval`` (vector + keyword search, state and eligibility filtering; the
+  query embedding is already cached by then)
+- ``rerank`` (rerank_with_llm; score caching is disabled)
+- ``search_total`` (the four stages above)
+- ``display_detail`` and ``display_followup`` (SchemeDisplayAgent.handle_input
+  for a scheme selection and an eligibility question)
+
+and reports p50/p95/p99 per stage. ``--output`` writes the results as JSON
+(with the git commit) and ``--compare`` prints the change against an earlier run.
+
+Usage:
+    python -m benchmarks.stage_benchmark [--profiles 50] [--schemes 2000] [--llm-latency 0.35]
+        [--tokens-per-second 250] [--vector-latency 0.04] [--real-encoder] [--output results.json]
+        [--compare baseline.json]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FakeChatGroq, FakeEncoder, FakeVectorIndex, synthetic_profiles, synthetic_schemes
+
+STAGES = ["generate_query", "encode", "retrieval", "rerank", "search_total", "display_detail", "display_followup"]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for stage in STAGES:
+        values = samples.get(stage) or []
+        if values:
+            summary[stage] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values)
+            }
+    return summary
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def build_workspace(workdir: str, scheme_count: int, encoder: FakeEncoder, seed: int):
+    """Build the synthetic scheme database, keyword/state indexes and vector store in workdir."""
+    import databse_setup
+    rows = synthetic_schemes(scheme_count, seed=seed)
+    csv_path = os.path.join(workdir, "dataset.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    db_path = os.path.join(workdir, "new_schemes.db")
+    databse_setup.setup_sqlite_db(csv_path, db_path)
+    databse_setup.build_eligibility_rules(db_path)
+    databse_setup.build_scheme_documents(db_path)
+    databse_setup.build_fts_index(db_path)
+    databse_setup.build_state_index(db_path)
+    store_dir = os.path.join(workdir, "scheme_index")
+    databse_setup.build_embedding_store(db_path, store_dir, model=encoder)
+    return store_dir
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="stage_benchmark_")
+    # The pipeline resolves new_schemes.db and its caches relative to the working directory
+    os.chdir(workdir)
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.setdefault("PINECONE_API_KEY", "benchmark")
+    os.environ["QUERY_CACHE_PATH"] = ""
+    os.environ["RERANK_CACHE_PATH"] = os.path.join(workdir, "rerank_cache.db")
+    os.environ["RERANK_CACHE_TTL"] = "0"
+    os.environ["GROQ_REQUESTS_PER_MINUTE"] = str(args.groq_rpm)
+
+    encoder = FakeEncoder(latency=args.encode_latency)
+    store_dir = build_workspace(workdir, args.schemes, encoder, args.seed)
+
+    import scheme_search_agent as agent
+    import scheme_display_agent as display
+    fake_llm = FakeChatGroq(latency=args.llm_latency, tokens_per_second=args.tokens_per_second, seed=args.seed)
+    agent.llm.override(fake_llm)
+    agent.index.override(FakeVectorIndex(store_dir, latency=args.vector_latency))
+    if not args.real_encoder:
+        agent.model.override(encoder)
+    display.llm = fake_llm
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def timed(stage, fn, *fn_args, **fn_kwargs):
+        start = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        samples[stage].append(time.perf_counter() - start)
+        return result
+
+    for profile in synthetic_profiles(args.profiles, seed=args.seed):
+        details = agent.sanitize_user_details(profile)
+        start = time.perf_counter()
+        query = timed("generate_query", agent.generate_query, details)
+        vector = timed("encode", agent.model.encode, query, normalize_embeddings=True)
+        agent.query_cache.put(query, vector)
+        candidates = timed("retrieval", agent._retrieve_candidates, query, details, agent.RETRIEVAL_CANDIDATES)
+        ranked = timed("rerank", agent.rerank_with_llm, candidates, details, top_k=agent.RETRIEVAL_CANDIDATES)
+        samples["search_total"].append(time.perf_counter() - start)
+        if ranked:
+            chat = display.SchemeDisplayAgent(ranked)
+            timed("display_detail", chat.handle_input, "1")
+            timed("display_followup", chat.handle_input, "Am I eligible for this scheme?")
+
+    return {
+        "commit": git_commit(),
+        "config": {
+            "profiles": args.profiles, "schemes": args.schemes, "llm_latency": args.llm_latency,
+            "tokens_per_second": args.tokens_per_second, "vector_latency": args.vector_latency,
+            "encode_latency": args.encode_latency, "real_encoder": args.real_encoder,
+            "groq_rpm": args.groq_rpm, "seed": args.seed
+        },
+        "llm_calls": fake_llm.calls,
+        "stages": summarize(samples)
+    }
+
+def print_report(report: Dict, baseline: Dict = None):
+    print(f"{'stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, stats in report["stages"].items():
+        line = (f"{stage:<18}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+                f"{stats['p99'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}")
+        previous = (baseline or {}).get("stages", {}).get(stage)
+        if previous and previous["p50"]:
+            line += f"   p50 {100.0 * (stats['p50'] - previous['p50']) / previous['p50']:+.1f}%"
+            line += f"  p95 {100.0 * (stats['p95'] - previous['p95']) / previous['p95']:+.1f}%"
+        print(line)
+    print(f"LLM calls: {report['llm_calls']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline per-stage latency benchmark of the recommendation pipeline")
+    parser.add_argument("--profiles", type=int, default=50, help="Synthetic user profiles to run")
+    parser.add_argument("--schemes", type=int, default=2000, help="Synthetic schemes in the corpus")
+    parser.add_argument("--llm-latency", type=float, default=0.35, help="Simulated Groq time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="Simulated Groq generation rate")
+    parser.add_argument("--vector-latency", type=float, default=0.04, help="Simulated Pinecone round trip (s)")
+    parser.add_argument("--encode-latency", type=float, default=0.0, help="Extra latency added to the fake encoder (s)")
+    parser.add_argument("--real-encoder", action="store_true", help="Time the real SentenceTransformer for queries")
+    parser.add_argument("--groq-rpm", type=float, default=1e6, help="Groq rate limit to apply (default: effectively none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = run(args)
+    print_report(report, baseline)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
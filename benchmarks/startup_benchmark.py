@@ -0,0 +1,89 @@
+"""Startup benchmark: import latency vs. first-request latency of scheme_search_agent.
+
+Each scenario runs in a fresh interpreter so module caches do not leak between
+measurements:
+
+- ``cold``: import the module, then time the first search_pinecone call
+  (which pays for lazy initialization of the model and vector index).
+- ``warm``: import the module, run warmup() in the foreground, then time the
+  first search_pinecone call.
+
+Usage:
+    python -m benchmarks.startup_benchmark [--runs 3] [--query "..."] [--output results.json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SCENARIO = r'''
+import json, sys, time
+start = time.perf_counter()
+import scheme_search_agent as agent
+import_seconds = time.perf_counter() - start
+warmup_seconds = None
+if sys.argv[1] == "warm":
+    start = time.perf_counter()
+    agent.warmup(background=False)
+    warmup_seconds = time.perf_counter() - start
+start = time.perf_counter()
+results = agent.search_pinecone(sys.argv[2], top_k=20)
+first_request_seconds = time.perf_counter() - start
+start = time.perf_counter()
+agent.search_pinecone(sys.argv[2] + " scheme", top_k=20)
+second_request_seconds = time.perf_counter() - start
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "warmup_seconds": warmup_seconds,
+    "first_request_seconds": first_request_seconds,
+    "second_request_seconds": second_request_seconds,
+    "results": len(results)
+}))
+'''
+
+def run_scenario(scenario: str, query: str) -> Dict:
+    """Run one scenario in a fresh interpreter and return its timings."""
+    env = dict(os.environ)
+    # Keep the measurement independent of previously cached query embeddings
+    env.setdefault("QUERY_CACHE_PATH", "")
+    completed = subprocess.run(
+        [sys.executable, "-c", _SCENARIO, scenario, query],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def summarize(samples: List[Dict]) -> Dict:
+    summary = {}
+    for key in ("import_seconds", "warmup_seconds", "first_request_seconds", "second_request_seconds"):
+        values = [sample[key] for sample in samples if sample.get(key) is not None]
+        if values:
+            summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first-request latency of scheme_search_agent")
+    parser.add_argument("--runs", type=int, default=3, help="Interpreter launches per scenario")
+    parser.add_argument("--query", default="Scholarship for SC students. Tags: Education. State: Telangana.")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    report = {}
+    for scenario in ("cold", "warm"):
+        samples = [run_scenario(scenario, args.query) for _ in range(args.runs)]
+        report[scenario] = {"samples": samples, "summary": summarize(samples)}
+        for key, stats in report[scenario]["summary"].items():
+            print(f"{scenario:>4} {key:<24} median {stats['median'] * 1000:9.1f} ms "
+                  f"(min {stats['min'] * 1000:.1f}, max {stats['max'] * 1000:.1f})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import re
+import logging
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_failed = False
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, else estimate ~4 characters per token."""
+    global _encoding, _encoding_failed
+    if not text:
+        return 0
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logger.info(f"tiktoken unavailable, estimating token counts: {str(e)}")
+                    _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    match = re.match(r'(.+?[.!?])(\s|$)', text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3].rstrip() + '...'
+
+class WindowedConversationMemory:
+    """Token-budgeted conversation memory.
+
+    Keeps the most recent turns verbatim and folds older ones into a short
+    extractive summary, so the rendered history stays within ``max_tokens``
+    however long the conversation runs. Turns that displayed a scheme's full
+    details are stored as a one-line marker, because the prompt already carries
+    those details in its own section.
+    """
+
+    def __init__(self, max_tokens: int = 600, window_turns: int = 4, summary_max_tokens: int = 150):
+        self.max_tokens = max_tokens
+        self.window_turns = window_turns
+        self.summary_max_tokens = summary_max_tokens
+        self._turns: Deque[Tuple[str, str]] = deque()
+        self._summary: List[str] = []
+
+    def add_turn(self, user_input: str, response: str, detail_of: Optional[str] = None):
+        """Record one user/assistant exchange. Pass detail_of=<scheme name> for detail views."""
+        if detail_of:
+            response = f"[Showed the full details of '{detail_of}']"
+        self._turns.append((user_input, response))
+        while len(self._turns) > self.window_turns:
+            self._fold(self._turns.popleft())
+        # Fold further if the verbatim window alone exceeds the budget
+        while len(self._turns) > 1 and count_tokens(self.render()) > self.max_tokens:
+            self._fold(self._turns.popleft())
+
+    def _fold(self, turn: Tuple[str, str]):
+        user_input, response = turn
+        self._summary.append(f"- User said \"{_first_sentence(user_input, 80)}\"; "
+                             f"assistant replied: {_first_sentence(response, 140)}")
+        while len(self._summary) > 1 and count_tokens("\n".join(self._summary)) > self.summary_max_tokens:
+            self._summary.pop(0)
+
+    def render(self) -> str:
+        """Return the history text to place in the prompt."""
+        parts = []
+        if self._summary:
+            parts.append("Summary of earlier conversation:\n" + "\n".join(self._summary))
+        for user_input, response in self._turns:
+            parts.append(f"User: {user_input}\nAssistant: {response}")
+        return "\n\n".join(parts)
+
+    def clear(self):
+        self._turns.clear()
+        self._summary.clear()
+
+    def __len__(self) -> int:
+        return len(self._turns)
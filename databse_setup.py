@@ -1,7 +1,19 @@
 import pandas as pd
+import numpy as np
 import sqlite3
 import logging
 import os
+import json
+import hashlib
+import uuid
+import shutil
+import argparse
+from typing import Dict, Any, List, Optional
+from local_vector_index import EMBEDDINGS_FILE, METADATA_FILE, DEFAULT_STORE_DIR, QUANTIZED_FILES, write_quantized_codes
+from eligibility_rules import extract_rules, RULES_VERSION
+from scheme_documents import build_scheme_document, DOCUMENT_SECTIONS, DOCUMENTS_VERSION
+from profile_extractor import find_states, normalize_state
+from rerank_cache import create_rerank_cache
 
 # Logging setup
 logging.basicConfig(
@@ -14,113 +26,617 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def setup_sqlite_db(csv_path: str = "dataset.csv", 
-                    db_path: str = "new_schemes.db"):
-    """Set up SQLite database by loading CSV data, using Unnamed: 0 as the primary key."""
+# Declared column order of the schemes table (CSV 'Unnamed: 0' becomes scheme_id)
+SCHEME_COLUMNS = [
+    'scheme_id', 'scheme_name', 'nodal_ministry', 'implementing_agency', 'target_beneficiaries',
+    'tags', 'state', 'category', 'level', 'brief_description', 'detailed_description',
+    'eligibility_criteria', 'documents_required', 'application_process', 'benefits',
+    'Official Website', 'Application Form', 'Order/Notice'
+]
+
+SCHEMES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schemes (
+        scheme_id INTEGER PRIMARY KEY,
+        scheme_name TEXT NOT NULL,
+        nodal_ministry TEXT,
+        implementing_agency TEXT,
+        target_beneficiaries TEXT,
+        tags TEXT,
+        state TEXT,
+        category TEXT,
+        level TEXT,
+        brief_description TEXT,
+        detailed_description TEXT,
+        eligibility_criteria TEXT,
+        documents_required TEXT,
+        application_process TEXT,
+        benefits TEXT,
+        "Official Website" TEXT,
+        "Application Form" TEXT,
+        "Order/Notice" TEXT
+    )
+'''
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+_UPSERT_SQL = (
+    f"INSERT INTO schemes ({', '.join(_quote(c) for c in SCHEME_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in SCHEME_COLUMNS)}) "
+    f"ON CONFLICT(scheme_id) DO UPDATE SET "
+    + ', '.join(f"{_quote(c)} = excluded.{_quote(c)}" for c in SCHEME_COLUMNS[1:])
+)
+
+def _ensure_schemes_schema(conn: sqlite3.Connection):
+    """Create the declared schemes table, replacing a legacy table written by DataFrame.to_sql."""
+    info = conn.execute("PRAGMA table_info(schemes)").fetchall()
+    if info:
+        is_primary_key = any(column[1] == 'scheme_id' and column[5] == 1 for column in info)
+        if not is_primary_key or [column[1] for column in info] != SCHEME_COLUMNS:
+            logger.warning("Existing schemes table does not match the declared schema; recreating it")
+            conn.execute("DROP TABLE schemes")
+            conn.execute("DROP TABLE IF EXISTS scheme_row_hashes")
+    conn.execute(SCHEMES_TABLE_SQL)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scheme_row_hashes (
+            scheme_id INTEGER PRIMARY KEY,
+            row_hash TEXT NOT NULL
+        )
+    ''')
+
+def invalidate_rerank_scores(scheme_ids: List[int]) -> int:
+    """Drop cached LLM rerank scores of updated or deleted schemes from the rerank cache database."""
+    cache_path = os.getenv("RERANK_CACHE_PATH", "rerank_cache.db")
+    if not scheme_ids or not cache_path or not os.path.exists(cache_path):
+        return 0
+    try:
+        cache = create_rerank_cache()
+        try:
+            removed = cache.invalidate_schemes(scheme_ids)
+        finally:
+            cache.close()
+    except sqlite3.Error as e:
+        # Stale scores are also skipped at lookup time (their scheme hash no longer matches)
+        logger.warning(f"Could not invalidate rerank scores: {str(e)}")
+        return 0
+    logger.info(f"Invalidated {removed} cached rerank scores for {len(scheme_ids)} changed schemes")
+    return removed
+
+def setup_sqlite_db(csv_path: str = "dataset.csv",
+                    db_path: str = "new_schemes.db",
+                    chunksize: int = 500,
+                    changed_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """Load the scheme CSV into SQLite, streaming it in chunks and upserting only changed rows.
+
+    The declared schemes schema is kept (scheme_id stays the INTEGER PRIMARY KEY),
+    and the whole load runs in a single transaction so readers see either the old
+    or the new data. Returns inserted/updated/unchanged/deleted counts.
+
+    Cached rerank scores of updated and deleted schemes are invalidated once the
+    load commits. If `changed_ids` is given, those scheme ids are appended to it
+    instead, for callers that swap a staging database in later and must
+    invalidate only after the swap.
+    """
     logger.info(f"Setting up SQLite database at {db_path} from CSV {csv_path}")
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    conn = None
     try:
         # Verify CSV exists
         if not os.path.exists(csv_path):
             logger.error(f"CSV file not found: {csv_path}")
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
-        # Read CSV
-        df = pd.read_csv(csv_path)
-        logger.info(f"Loaded CSV with {len(df)} rows")
-
-        # Rename 'Unnamed: 0' to 'scheme_id' for clarity
-        if 'Unnamed: 0' in df.columns:
-            df = df.rename(columns={'Unnamed: 0': 'scheme_id'})
-            logger.info("Renamed 'Unnamed: 0' to 'scheme_id'")
-        else:
+        # Check the header before streaming any rows
+        header = pd.read_csv(csv_path, nrows=0).columns
+        if 'Unnamed: 0' not in header:
             logger.error("Column 'Unnamed: 0' not found in CSV")
             raise ValueError("Column 'Unnamed: 0' not found in CSV")
-
-        # Check for required columns
-        required_columns = [
-            'scheme_id', 'scheme_name', 'nodal_ministry', 'implementing_agency', 'target_beneficiaries',
-            'tags', 'state', 'category', 'level', 'brief_description', 'detailed_description',
-            'eligibility_criteria', 'documents_required', 'application_process', 'benefits',
-            'Official Website', 'Application Form', 'Order/Notice'
-        ]
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in SCHEME_COLUMNS[1:] if col not in header]
         if missing_columns:
             logger.error(f"Missing required columns in CSV: {missing_columns}")
             raise ValueError(f"Missing columns: {missing_columns}")
 
-        # Verify scheme_id is unique
-        if df['scheme_id'].duplicated().any():
-            logger.error("Duplicate scheme_id values found")
-            raise ValueError("Duplicate scheme_id values found. Each scheme_id must be unique.")
+        conn = sqlite3.connect(db_path)
+        logger.info(f"Connected to SQLite database at {db_path}")
+        # WAL lets the web app's read-only connections keep reading while the database is rebuilt
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        _ensure_schemes_schema(conn)
+        existing = dict(conn.execute("SELECT scheme_id, row_hash FROM scheme_row_hashes").fetchall())
+        seen = set()
+        updated_ids = []
+
+        # Missing values are read as empty strings
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str, keep_default_na=False):
+            chunk = chunk.rename(columns={'Unnamed: 0': 'scheme_id'})[SCHEME_COLUMNS]
+            # Normalize scheme_name for consistency (trim spaces)
+            chunk['scheme_name'] = chunk['scheme_name'].str.strip()
+            upserts, hashes = [], []
+            for values in chunk.itertuples(index=False, name=None):
+                scheme_id = int(values[0])
+                if scheme_id in seen:
+                    logger.error(f"Duplicate scheme_id value found: {scheme_id}")
+                    raise ValueError("Duplicate scheme_id values found. Each scheme_id must be unique.")
+                seen.add(scheme_id)
+                row = (scheme_id,) + tuple(values[1:])
+                digest = content_hash(json.dumps(row, ensure_ascii=False))
+                previous = existing.get(scheme_id)
+                if previous == digest:
+                    stats['unchanged'] += 1
+                    continue
+                stats['updated' if previous is not None else 'inserted'] += 1
+                if previous is not None:
+                    updated_ids.append(scheme_id)
+                upserts.append(row)
+                hashes.append((scheme_id, digest))
+            conn.executemany(_UPSERT_SQL, upserts)
+            conn.executemany("INSERT OR REPLACE INTO scheme_row_hashes (scheme_id, row_hash) VALUES (?, ?)", hashes)
+            logger.info(f"Processed {len(seen)} CSV rows")
+
+        stale = [(scheme_id,) for scheme_id in existing if scheme_id not in seen]
+        conn.executemany("DELETE FROM schemes WHERE scheme_id = ?", stale)
+        conn.executemany("DELETE FROM scheme_row_hashes WHERE scheme_id = ?", stale)
+        stats['deleted'] = len(stale)
+
+        # Index scheme_name for faster lookups (scheme_id is the primary key)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_scheme_name ON schemes(scheme_name)")
+        conn.commit()
+        logger.info(f"Loaded schemes table: {stats}")
+        updated_ids.extend(scheme_id for (scheme_id,) in stale)
+        if changed_ids is not None:
+            changed_ids.extend(updated_ids)
+        else:
+            invalidate_rerank_scores(updated_ids)
+
+        # Verify the data
+        row_count = conn.execute("SELECT COUNT(*) FROM schemes").fetchone()[0]
+        if row_count != len(seen):
+            logger.warning(f"Mismatch in row count: CSV has {len(seen)} rows, but database has {row_count} rows")
+        return stats
+    except Exception as e:
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+        logger.error(f"Failed to set up SQLite database: {str(e)}")
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+            logger.info("Closed SQLite connection")
+
+def prepare_staging_database(db_path: str = "new_schemes.db") -> str:
+    """Copy the live database to a staging file that can be rebuilt without affecting readers."""
+    staging_path = db_path + ".staging"
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(staging_path + suffix):
+            os.remove(staging_path + suffix)
+    if os.path.exists(db_path):
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(staging_path)
+        try:
+            # The backup API gives a consistent copy even while the live file is in use
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    logger.info(f"Prepared staging database {staging_path}")
+    return staging_path
+
+def swap_in_database(staging_path: str, db_path: str = "new_schemes.db"):
+    """Atomically replace db_path with a fully built staging database.
+
+    Running servers keep reading the old file until their SchemeStore notices
+    the new inode and reconnects.
+    """
+    conn = sqlite3.connect(staging_path)
+    try:
+        # Fold the WAL into the main file so the swapped-in database is one self-contained file
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        conn.close()
+    if os.path.exists(db_path):
+        live = sqlite3.connect(db_path)
+        try:
+            # Empty the live WAL too, so it can never be replayed against the new file
+            live.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            live.close()
+    os.replace(staging_path, db_path)
+    logger.info(f"Swapped {staging_path} into place as {db_path}")
+
+def prepare_staging_store(store_dir: str = DEFAULT_STORE_DIR) -> str:
+    """Empty staging directory next to store_dir for an embedding store built alongside a staging database."""
+    staging_dir = store_dir.rstrip(os.sep) + ".staging"
+    if os.path.isdir(staging_dir):
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
+    logger.info(f"Prepared staging embedding store {staging_dir}")
+    return staging_dir
 
-        # Handle missing values (convert NaN to empty strings)
-        df = df.fillna('')
-        logger.info("Handled missing values by converting NaN to empty strings")
+def swap_in_store(staging_dir: str, store_dir: str = DEFAULT_STORE_DIR):
+    """Move a fully built staging embedding store into store_dir.
 
-        # Normalize scheme_name for consistency (trim spaces)
-        df['scheme_name'] = df['scheme_name'].str.strip()
-        logger.info("Normalized scheme_name values by trimming spaces")
+    Files are replaced one by one in the order build_embedding_store uses: the
+    matrix, then the metadata, then the quantized codes with their manifest last.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    for name in (EMBEDDINGS_FILE, METADATA_FILE) + QUANTIZED_FILES:
+        os.replace(os.path.join(staging_dir, name), os.path.join(store_dir, name))
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    logger.info(f"Swapped {staging_dir} into place as {store_dir}")
 
-        # Connect to SQLite
+EMBEDDING_MODEL_NAME = "BAAI/bge-large-en-v1.5"
+
+# Columns carried into the vector store as search metadata (same keys as the Pinecone index)
+METADATA_COLUMNS = ['scheme_id', 'scheme_name', 'brief_description', 'eligibility_criteria', 'state', 'tags', 'category']
+
+def scheme_embedding_text(row: Dict[str, Any]) -> str:
+    """Build the passage embedded for a scheme, in the same style as the generated search queries."""
+    return (
+        f"{row.get('scheme_name', '')}. {row.get('brief_description', '')} "
+        f"Tags: {row.get('tags', '')}. State: {row.get('state', '')}. "
+        f"Eligibility: {row.get('eligibility_criteria', '')}"
+    )
+
+def content_hash(text: str) -> str:
+    """Stable hash of the embedded text, used to detect changed rows."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _load_existing_store(store_dir: str, model_name: str):
+    """Return (embeddings, {scheme_id: (content_hash, row)}) from a previous build, if compatible."""
+    embeddings_path = os.path.join(store_dir, EMBEDDINGS_FILE)
+    metadata_path = os.path.join(store_dir, METADATA_FILE)
+    if not os.path.exists(embeddings_path) or not os.path.exists(metadata_path):
+        return None, {}
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            store = json.load(f)
+        if store.get('model') != model_name:
+            logger.info(f"Existing store was built with {store.get('model')}, re-embedding everything")
+            return None, {}
+        embeddings = np.load(embeddings_path, mmap_mode='r')
+        existing = {
+            str(item['id']): (item.get('content_hash'), row)
+            for row, item in enumerate(store.get('items', []))
+        }
+        return embeddings, existing
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable embedding store in {store_dir}: {str(e)}")
+        return None, {}
+
+def build_embedding_store(db_path: str = "new_schemes.db",
+                          store_dir: str = DEFAULT_STORE_DIR,
+                          model_name: str = EMBEDDING_MODEL_NAME,
+                          batch_size: int = 256,
+                          model: Optional[Any] = None,
+                          previous_store_dir: Optional[str] = None) -> Dict[str, int]:
+    """Embed the schemes table into a compact vector store keyed by scheme_id.
+
+    Rows are streamed from SQLite and only rows whose content hash changed since
+    the previous build (in previous_store_dir, default store_dir) are
+    re-embedded; unchanged vectors are copied over. The int8 and binary codes
+    used by the quantized local backends are rebuilt from the finished matrix.
+    """
+    logger.info(f"Building embedding store in {store_dir} from {db_path}")
+    os.makedirs(store_dir, exist_ok=True)
+    old_embeddings, existing = _load_existing_store(previous_store_dir or store_dir, model_name)
+    embeddings_tmp = os.path.join(store_dir, EMBEDDINGS_FILE + ".tmp")
+    metadata_tmp = os.path.join(store_dir, METADATA_FILE + ".tmp")
+    codes_tmp = {name: os.path.join(store_dir, name + ".tmp") for name in QUANTIZED_FILES}
+    stats = {'total': 0, 'embedded': 0, 'reused': 0, 'removed': 0}
+    conn = None
+    try:
         conn = sqlite3.connect(db_path)
-        logger.info(f"Connected to SQLite database at {db_path}")
+        conn.row_factory = sqlite3.Row
+        total = conn.execute("SELECT COUNT(*) FROM schemes").fetchone()[0]
+        if total == 0:
+            raise ValueError("No rows found in schemes table")
 
-        # Create table with explicit schema
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS schemes (
+        pending_rows, pending_texts = [], []
+        items = []
+        embeddings = None
+
+        def flush():
+            nonlocal model, embeddings
+            if not pending_texts:
+                return
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+            vectors = model.encode(pending_texts, batch_size=min(batch_size, 64),
+                                   normalize_embeddings=True, show_progress_bar=False)
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(embeddings_tmp, mode='w+', dtype=np.float32,
+                                                       shape=(total, vectors.shape[1]))
+            embeddings[pending_rows] = vectors
+            stats['embedded'] += len(pending_texts)
+            logger.info(f"Embedded {stats['embedded']} changed schemes so far")
+            pending_rows.clear()
+            pending_texts.clear()
+
+        cursor = conn.execute(f"SELECT {', '.join(METADATA_COLUMNS)} FROM schemes ORDER BY scheme_id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                record = {k: ('' if row[k] is None else row[k]) for k in METADATA_COLUMNS}
+                scheme_id = str(record['scheme_id'])
+                text = scheme_embedding_text(record)
+                digest = content_hash(text)
+                position = len(items)
+                items.append({
+                    'id': scheme_id,
+                    'content_hash': digest,
+                    'metadata': {k: str(v) for k, v in record.items()}
+                })
+                previous = existing.get(scheme_id)
+                if old_embeddings is not None and previous and previous[0] == digest:
+                    if embeddings is None:
+                        embeddings = np.lib.format.open_memmap(embeddings_tmp, mode='w+', dtype=np.float32,
+                                                               shape=(total, old_embeddings.shape[1]))
+                    embeddings[position] = old_embeddings[previous[1]]
+                    stats['reused'] += 1
+                else:
+                    pending_rows.append(position)
+                    pending_texts.append(text)
+            if len(pending_texts) >= batch_size:
+                flush()
+        flush()
+
+        if len(items) != total:
+            raise ValueError(f"schemes table changed during build ({total} counted, {len(items)} read)")
+        stats['total'] = len(items)
+        stats['removed'] = len(set(existing) - {item['id'] for item in items})
+
+        embeddings.flush()
+        # Stamped on the metadata and the codes so readers can tell codes from another build
+        build_id = uuid.uuid4().hex
+        write_quantized_codes(embeddings, codes_tmp, build_id)
+        del embeddings
+        del old_embeddings
+        with open(metadata_tmp, 'w', encoding='utf-8') as f:
+            json.dump({'model': model_name, 'build_id': build_id, 'items': items}, f, ensure_ascii=False)
+        # Swap in the new store: the metadata follows the matrix so readers never see it ahead of it,
+        # and the codes come last with their manifest after them
+        os.replace(embeddings_tmp, os.path.join(store_dir, EMBEDDINGS_FILE))
+        os.replace(metadata_tmp, os.path.join(store_dir, METADATA_FILE))
+        for name in QUANTIZED_FILES:
+            os.replace(codes_tmp[name], os.path.join(store_dir, name))
+        logger.info(f"Embedding store built: {stats}")
+        return stats
+    except Exception as e:
+        logger.error(f"Failed to build embedding store: {str(e)}")
+        for path in (embeddings_tmp, metadata_tmp, *codes_tmp.values()):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
+
+def build_eligibility_rules(db_path: str = "new_schemes.db") -> Dict[str, int]:
+    """Extract structured eligibility predicates for every scheme into scheme_eligibility_rules.
+
+    Only schemes whose eligibility_criteria text (or the extractor version) changed are re-parsed.
+    """
+    logger.info(f"Building eligibility rules in {db_path}")
+    stats = {'total': 0, 'extracted': 0, 'unchanged': 0, 'removed': 0}
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scheme_eligibility_rules (
                 scheme_id INTEGER PRIMARY KEY,
-                scheme_name TEXT NOT NULL,
-                nodal_ministry TEXT,
-                implementing_agency TEXT,
-                target_beneficiaries TEXT,
-                tags TEXT,
-                state TEXT,
-                category TEXT,
-                level TEXT,
-                brief_description TEXT,
-                detailed_description TEXT,
-                eligibility_criteria TEXT,
-                documents_required TEXT,
-                application_process TEXT,
-                benefits TEXT,
-                "Official Website" TEXT,
-                "Application Form" TEXT,
-                "Order/Notice" TEXT
+                rules TEXT NOT NULL,
+                criteria_hash TEXT NOT NULL
             )
         ''')
-        logger.info("Created schemes table with explicit schema")
+        existing = dict(conn.execute("SELECT scheme_id, criteria_hash FROM scheme_eligibility_rules").fetchall())
+        seen = set()
+        updates = []
+        cursor = conn.execute("SELECT scheme_id, eligibility_criteria FROM schemes")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for scheme_id, criteria in rows:
+                seen.add(scheme_id)
+                digest = content_hash(f"{RULES_VERSION}:{criteria or ''}")
+                if existing.get(scheme_id) == digest:
+                    stats['unchanged'] += 1
+                    continue
+                updates.append((scheme_id, json.dumps(extract_rules(criteria or '')), digest))
+        stale = [(scheme_id,) for scheme_id in existing if scheme_id not in seen]
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scheme_eligibility_rules (scheme_id, rules, criteria_hash) VALUES (?, ?, ?)",
+                updates
+            )
+            conn.executemany("DELETE FROM scheme_eligibility_rules WHERE scheme_id = ?", stale)
+        stats.update(total=len(seen), extracted=len(updates), removed=len(stale))
+        logger.info(f"Eligibility rules built: {stats}")
+        return stats
+    except Exception as e:
+        logger.error(f"Failed to build eligibility rules: {str(e)}")
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
 
-        # Load DataFrame into SQLite
-        df.to_sql('schemes', conn, if_exists='replace', index=False)
-        logger.info("Loaded data into 'schemes' table")
+def build_scheme_documents(db_path: str = "new_schemes.db") -> Dict[str, int]:
+    """Pre-split every scheme's detail text into a structured document in scheme_documents.
 
-        # Set scheme_id as the primary key and index scheme_name for faster lookups
-        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_scheme_id ON schemes(scheme_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_scheme_name ON schemes(scheme_name)")
-        logger.info("Created indexes on scheme_id (unique) and scheme_name")
+    Selecting a scheme in the chat renders this document instead of asking the LLM to
+    format the raw text. Only schemes whose detail columns (or the splitter version) changed are rebuilt.
+    """
+    logger.info(f"Building scheme documents in {db_path}")
+    stats = {'total': 0, 'built': 0, 'unchanged': 0, 'removed': 0}
+    columns = ['scheme_name'] + [column for _, column, _ in DOCUMENT_SECTIONS]
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scheme_documents (
+                scheme_id INTEGER PRIMARY KEY,
+                document TEXT NOT NULL,
+                source_hash TEXT NOT NULL
+            )
+        ''')
+        existing = dict(conn.execute("SELECT scheme_id, source_hash FROM scheme_documents").fetchall())
+        seen = set()
+        updates = []
+        cursor = conn.execute(f"SELECT scheme_id, {', '.join(columns)} FROM schemes")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for scheme_id, *values in rows:
+                seen.add(scheme_id)
+                row = dict(zip(columns, values))
+                digest = content_hash(f"{DOCUMENTS_VERSION}:{json.dumps(values)}")
+                if existing.get(scheme_id) == digest:
+                    stats['unchanged'] += 1
+                    continue
+                updates.append((scheme_id, json.dumps(build_scheme_document(row)), digest))
+        stale = [(scheme_id,) for scheme_id in existing if scheme_id not in seen]
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scheme_documents (scheme_id, document, source_hash) VALUES (?, ?, ?)",
+                updates
+            )
+            conn.executemany("DELETE FROM scheme_documents WHERE scheme_id = ?", stale)
+        stats.update(total=len(seen), built=len(updates), removed=len(stale))
+        logger.info(f"Scheme documents built: {stats}")
+        return stats
+    except Exception as e:
+        logger.error(f"Failed to build scheme documents: {str(e)}")
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
 
-        # Verify the data
-        cursor.execute("SELECT COUNT(*) FROM schemes")
-        row_count = cursor.fetchone()[0]
-        logger.info(f"Inserted {row_count} rows into the database")
+# Text columns indexed for keyword (BM25) search, in bm25() weight order
+FTS_COLUMNS = ['scheme_name', 'tags', 'brief_description', 'eligibility_criteria', 'benefits']
 
-        if row_count != len(df):
-            logger.warning(f"Mismatch in row count: CSV has {len(df)} rows, but database has {row_count} rows")
+def build_fts_index(db_path: str = "new_schemes.db") -> int:
+    """Build the schemes_fts FTS5 index over the schemes text columns. Returns the number of indexed rows.
 
-        # Verify table structure
-        cursor.execute("PRAGMA table_info(schemes)")
-        columns = [info[1] for info in cursor.fetchall()]
-        logger.info(f"Table columns: {columns}")
+    Each scheme is indexed under its scheme_id as the FTS rowid, with a hash of its
+    text in schemes_fts_hashes, so a reload only re-indexes changed schemes and
+    drops deleted ones.
+    """
+    logger.info(f"Building FTS5 keyword index in {db_path}")
+    stats = {'total': 0, 'indexed': 0, 'unchanged': 0, 'removed': 0}
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        columns = ', '.join(FTS_COLUMNS)
+        selected = ', '.join(f"COALESCE({column}, '')" for column in FTS_COLUMNS)
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS schemes_fts USING fts5(
+                scheme_id UNINDEXED, {columns},
+                tokenize = 'porter unicode61 remove_diacritics 2'
+            )
+        """)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schemes_fts_hashes (
+                scheme_id INTEGER PRIMARY KEY,
+                text_hash TEXT NOT NULL
+            )
+        ''')
+        existing = dict(conn.execute("SELECT scheme_id, text_hash FROM schemes_fts_hashes").fetchall())
+        seen = set()
+        updates = []
+        cursor = conn.execute(f"SELECT scheme_id, {selected} FROM schemes")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                scheme_id = row[0]
+                seen.add(scheme_id)
+                digest = content_hash(json.dumps([FTS_COLUMNS, row[1:]], ensure_ascii=False))
+                if existing.get(scheme_id) == digest:
+                    stats['unchanged'] += 1
+                    continue
+                updates.append((scheme_id, digest, row))
+        stale = [scheme_id for scheme_id in existing if scheme_id not in seen]
+        placeholders = ', '.join('?' * (len(FTS_COLUMNS) + 2))
+        with conn:
+            if not existing:
+                # Indexes built before the hashes were kept have arbitrary rowids
+                conn.execute("DELETE FROM schemes_fts")
+            conn.executemany(
+                "DELETE FROM schemes_fts WHERE rowid = ?",
+                [(scheme_id,) for scheme_id, _, _ in updates if scheme_id in existing] + [(scheme_id,) for scheme_id in stale]
+            )
+            conn.executemany(
+                f"INSERT INTO schemes_fts (rowid, scheme_id, {columns}) VALUES ({placeholders})",
+                [(row[0],) + tuple(row) for _, _, row in updates]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO schemes_fts_hashes (scheme_id, text_hash) VALUES (?, ?)",
+                [(scheme_id, digest) for scheme_id, digest, _ in updates]
+            )
+            conn.executemany("DELETE FROM schemes_fts_hashes WHERE scheme_id = ?", [(scheme_id,) for scheme_id in stale])
+        if updates or stale:
+            conn.execute("INSERT INTO schemes_fts (schemes_fts) VALUES ('optimize')")
+            conn.commit()
+        stats.update(total=len(seen), indexed=len(updates), removed=len(stale))
+        logger.info(f"Keyword index built: {stats}")
+        row_count = conn.execute("SELECT COUNT(*) FROM schemes_fts").fetchone()[0]
+        logger.info(f"Indexed {row_count} schemes for keyword search")
+        return row_count
+    except Exception as e:
+        logger.error(f"Failed to build FTS index: {str(e)}")
+        raise
+    finally:
+        if conn is not None:
+            conn.close()
 
-        return conn
+def build_state_index(db_path: str = "new_schemes.db") -> Dict[str, int]:
+    """Map every raw schemes.state value onto normalized states in scheme_state_vocabulary.
+
+    Retrieval uses it to turn a user's state into the raw spellings to filter on,
+    including the national-level values ("All India", "Central", ...).
+    """
+    logger.info(f"Building state vocabulary in {db_path}")
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        rows = []
+        for raw_state, scheme_count in conn.execute("SELECT COALESCE(state, ''), COUNT(*) FROM schemes GROUP BY 1"):
+            for state_norm in find_states(raw_state) or [normalize_state(raw_state)]:
+                rows.append((raw_state, state_norm, scheme_count))
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scheme_state_vocabulary (
+                    raw_state TEXT NOT NULL,
+                    state_norm TEXT NOT NULL,
+                    scheme_count INTEGER NOT NULL,
+                    PRIMARY KEY (raw_state, state_norm)
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_state_norm ON scheme_state_vocabulary(state_norm)")
+            conn.execute("DELETE FROM scheme_state_vocabulary")
+            conn.executemany("INSERT OR REPLACE INTO scheme_state_vocabulary VALUES (?, ?, ?)", rows)
+        stats = {'raw_values': len({row[0] for row in rows}), 'states': len({row[1] for row in rows})}
+        unrecognized = sorted({raw for raw, norm, _ in rows if not find_states(raw)})
+        if unrecognized:
+            logger.warning(f"State values not in the gazetteer: {unrecognized}")
+        logger.info(f"State vocabulary built: {stats}")
+        return stats
     except Exception as e:
-        logger.error(f"Failed to set up SQLite database: {str(e)}")
+        logger.error(f"Failed to build state vocabulary: {str(e)}")
         raise
     finally:
-        if 'conn' in locals():
+        if conn is not None:
             conn.close()
-            logger.info("Closed SQLite connection")
 
 def test_db(db_path: str = "new_schemes.db"):
     """Test the database structure and sample data."""
@@ -144,9 +660,31 @@ def test_db(db_path: str = "new_schemes.db"):
         conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load dataset.csv into SQLite and build the search indexes")
+    parser.add_argument("--csv", default="dataset.csv")
+    parser.add_argument("--db", default="new_schemes.db")
+    parser.add_argument("--atomic", action="store_true",
+                        help="Build the database and embedding store into staging copies and swap both in when done "
+                             "(for running servers)")
+    args = parser.parse_args()
     try:
-        setup_sqlite_db()
-        test_db()
+        target_db = prepare_staging_database(args.db) if args.atomic else args.db
+        target_store = prepare_staging_store(DEFAULT_STORE_DIR) if args.atomic else DEFAULT_STORE_DIR
+        # Invalidated after the swap, so the running app cannot re-cache scores of the old rows meanwhile
+        changed_ids: Optional[List[int]] = [] if args.atomic else None
+        print(f"Schemes loaded: {setup_sqlite_db(args.csv, target_db, changed_ids=changed_ids)}")
+        build_eligibility_rules(target_db)
+        build_scheme_documents(target_db)
+        build_fts_index(target_db)
+        build_state_index(target_db)
+        # Unchanged vectors are still reused from the live store
+        build_embedding_store(target_db, target_store, previous_store_dir=DEFAULT_STORE_DIR)
+        if args.atomic:
+            # Back to back, so the live store and database never stay from different builds
+            swap_in_store(target_store, DEFAULT_STORE_DIR)
+            swap_in_database(target_db, args.db)
+            invalidate_rerank_scores(changed_ids)
+        test_db(args.db)
     except Exception as e:
         print(f"Error: {str(e)}")
         logger.error(f"Main function failed: {str(e)}")
@@ -0,0 +1,238 @@
+import re
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from scheme_store import get_scheme_store
+
+logger = logging.getLogger(__name__)
+
+RULES_VERSION = 1
+
+# Multipliers for Indian amount units
+_UNITS = {
+    'k': 1e3, 'thousand': 1e3,
+    'lakh': 1e5, 'lakhs': 1e5, 'lac': 1e5, 'lacs': 1e5,
+    'crore': 1e7, 'crores': 1e7, 'cr': 1e7
+}
+_AMOUNT = r'(?:₹|rs\.?|inr|rupees)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|lakhs?|lacs?|crores?|cr)?\b'
+_MONTHLY = re.compile(r'^\s*(?:/-)?\s*(?:rupees\s*)?(?:per\s+mo|a\s+month|monthly|p\.?\s?m\b)', re.I)
+
+_INCOME_CEILING = re.compile(
+    r'income[^;]{0,160}?'
+    r'(?:does\s+not\s+exceed|do\s+not\s+exceed|should\s+not\s+exceed|shall\s+not\s+exceed|must\s+not\s+exceed|'
+    r'not\s+exceeding|not\s+more\s+than|less\s+than|below|up\s*to|within|under|'
+    r'ceiling\s+of|limit\s+of|maximum\s+of)\s*(?:of\s+)?' + _AMOUNT,
+    re.I
+)
+
+_CASTE_TERMS = {
+    'SC': re.compile(r'\bscheduled\s+castes?\b|\bsc\b', re.I),
+    'ST': re.compile(r'\bscheduled\s+tribes?\b|\bst\b', re.I),
+    'OBC': re.compile(r'\bother\s+backward\s+class(?:es)?\b|\bobcs?\b|\bbackward\s+class(?:es)?\b', re.I)
+}
+_CASTE_RESTRICTIVE = re.compile(
+    r'\bonly\b|\b(?:must|should|shall)\s+(?:belong|be\s+from|be\s+a\s+member)\b|\bbelonging\s+only\b', re.I
+)
+# Sentences that mention caste without restricting eligibility, or that open it to other groups
+_CASTE_NON_RESTRICTIVE = re.compile(
+    r'relaxation|preference|priority|reserv|also\s+eligible|%|percent|general|all\s+(?:castes|categories|communities)|'
+    r'\bews\b|economically\s+weaker|minorit|denotified|nomadic|\bbpl\b|below\s+poverty|any\s+caste|irrespective|'
+    r'\bor\s+(?:the|a|an)\s+(?:applicant|student|candidate|child)',
+    re.I
+)
+# Sentences that only apply to a sub-group or describe discretionary exceptions
+_CONDITIONAL = re.compile(
+    r'^\W*for\s|\bin\s+case\s+of\b|\bif\b|\bnote\b|exception|case-to-case|relax', re.I
+)
+
+_FEMALE_TERMS = re.compile(r'\b(?:women|woman|girls?|females?|widows?|mothers?|daughters?)\b', re.I)
+_MALE_TERMS = re.compile(r'\b(?:men|man|boys?|males?|sons?)\b', re.I)
+_GENDER_RESTRICTIVE = re.compile(
+    r'\bonly\b|\bexclusively\b|\b(?:applicant|beneficiary|candidate|student)s?\s+(?:must|should|shall)\s+be\s+(?:an?\s+)?'
+    r'(?:women|woman|girl|female|widow)', re.I
+)
+
+_AGE_RANGE = re.compile(r'(?:between|aged?|age\s+group\s+of)\s*(\d{1,2})\s*(?:-|–|to|and)\s*(\d{1,2})\s*years', re.I)
+_AGE_MIN = re.compile(
+    r'(?:minimum|at\s+least|above|not\s+less\s+than|completed)\s*(?:the\s+)?(?:age\s+(?:of\s+)?)?(\d{1,2})\s*years', re.I
+)
+_AGE_MAX = re.compile(
+    r'(?:maximum|below|not\s+more\s+than|not\s+exceed(?:ing)?|up\s*to|under|less\s+than)\s*(?:the\s+)?'
+    r'(?:age\s+(?:of\s+)?)?(\d{1,2})\s*years', re.I
+)
+
+def _to_amount(number: str, unit: Optional[str]) -> float:
+    value = float(number.replace(',', ''))
+    if unit:
+        value *= _UNITS.get(unit.lower(), 1)
+    return value
+
+def split_sentences(text: str) -> List[str]:
+    """Split free-text criteria into sentences without breaking on 'Rs.' abbreviations."""
+    parts = re.split(r'(?<![Rr][Ss])\.\s+|;\s*|\n+', text or '')
+    return [part.strip() for part in parts if part and part.strip()]
+
+def parse_income_range(text: str) -> Optional[Tuple[float, float]]:
+    """Parse an income expression into an annual (min, max) range in rupees.
+
+    Handles forms such as 'Below 2 lakhs', '2-5 lakhs', 'Above 5 lakhs',
+    'under 1 lakh', '50000' and '18,000 rupees per month'.
+    """
+    if not text:
+        return None
+    text = str(text).strip().lower()
+    range_match = re.search(
+        r'(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|lakhs?|lacs?|crores?|cr)?\s*(?:-|–|to)\s*' + _AMOUNT, text
+    )
+    amounts = list(re.finditer(_AMOUNT, text))
+    if not amounts:
+        return None
+    if range_match:
+        upper_unit = range_match.group(4)
+        low = _to_amount(range_match.group(1), range_match.group(2) or upper_unit)
+        high = _to_amount(range_match.group(3), upper_unit)
+        tail = text[range_match.end():]
+    else:
+        first = amounts[0]
+        low = high = _to_amount(first.group(1), first.group(2))
+        tail = text[first.end():]
+    if _MONTHLY.match(tail) or re.search(r'\bper\s+month\b|\bmonthly\b', text):
+        low, high = low * 12, high * 12
+    if range_match:
+        return (low, high)
+    if re.search(r'\b(?:below|under|less\s+than|up\s*to|upto|within|not\s+more\s+than|max(?:imum)?)\b|<', text):
+        return (0.0, high)
+    if re.search(r'\b(?:above|over|more\s+than|greater\s+than|min(?:imum)?|at\s+least)\b|>', text):
+        return (low, float('inf'))
+    return (low, high)
+
+def extract_rules(criteria: str) -> Dict[str, Any]:
+    """Turn free-text eligibility criteria into typed predicates.
+
+    Only restrictions stated unambiguously are extracted; anything else is left
+    for the LLM to judge. Returned keys: income_max (annual rupees), castes,
+    genders, age_min, age_max. Missing keys mean "no restriction found".
+    """
+    rules: Dict[str, Any] = {}
+    if not criteria:
+        return rules
+
+    ceilings = []
+    castes = set()
+    genders = set()
+    age_mins, age_maxes = [], []
+    for sentence in split_sentences(criteria):
+        conditional = bool(_CONDITIONAL.search(sentence))
+        for match in _INCOME_CEILING.finditer(sentence):
+            tail = sentence[match.end():]
+            if conditional or re.match(r'\s*(?:years|yrs|months|days|%|percent)', tail, re.I):
+                continue
+            amount = _to_amount(match.group(1), match.group(2))
+            if _MONTHLY.match(tail) or re.search(r'monthly|per\s+month', sentence[:match.start() + 10], re.I):
+                amount *= 12
+            if amount >= 1000:
+                ceilings.append(amount)
+        if _CASTE_RESTRICTIVE.search(sentence) and not _CASTE_NON_RESTRICTIVE.search(sentence):
+            castes.update(code for code, pattern in _CASTE_TERMS.items() if pattern.search(sentence))
+        if (_FEMALE_TERMS.search(sentence) and _GENDER_RESTRICTIVE.search(sentence)
+                and not _MALE_TERMS.search(sentence)):
+            genders.add('female')
+            if re.search(r'transgender', sentence, re.I):
+                genders.add('other')
+        if re.search(r'\bage', sentence, re.I) and not conditional:
+            for low, high in _AGE_RANGE.findall(sentence):
+                age_mins.append(int(low))
+                age_maxes.append(int(high))
+            age_mins.extend(int(value) for value in _AGE_MIN.findall(sentence))
+            age_maxes.extend(int(value) for value in _AGE_MAX.findall(sentence))
+    if ceilings:
+        # Different categories may have different ceilings; keep the most permissive one
+        rules['income_max'] = max(ceilings)
+    if castes:
+        rules['castes'] = sorted(castes)
+    if genders:
+        rules['genders'] = sorted(genders)
+    if age_mins:
+        rules['age_min'] = min(age_mins)
+    if age_maxes:
+        rules['age_max'] = max(age_maxes)
+    return rules
+
+def normalize_caste(value: Any) -> Optional[str]:
+    """Map a profile caste/category value onto SC, ST, OBC or GENERAL."""
+    text = str(value or '').strip().lower()
+    if not text:
+        return None
+    for code, pattern in _CASTE_TERMS.items():
+        if pattern.search(text):
+            return code
+    if re.search(r'\b(?:general|gen|open|oc|unreserved|forward)\b', text):
+        return 'GENERAL'
+    return None
+
+def normalize_gender(value: Any) -> Optional[str]:
+    """Map a profile gender value onto male, female or other."""
+    text = str(value or '').strip().lower()
+    if re.search(r'\b(?:female|woman|women|girl|f)\b', text):
+        return 'female'
+    if re.search(r'\b(?:male|man|men|boy|m)\b', text):
+        return 'male'
+    if re.search(r'\b(?:other|transgender|trans|non-binary)\b', text):
+        return 'other'
+    return None
+
+def evaluate_rules(rules: Dict[str, Any], profile: Dict[str, Any]) -> Optional[str]:
+    """Return a reason if the profile clearly fails the rules, otherwise None."""
+    if not rules:
+        return None
+    castes = rules.get('castes')
+    if castes:
+        caste = normalize_caste(profile.get('caste') or profile.get('category'))
+        if caste and caste not in castes:
+            return f"restricted to {'/'.join(castes)} (profile: {caste})"
+    genders = rules.get('genders')
+    if genders:
+        gender = normalize_gender(profile.get('gender'))
+        if gender in ('male', 'female') and gender not in genders:
+            return f"restricted to {'/'.join(genders)} applicants"
+    income_max = rules.get('income_max')
+    if income_max:
+        income = parse_income_range(profile.get('income', ''))
+        if income and income[0] > income_max:
+            return f"income ceiling of {income_max:,.0f} exceeded"
+    age = profile.get('age')
+    if age not in (None, ''):
+        try:
+            age = int(float(str(age).strip()))
+        except ValueError:
+            age = None
+        if age is not None:
+            if 'age_min' in rules and age < rules['age_min']:
+                return f"minimum age is {rules['age_min']}"
+            if 'age_max' in rules and age > rules['age_max']:
+                return f"maximum age is {rules['age_max']}"
+    return None
+
+def load_rules(scheme_ids: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """Load extracted rules for the given scheme ids through the shared scheme store."""
+    if not scheme_ids:
+        return {}
+    try:
+        return get_scheme_store().fetch_rules(scheme_ids)
+    except (sqlite3.Error, ValueError) as e:
+        logger.warning(f"Could not load eligibility rules: {str(e)}")
+        return {}
+
+def prune_ineligible(schemes: List[Dict[str, Any]], profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Drop schemes whose structured rules clearly exclude the profile."""
+    rules_by_id = load_rules([scheme['metadata']['scheme_id'] for scheme in schemes])
+    kept = []
+    for scheme in schemes:
+        reason = evaluate_rules(rules_by_id.get(str(scheme['metadata']['scheme_id']), {}), profile)
+        if reason:
+            logger.info(f"Pruned scheme '{scheme['metadata'].get('scheme_name')}': {reason}")
+            continue
+        kept.append(scheme)
+    logger.info(f"Eligibility rules kept {len(kept)} of {len(schemes)} schemes")
+    return kept
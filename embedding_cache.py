@@ -0,0 +1,202 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Disk hits only refresh last_access (the eviction order), so the updates are buffered
+# and written in one batch after this many hits or seconds, or with the next write
+ACCESS_FLUSH_ENTRIES = 64
+ACCESS_FLUSH_SECONDS = 30.0
+# Share of max_disk_entries evicted beyond the overflow, so the row count is not re-checked on every write
+EVICTION_HEADROOM = 0.1
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different spellings share a cache entry."""
+    return re.sub(r'\s+', ' ', str(text)).strip().lower()
+
+class QueryEmbeddingCache:
+    """Two-level (in-memory LRU + on-disk SQLite) cache of query embeddings.
+
+    Entries are keyed by the normalized query text and the embedding model name,
+    and both levels are size-bounded with least-recently-used eviction.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        db_path: Optional[str] = "query_embeddings.db",
+        max_memory_entries: int = 2048,
+        max_disk_entries: int = 50000
+    ):
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        # Rows on disk as of the last count; only re-counted when it says the cap is exceeded
+        self._disk_entries = 0
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            try:
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS query_embeddings (
+                        cache_key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                ''')
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_embeddings_access ON query_embeddings(last_access)")
+                self._conn.commit()
+                self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.warning(f"Disk embedding cache disabled ({db_path}): {str(e)}")
+                self._conn = None
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT vector FROM query_embeddings WHERE cache_key = ? AND model = ?",
+                (key, self.model_name)
+            ).fetchone()
+            if row is None:
+                return None
+            self._pending_access[key] = time.time()
+            if (len(self._pending_access) >= ACCESS_FLUSH_ENTRIES
+                    or time.monotonic() - self._last_access_flush >= ACCESS_FLUSH_SECONDS):
+                self._flush_access()
+                self._conn.commit()
+            return np.frombuffer(row[0], dtype=np.float32).copy()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk embedding cache read failed: {str(e)}")
+            return None
+
+    def _flush_access(self):
+        """Write the buffered last_access updates (the caller commits)."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE query_embeddings SET last_access = ? WHERE cache_key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        self._last_access_flush = time.monotonic()
+
+    def _disk_put(self, key: str, vector: np.ndarray):
+        if self._conn is None:
+            return
+        try:
+            self._flush_access()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (cache_key, model, vector, last_access) VALUES (?, ?, ?, ?)",
+                (key, self.model_name, vector.astype(np.float32).tobytes(), time.time())
+            )
+            # Puts follow misses, so the row is almost always new; the count is corrected before evicting
+            self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+                overflow = self._disk_entries - self.max_disk_entries
+                if overflow > 0:
+                    overflow += int(self.max_disk_entries * EVICTION_HEADROOM)
+                    deleted = self._conn.execute(
+                        "DELETE FROM query_embeddings WHERE cache_key IN "
+                        "(SELECT cache_key FROM query_embeddings ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,)
+                    ).rowcount
+                    self._disk_entries -= deleted
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk embedding cache write failed: {str(e)}")
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for a query, or None on a miss."""
+        key = self._key(query)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+            vector = self._disk_get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vector) -> np.ndarray:
+        """Store an embedding for a query in both cache levels."""
+        key = self._key(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            self._disk_put(key, vector)
+        return vector
+
+    def get_or_compute(self, query: str, encode: Callable[[str], List[float]]) -> np.ndarray:
+        """Return the cached embedding, computing and storing it on a miss."""
+        vector = self.get(query)
+        if vector is None:
+            vector = self.put(query, encode(query))
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current sizes of both levels."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                # As counted by this process (other processes sharing the file are seen at the next recount)
+                'disk_entries': self._disk_entries if self._conn is not None else 0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._flush_access()
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Disk embedding cache access times not saved: {str(e)}")
+                self._conn.close()
+                self._conn = None
+
+def create_query_cache(model_name: str) -> QueryEmbeddingCache:
+    """Create the query embedding cache configured through environment variables."""
+    db_path = os.getenv("QUERY_CACHE_PATH", "query_embeddings.db") or None
+    return QueryEmbeddingCache(
+        model_name,
+        db_path=db_path,
+        max_memory_entries=int(os.getenv("QUERY_CACHE_MEMORY_ENTRIES", "2048")),
+        max_disk_entries=int(os.getenv("QUERY_CACHE_DISK_ENTRIES", "50000"))
+    )
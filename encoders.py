@@ -0,0 +1,154 @@
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# "sentence-transformers" (PyTorch) or "onnx" (ONNX Runtime on CPU, see export_onnx_encoder.py)
+ENCODER_BACKENDS = ("sentence-transformers", "onnx")
+DEFAULT_ONNX_DIR = "onnx_encoder"
+# Written by export_onnx_encoder.py next to the model and tokenizer
+ENCODER_CONFIG_FILE = "encoder_config.json"
+
+def _read_onnx_config(model_dir: str) -> Dict[str, Any]:
+    config_path = os.path.join(model_dir, ENCODER_CONFIG_FILE)
+    if not os.path.exists(config_path):
+        logger.error(f"ONNX encoder not found in {model_dir}")
+        raise FileNotFoundError(f"ONNX encoder not found in {model_dir}; run export_onnx_encoder.py first")
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _onnx_cache_name(config: Dict[str, Any]) -> str:
+    # Quantized vectors differ slightly from the PyTorch ones, so they get their own cache entries
+    return f"{config['model']}@onnx{'-int8' if config.get('quantized') else ''}"
+
+class SentenceTransformerEncoder:
+    """The PyTorch SentenceTransformer model behind the common encoder interface."""
+
+    backend = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.cache_name = model_name
+        self._model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Union[str, Sequence[str]], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        return self._model.encode(texts, normalize_embeddings=normalize_embeddings, **kwargs)
+
+class OnnxEncoder:
+    """Encoder running an exported (optionally int8-quantized) ONNX model with ONNX Runtime.
+
+    Uses the ``tokenizers`` fast tokenizer saved with the export and the same
+    pooling as the SentenceTransformer it was exported from (CLS token for bge
+    models), so its embeddings can be used against the existing vector index.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, threads: int = 0, batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.config = _read_onnx_config(model_dir)
+        self.model_name = self.config['model']
+        self.pooling = self.config.get('pooling', 'cls')
+        if self.pooling not in ('cls', 'mean'):
+            raise ValueError(f"Unsupported pooling: {self.pooling}")
+        self.cache_name = _onnx_cache_name(self.config)
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=int(self.config.get('max_length', 512)))
+        pad_token = self.config.get('pad_token', '[PAD]')
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_path = os.path.join(model_dir, self.config['onnx_file'])
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX encoder {model_path} ({'int8' if self.config.get('quantized') else 'float32'})")
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': attention_mask,
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self._input_names})[0]
+        if self.pooling == 'cls':
+            return hidden[:, 0].astype(np.float32)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return ((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)).astype(np.float32)
+
+    def encode(self, texts: Union[str, Sequence[str]], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        """SentenceTransformer-compatible encode: a str gives one vector, a list gives a matrix."""
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if not batch:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.concatenate([
+            self._encode_batch(batch[start:start + self.batch_size])
+            for start in range(0, len(batch), self.batch_size)
+        ])
+        if normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
+
+def _backend(backend: Optional[str]) -> str:
+    backend = (backend or os.getenv("ENCODER_BACKEND", "sentence-transformers")).strip().lower()
+    if backend not in ENCODER_BACKENDS:
+        logger.error(f"Unknown ENCODER_BACKEND: {backend}")
+        raise ValueError(f"Unknown ENCODER_BACKEND: {backend}. Use one of {', '.join(ENCODER_BACKENDS)}")
+    return backend
+
+def encoder_cache_name(model_name: str, backend: Optional[str] = None, onnx_dir: Optional[str] = None) -> str:
+    """Name the query embedding cache keys on, without loading the encoder."""
+    if _backend(backend) == "onnx":
+        return _onnx_cache_name(_read_onnx_config(onnx_dir or os.getenv("ONNX_ENCODER_DIR", DEFAULT_ONNX_DIR)))
+    return model_name
+
+def create_encoder(model_name: str, backend: Optional[str] = None, onnx_dir: Optional[str] = None):
+    """Create the query encoder selected by ENCODER_BACKEND (default: sentence-transformers)."""
+    if _backend(backend) == "onnx":
+        encoder = OnnxEncoder(onnx_dir or os.getenv("ONNX_ENCODER_DIR", DEFAULT_ONNX_DIR),
+                              threads=int(os.getenv("ONNX_THREADS", "0")))
+        if encoder.model_name != model_name:
+            logger.error(f"ONNX encoder was exported from {encoder.model_name}, expected {model_name}")
+            raise ValueError(f"ONNX encoder was exported from {encoder.model_name}, expected {model_name}")
+        return encoder
+    return SentenceTransformerEncoder(model_name)
+
+def parity_report(candidate, reference, texts: Sequence[str]) -> Dict[str, float]:
+    """Cosine similarity between two encoders' normalized embeddings of the same texts."""
+    a = np.asarray(candidate.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+    b = np.asarray(reference.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+    cosines = (a * b).sum(axis=1)
+    return {
+        'texts': len(texts),
+        'min_cosine': float(cosines.min()),
+        'mean_cosine': float(cosines.mean())
+    }
+
+# Query-like sample used by the parity checks when no other texts are given
+PARITY_TEXTS = [
+    "Scholarship for SC students in Telangana with family income under 2 lakh",
+    "Financial assistance for women farmers in Maharashtra",
+    "Pension scheme for senior citizens below poverty line",
+    "Loan subsidy for unemployed youth starting a small business in Bihar",
+    "Government schemes for persons with disability. Tags: Disability, Assistive Devices.",
+    "Housing assistance for construction workers. State: All India. Eligibility: all castes.",
+    "Skill training and stipend for tribal youth in Odisha",
+    "Health insurance for families with annual income below 5 lakh",
+    "Support for fishermen during the fishing ban period in Kerala",
+    "Marriage assistance for daughters of OBC families",
+    "Fellowship for first-generation graduate students pursuing PhD",
+    "Crop insurance for small and marginal farmers"
+]
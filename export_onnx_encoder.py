@@ -0,0 +1,163 @@
+"""Export the query embedding model to ONNX for ENCODER_BACKEND=onnx.
+
+Steps:
+1. Export the transformer (last hidden state) of the SentenceTransformer model to ONNX.
+2. Dynamically quantize its weights to int8, per channel (skip with --no-quantize).
+3. Save the fast tokenizer and encoder_config.json next to it.
+4. Check parity: every sample text's ONNX embedding must have cosine
+   similarity >= --min-cosine with the PyTorch embedding, otherwise the
+   export is reported as failed (exit code 1) and encoder_config.json is
+   removed, so the failed export cannot be loaded.
+
+Usage:
+    python export_onnx_encoder.py [--model BAAI/bge-large-en-v1.5] [--output-dir onnx_encoder]
+        [--no-quantize] [--min-cosine 0.99] [--db new_schemes.db]
+"""
+import os
+import sys
+import json
+import inspect
+import sqlite3
+import logging
+import argparse
+from typing import List
+
+from encoders import (
+    DEFAULT_ONNX_DIR, ENCODER_CONFIG_FILE, PARITY_TEXTS, OnnxEncoder, SentenceTransformerEncoder, parity_report
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "BAAI/bge-large-en-v1.5"
+FLOAT_FILE = "model.onnx"
+QUANTIZED_FILE = "model_int8.onnx"
+
+def _pooling_mode(sentence_model) -> str:
+    """Pooling of the SentenceTransformer ("cls" or "mean"); the Pooling API differs across versions."""
+    if len(sentence_model) < 2:
+        return "cls"
+    pooling = sentence_model[1]
+    if hasattr(pooling, "get_pooling_mode_str"):
+        return pooling.get_pooling_mode_str()
+    return str(getattr(pooling, "pooling_mode", "cls"))
+
+def export_onnx(model_name: str, output_dir: str, opset: int = 17) -> str:
+    """Export the model's transformer to ONNX with dynamic batch and sequence axes."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    sentence_model = SentenceTransformer(model_name, device="cpu")
+    transformer = sentence_model[0]
+    tokenizer = transformer.tokenizer
+    hf_model = transformer.auto_model.eval()
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(["Scholarship for students"], return_tensors="pt")
+    float_path = os.path.join(output_dir, FLOAT_FILE)
+    axes = {0: "batch", 1: "sequence"}
+    # The TorchScript exporter takes dynamic_axes; newer torch defaults to the dynamo exporter (needs onnxscript)
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(hf_model),
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            float_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes, "last_hidden_state": axes},
+            opset_version=opset,
+            **legacy
+        )
+    tokenizer.save_pretrained(output_dir)
+    pooling = _pooling_mode(sentence_model)
+    config = {
+        "model": model_name,
+        "onnx_file": FLOAT_FILE,
+        "quantized": False,
+        "pooling": pooling,
+        "max_length": int(sentence_model.max_seq_length),
+        "pad_token": tokenizer.pad_token
+    }
+    with open(os.path.join(output_dir, ENCODER_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    logger.info(f"Exported {model_name} to {float_path} (pooling: {pooling})")
+    return float_path
+
+def quantize(output_dir: str) -> str:
+    """Int8 dynamic quantization of the exported weights; activations stay float32."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    float_path = os.path.join(output_dir, FLOAT_FILE)
+    quantized_path = os.path.join(output_dir, QUANTIZED_FILE)
+    # Per-channel weight scales keep closer parity than one scale per tensor
+    quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8, per_channel=True)
+    config_path = os.path.join(output_dir, ENCODER_CONFIG_FILE)
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(onnx_file=QUANTIZED_FILE, quantized=True)
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    logger.info(f"Quantized model written to {quantized_path} "
+                f"({os.path.getsize(float_path) / 1e6:.0f} MB -> {os.path.getsize(quantized_path) / 1e6:.0f} MB)")
+    return quantized_path
+
+def parity_texts(db_path: str, limit: int = 100) -> List[str]:
+    """Sample queries plus scheme texts (long inputs exercise truncation) when the database exists."""
+    texts = list(PARITY_TEXTS)
+    if db_path and os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT scheme_name, brief_description, eligibility_criteria FROM schemes ORDER BY RANDOM() LIMIT ?",
+                (limit,)
+            ).fetchall()
+            texts.extend(". ".join(str(value) for value in row if value) for row in rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read parity texts from {db_path}: {str(e)}")
+        finally:
+            conn.close()
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the query encoder to (quantized) ONNX and check parity")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--output-dir", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="Keep float32 weights")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Parity threshold against PyTorch")
+    parser.add_argument("--db", default="new_schemes.db", help="Also check parity on scheme texts from this database")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    export_onnx(args.model, args.output_dir, args.opset)
+    if not args.no_quantize:
+        quantize(args.output_dir)
+
+    config_path = os.path.join(args.output_dir, ENCODER_CONFIG_FILE)
+    passed = False
+    try:
+        report = parity_report(OnnxEncoder(args.output_dir), SentenceTransformerEncoder(args.model), parity_texts(args.db))
+        logger.info(f"Parity over {report['texts']} texts: min cosine {report['min_cosine']:.4f}, "
+                    f"mean {report['mean_cosine']:.4f} (threshold {args.min_cosine})")
+        passed = report['min_cosine'] >= args.min_cosine
+        if not passed:
+            logger.error(f"ONNX encoder parity below threshold: {report['min_cosine']:.4f} < {args.min_cosine}")
+    finally:
+        if not passed:
+            # Without its config the export cannot be loaded, so ENCODER_BACKEND=onnx fails loudly instead of serving it
+            os.remove(config_path)
+            logger.error(f"Removed {config_path}; the ONNX export in {args.output_dir} is not usable")
+    if not passed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import re
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from scheme_store import get_scheme_store
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Reciprocal-rank-fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+# Words that appear in every generated query (or nearly every scheme) and carry no signal
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'of', 'on', 'or', 'the',
+    'to', 'with', 'all', 'any', 'including', 'government', 'scheme', 'schemes', 'tags', 'state',
+    'eligibility', 'applicant', 'applicants', 'category', 'income', 'under', 'below', 'above', 'lakh',
+    'lakhs', 'per', 'annum', 'month', 'india', 'indian'
+}
+
+def build_match_query(text: str, max_terms: int = 24) -> Optional[str]:
+    """Turn free text into an FTS5 OR query of quoted terms.
+
+    Hyphenated words such as "post-matric" are kept as phrases. Returns None if
+    nothing searchable is left.
+    """
+    terms: List[str] = []
+    for token in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", (text or '').lower()):
+        if token in _STOPWORDS or (len(token) < 3 and token not in ('sc', 'st')) or token.isdigit():
+            continue
+        if token not in terms:
+            terms.append(token)
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms[:max_terms])
+
+def search_fts(query: str, top_k: int = 20, db_path: str = "new_schemes.db",
+               states: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """BM25 keyword search over the schemes_fts index, in the same shape as search_pinecone results.
+
+    `states` optionally restricts hits to those raw schemes.state values.
+    """
+    match_query = build_match_query(query)
+    if not match_query:
+        return []
+    with timed("keyword_search"):
+        rows = get_scheme_store(db_path).search_text(match_query, limit=top_k, states=states)
+    results = []
+    for row in rows:
+        rank = row.pop('rank')
+        row['scheme_id'] = str(row['scheme_id'])
+        row = {k: ('' if v is None else v) for k, v in row.items()}
+        results.append({'id': row['scheme_id'], 'bm25': -rank, 'metadata': row})
+    logger.info(f"Keyword search returned {len(results)} schemes")
+    return results
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[Dict[str, Any]]], top_k: int = 20,
+                           k: int = RRF_K, weights: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
+    """Fuse ranked result lists by reciprocal rank, deduplicating on scheme_id.
+
+    The first list to contain a scheme provides its entry (so dense results keep
+    their vector score); schemes found only by later lists get a score of 0.0.
+    Each fused entry carries 'fusion_score' and 'sources' (indexes of the lists
+    that returned it).
+    """
+    weights = list(weights) if weights is not None else [1.0] * len(result_lists)
+    fused: Dict[str, Dict[str, Any]] = {}
+    for list_index, (results, weight) in enumerate(zip(result_lists, weights)):
+        for rank, result in enumerate(results, start=1):
+            key = str(result['metadata'].get('scheme_id') or result['id'])
+            entry = fused.get(key)
+            if entry is None:
+                entry = dict(result)
+                entry.setdefault('score', 0.0)
+                entry['fusion_score'] = 0.0
+                entry['sources'] = []
+                fused[key] = entry
+            entry['fusion_score'] += weight / (k + rank)
+            if list_index not in entry['sources']:
+                entry['sources'].append(list_index)
+    ranked = sorted(fused.values(), key=lambda entry: entry['fusion_score'], reverse=True)
+    return ranked[:top_k]
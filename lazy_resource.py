@@ -0,0 +1,94 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class LazyResource:
+    """Thread-safe accessor that creates an expensive resource on first use.
+
+    Attribute access is forwarded to the underlying object, so a LazyResource can
+    stand in for the client it wraps (e.g. ``llm.invoke(...)``, ``index.query(...)``).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def instance(self) -> Any:
+        """Return the resource, creating it on the first call."""
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    value = self._factory()
+                except Exception as e:
+                    logger.error(f"Failed to initialize {self._name}: {str(e)}")
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self._value = value
+                self._loaded = True
+                logger.info(f"Initialized {self._name} in {self.load_seconds:.2f}s")
+        return self._value
+
+    def override(self, value: Any):
+        """Replace the resource with a ready-made object (e.g. a stand-in for benchmarks)."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+
+    def reset(self):
+        """Drop the resource so the next access recreates it."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self.load_seconds = None
+
+    def __getattr__(self, item: str) -> Any:
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self.instance(), item)
+
+    def __repr__(self) -> str:
+        return f"<LazyResource {self._name} ({'loaded' if self._loaded else 'not loaded'})>"
+
+def warmup_resources(
+    resources: Iterable[LazyResource],
+    background: bool = True,
+    after: Optional[Callable[[], None]] = None
+) -> Optional[threading.Thread]:
+    """Initialize resources now, optionally on a daemon thread so startup is not blocked."""
+    resources = list(resources)
+
+    def run():
+        start = time.perf_counter()
+        for resource in resources:
+            try:
+                resource.instance()
+            except Exception:
+                # Already logged; the request path will retry and surface the error
+                pass
+        if after is not None:
+            try:
+                after()
+            except Exception as e:
+                logger.warning(f"Warmup step failed: {str(e)}")
+        logger.info(f"Warmup finished in {time.perf_counter() - start:.2f}s")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="resource-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,315 @@
+import os
+import json
+import logging
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Store layout written by the embedding build pipeline
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+DEFAULT_STORE_DIR = "scheme_index"
+# Compact codes for the quantized backends, derived from the float32 matrix
+INT8_CODES_FILE = "embeddings_int8.npy"
+INT8_SCALES_FILE = "embeddings_int8_scales.npy"
+BINARY_CODES_FILE = "embeddings_binary.npy"
+# Build id and matrix shape the codes were derived from; swapped in after the code files
+CODES_MANIFEST_FILE = "quantized_codes.json"
+QUANTIZED_FILES = (INT8_CODES_FILE, INT8_SCALES_FILE, BINARY_CODES_FILE, CODES_MANIFEST_FILE)
+QUANTIZATIONS = ("int8", "binary")
+# Coarse matches re-scored exactly: sign bits rank far more loosely than int8 codes, so binary gets more
+DEFAULT_RESCORE_CANDIDATES = {"int8": 200, "binary": 800}
+
+# Rows processed per block when quantizing, bounding temporary float32 copies
+_BLOCK_ROWS = 8192
+# Int8 codes are widened to float32 for scoring in blocks small enough to stay in cache
+_SCORE_BLOCK_BYTES = 1 << 20
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _bit_count(packed: np.ndarray) -> np.ndarray:
+    """Set bits per row of a packed uint8 matrix."""
+    if hasattr(np, 'bitwise_count'):  # numpy >= 2.0
+        return np.bitwise_count(packed).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[packed].sum(axis=1, dtype=np.int32)
+
+def int8_scales(embeddings: np.ndarray) -> np.ndarray:
+    """Per-dimension symmetric scales mapping each column's largest magnitude to 127."""
+    peak = np.zeros(embeddings.shape[1], dtype=np.float32)
+    for start in range(0, embeddings.shape[0], _BLOCK_ROWS):
+        np.maximum(peak, np.abs(embeddings[start:start + _BLOCK_ROWS]).max(axis=0), out=peak)
+    return np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+
+def quantize_int8(vectors: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits packed 8 per byte (1 for positive components)."""
+    return np.packbits(vectors > 0, axis=-1)
+
+def write_quantized_codes(embeddings: np.ndarray, paths: Dict[str, str], build_id: str = ""):
+    """Write int8 codes, their scales and binary codes for an embedding matrix.
+
+    ``paths`` maps each name in QUANTIZED_FILES to its output path, so the
+    build pipeline can write to temporary files and swap them in. The manifest
+    records ``build_id`` (also stored in metadata.json) and the matrix shape,
+    so a reader can tell codes that belong to another build.
+    """
+    rows, dims = embeddings.shape
+    scales = int8_scales(embeddings)
+    np.lib.format.open_memmap(paths[INT8_SCALES_FILE], mode='w+', dtype=np.float32, shape=scales.shape)[:] = scales
+    int8_codes = np.lib.format.open_memmap(paths[INT8_CODES_FILE], mode='w+', dtype=np.int8, shape=(rows, dims))
+    binary_codes = np.lib.format.open_memmap(paths[BINARY_CODES_FILE], mode='w+', dtype=np.uint8,
+                                             shape=(rows, (dims + 7) // 8))
+    for start in range(0, rows, _BLOCK_ROWS):
+        block = np.asarray(embeddings[start:start + _BLOCK_ROWS], dtype=np.float32)
+        int8_codes[start:start + len(block)] = quantize_int8(block, scales)
+        binary_codes[start:start + len(block)] = quantize_binary(block)
+    int8_codes.flush()
+    binary_codes.flush()
+    with open(paths[CODES_MANIFEST_FILE], 'w', encoding='utf-8') as f:
+        json.dump({'build_id': build_id, 'rows': rows, 'dims': dims}, f)
+    logger.info(f"Wrote int8 and binary codes for {rows} x {dims} embeddings")
+
+def _file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+class LocalVectorIndex:
+    """In-process vector index over a memory-mapped scheme embedding matrix.
+
+    Exposes the subset of the Pinecone ``Index.query`` API used by
+    ``search_pinecone`` so the two backends are interchangeable.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        embeddings_path = os.path.join(store_dir, EMBEDDINGS_FILE)
+        metadata_path = os.path.join(store_dir, METADATA_FILE)
+        if not os.path.exists(embeddings_path) or not os.path.exists(metadata_path):
+            logger.error(f"Local vector store not found in {store_dir}")
+            raise FileNotFoundError(f"Local vector store not found in {store_dir}")
+
+        # Memory-map the matrix so every worker shares the same page cache
+        self.embeddings = np.load(embeddings_path, mmap_mode='r')
+        # Taken before reading, so a store swapped in meanwhile is seen as replaced
+        self._metadata_signature = _file_signature(metadata_path)
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            store = json.load(f)
+        self.model_name = store.get('model', '')
+        # Stamped on every build; stores written before build ids existed have none
+        self.build_id = store.get('build_id', '')
+        self.items = store.get('items', [])
+        if self.embeddings.ndim != 2 or self.embeddings.shape[0] != len(self.items):
+            logger.error(f"Embedding matrix shape {self.embeddings.shape} does not match {len(self.items)} metadata items")
+            raise ValueError("Embedding matrix and metadata are out of sync")
+        self._mask_cache: Dict[str, np.ndarray] = {}
+        logger.info(f"Loaded local vector index with {len(self.items)} schemes from {store_dir}")
+
+    def store_replaced(self) -> bool:
+        """True once the store's metadata file has been replaced (e.g. by an --atomic rebuild)."""
+        return _file_signature(os.path.join(self.store_dir, METADATA_FILE)) != self._metadata_signature
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Return indices of the top_k scores in descending order."""
+        top_k = min(top_k, scores.shape[0])
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if top_k < scores.shape[0]:
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(scores.shape[0])
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Boolean mask of items whose metadata satisfies a Pinecone-style filter.
+
+        Supports {"field": value}, {"field": {"$eq": value}}, {"field": {"$in": [...]}}
+        and {"field": {"$nin": [...]}}, with all conditions ANDed.
+        """
+        mask = np.ones(len(self.items), dtype=bool)
+        for field, condition in filter.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op == "$eq":
+                    allowed = lambda value: value == operand
+                elif op == "$in":
+                    operand_set = set(operand)
+                    allowed = lambda value: value in operand_set
+                elif op == "$nin":
+                    operand_set = set(operand)
+                    allowed = lambda value: value not in operand_set
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                mask &= np.fromiter(
+                    (allowed(item.get('metadata', {}).get(field)) for item in self.items),
+                    dtype=bool, count=len(self.items)
+                )
+        return mask
+
+    def _cached_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        # Users of one state repeat the same filter, so masks are memoized
+        key = json.dumps(filter, sort_keys=True, default=str)
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = self._filter_mask(filter)
+            if len(self._mask_cache) >= 256:
+                self._mask_cache.clear()
+            self._mask_cache[key] = mask
+        return mask
+
+    def _rank(self, query_vector: np.ndarray, mask: Optional[np.ndarray], top_k: int):
+        """Return (indices, scores) of the best top_k items allowed by mask, best first."""
+        scores = self.embeddings @ query_vector
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        indices = self._top_k(scores, top_k)
+        return indices, scores[indices]
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 20,
+        include_metadata: bool = True,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Score a normalized query vector against all schemes (cosine via dot product).
+
+        An optional metadata filter restricts the candidates before ranking.
+        """
+        query_vector = np.asarray(vector, dtype=np.float32)
+        if query_vector.shape[0] != self.embeddings.shape[1]:
+            raise ValueError(f"Query dimension {query_vector.shape[0]} does not match index dimension {self.embeddings.shape[1]}")
+        mask = None
+        if filter:
+            mask = self._cached_mask(filter)
+            top_k = min(top_k, int(mask.sum()))
+        indices, scores = self._rank(query_vector, mask, top_k)
+        matches = []
+        for idx, score in zip(indices, scores):
+            item = self.items[int(idx)]
+            match = {'id': str(item['id']), 'score': float(score)}
+            if include_metadata:
+                match['metadata'] = item.get('metadata', {})
+            matches.append(match)
+        return {'matches': matches}
+
+class QuantizedVectorIndex(LocalVectorIndex):
+    """LocalVectorIndex that searches compact codes and re-scores a shortlist exactly.
+
+    ``quantization`` is "int8" (per-dimension scaled codes, 4x smaller) or
+    "binary" (sign bits compared by Hamming distance, 32x smaller). The codes
+    are held in memory; the best ``rescore_candidates`` coarse matches
+    (default: DEFAULT_RESCORE_CANDIDATES for the quantization) are then
+    re-scored against the float32 matrix, which stays memory-mapped so only
+    the shortlisted rows are paged in.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR, quantization: str = "int8",
+                 rescore_candidates: Optional[int] = None):
+        if quantization not in QUANTIZATIONS:
+            logger.error(f"Unknown quantization: {quantization}")
+            raise ValueError(f"Unknown quantization: {quantization}. Use one of {', '.join(QUANTIZATIONS)}")
+        super().__init__(store_dir)
+        self.quantization = quantization
+        self.rescore_candidates = rescore_candidates or DEFAULT_RESCORE_CANDIDATES[quantization]
+        self.scales: Optional[np.ndarray] = None
+        # The manifest is swapped in last, so reading it first means the codes are at least as new
+        current = self._codes_match_store()
+        if quantization == "int8":
+            self.codes = self._load_codes(INT8_CODES_FILE, np.int8)
+            self.scales = self._load_codes(INT8_SCALES_FILE, np.float32)
+        else:
+            self.codes = self._load_codes(BINARY_CODES_FILE, np.uint8)
+        expected = (len(self.items), self.embeddings.shape[1] if quantization == "int8" else (self.embeddings.shape[1] + 7) // 8)
+        if not current or self.codes.shape != expected or (
+                self.scales is not None and self.scales.shape != (self.embeddings.shape[1],)):
+            logger.warning(f"{quantization} codes in {store_dir} are missing or out of date, re-quantizing in memory")
+            self.codes, self.scales = self._quantize_in_memory()
+        logger.info(f"Loaded {quantization} codes ({self.codes_nbytes / 1e6:.1f} MB) for {len(self.items)} schemes")
+
+    def _codes_match_store(self) -> bool:
+        """True if the codes manifest names this store's build and matrix shape."""
+        try:
+            with open(os.path.join(self.store_dir, CODES_MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (bool(self.build_id) and manifest.get('build_id') == self.build_id
+                and (manifest.get('rows'), manifest.get('dims')) == tuple(self.embeddings.shape))
+
+    def _load_codes(self, filename: str, dtype) -> Optional[np.ndarray]:
+        path = os.path.join(self.store_dir, filename)
+        if not os.path.exists(path):
+            return np.empty((0, 0), dtype=dtype)
+        # Read fully into memory: the codes are what every query scans
+        return np.load(path)
+
+    def _quantize_in_memory(self):
+        if self.quantization == "int8":
+            scales = int8_scales(self.embeddings)
+            blocks = [quantize_int8(np.asarray(self.embeddings[start:start + _BLOCK_ROWS]), scales)
+                      for start in range(0, len(self.items), _BLOCK_ROWS)]
+        else:
+            scales = None
+            blocks = [quantize_binary(np.asarray(self.embeddings[start:start + _BLOCK_ROWS]))
+                      for start in range(0, len(self.items), _BLOCK_ROWS)]
+        return np.concatenate(blocks) if blocks else self.codes, scales
+
+    @property
+    def codes_nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def coarse_scores(self, query_vector: np.ndarray) -> np.ndarray:
+        """Approximate similarity of every item to the query, from the codes alone."""
+        scores = np.empty(len(self.items), dtype=np.float32)
+        if self.quantization == "int8":
+            # Fold the scales into the query instead of dequantizing the codes
+            scaled_query = query_vector * self.scales
+            block_rows = max(1, _SCORE_BLOCK_BYTES // (4 * self.codes.shape[1]))
+            for start in range(0, len(self.items), block_rows):
+                block = self.codes[start:start + block_rows]
+                scores[start:start + len(block)] = block.astype(np.float32) @ scaled_query
+        else:
+            query_bits = quantize_binary(query_vector)
+            dims = self.embeddings.shape[1]
+            for start in range(0, len(self.items), _BLOCK_ROWS):
+                block = self.codes[start:start + _BLOCK_ROWS]
+                # Matching sign bits minus mismatching ones
+                scores[start:start + len(block)] = dims - 2 * _bit_count(np.bitwise_xor(block, query_bits))
+        return scores
+
+    def _rank(self, query_vector: np.ndarray, mask: Optional[np.ndarray], top_k: int):
+        coarse = self.coarse_scores(query_vector)
+        if mask is not None:
+            coarse = np.where(mask, coarse, -np.inf)
+        shortlist = self._top_k(coarse, max(top_k, self.rescore_candidates))
+        if mask is not None:
+            shortlist = shortlist[mask[shortlist]]
+        # Sorted row order turns the gather from the memory-mapped matrix into forward reads
+        shortlist = np.sort(shortlist)
+        exact = np.asarray(self.embeddings[shortlist]) @ query_vector
+        order = self._top_k(exact, top_k)
+        return shortlist[order], exact[order]
+
+def load_local_index(store_dir: Optional[str] = None, quantization: Optional[str] = None) -> LocalVectorIndex:
+    """Load the local vector index from the configured store directory.
+
+    With a quantization ("int8" or "binary") the index searches compact codes
+    and re-scores the best LOCAL_RESCORE_CANDIDATES (int8) or
+    LOCAL_RESCORE_CANDIDATES_BINARY (binary) matches exactly.
+    """
+    store_dir = store_dir or os.getenv("LOCAL_INDEX_DIR", DEFAULT_STORE_DIR)
+    if quantization:
+        variable = "LOCAL_RESCORE_CANDIDATES_BINARY" if quantization == "binary" else "LOCAL_RESCORE_CANDIDATES"
+        default = DEFAULT_RESCORE_CANDIDATES.get(quantization, DEFAULT_RESCORE_CANDIDATES["int8"])
+        return QuantizedVectorIndex(store_dir, quantization, rescore_candidates=int(os.getenv(variable, str(default))))
+    return LocalVectorIndex(store_dir)
@@ -3,7 +3,7 @@ import json
 import logging
 from typing import Dict, List
 from profile_agent import get_user_profile_via_chat
-from scheme_search_agent import search_schemes
+from scheme_search_agent import search_schemes, warmup
 from scheme_display_agent import SchemeDisplayAgent
 
 # Logging setup: Console shows only ERROR, file captures all
@@ -45,6 +45,8 @@ def run_conversational_chatbot():
     """Orchestrates the multi-turn conversational chatbot workflow."""
     print("Welcome to the Government Scheme Finder Chatbot! 🌟")
     logger.info("Starting the chatbot workflow")
+    # Load the search models while the user is answering profile questions
+    warmup(background=True)
 
     # Step 1: Collect user profile
     print("\nFirst, let’s get to know you a bit. I need your name, state, gender, caste, occupation, category (like SC/ST/OBC), and income.")
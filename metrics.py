@@ -0,0 +1,164 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Set METRICS_ENABLED=0 to turn every recording call into a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+# Latency buckets (seconds) spanning SQLite lookups to multi-second LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram; observing is one bisect and three additions under a lock."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: ([*v[0]], v[1], v[2]) for k, v in self._series.items()}
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                labels = _format_labels(self.labels, label_values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {count}")
+        return lines
+
+STAGE_SECONDS = Histogram("scheme_saathi_stage_seconds", "Latency of pipeline stages", ("stage",))
+STAGE_ERRORS = Counter("scheme_saathi_stage_errors_total", "Stages that raised an exception", ("stage",))
+LLM_CALLS = Counter("scheme_saathi_llm_calls_total", "LLM calls by pipeline stage", ("stage",))
+LLM_TOKENS = Counter("scheme_saathi_llm_tokens_total", "LLM tokens by pipeline stage and type", ("stage", "type"))
+EVENTS = Counter("scheme_saathi_events_total", "Notable events (fallbacks, timeouts, rejections)", ("event",))
+
+_METRICS = [STAGE_SECONDS, STAGE_ERRORS, LLM_CALLS, LLM_TOKENS, EVENTS]
+# Gauges computed at scrape time: name -> (help, callback returning {label value: number}, label name)
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[str, float]], str]] = {}
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the duration of the block under `stage`, counting an error if it raises an Exception
+    (cancellation and GeneratorExit are timed but not errors)."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+def record_llm_response(stage: str, response: Any):
+    """Count one LLM call and its token usage, as reported by ChatGroq's response metadata."""
+    if not METRICS_ENABLED:
+        return
+    LLM_CALLS.inc(stage)
+    usage: Optional[Dict[str, Any]] = None
+    metadata = getattr(response, 'response_metadata', None) or {}
+    if isinstance(metadata, dict):
+        usage = metadata.get('token_usage')
+    if not usage:
+        usage_metadata = getattr(response, 'usage_metadata', None) or {}
+        if usage_metadata:
+            usage = {'prompt_tokens': usage_metadata.get('input_tokens', 0),
+                     'completion_tokens': usage_metadata.get('output_tokens', 0)}
+    if usage:
+        LLM_TOKENS.inc(stage, "prompt", amount=float(usage.get('prompt_tokens') or 0))
+        LLM_TOKENS.inc(stage, "completion", amount=float(usage.get('completion_tokens') or 0))
+
+def record_event(event: str, amount: float = 1.0):
+    EVENTS.inc(event, amount=amount)
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], Dict[str, float]], label: str = "source"):
+    """Expose values computed on every scrape (e.g. cache hit ratios from a stats() method)."""
+    _gauges[name] = (help_text, callback, label)
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for name, (help_text, callback, label) in sorted(_gauges.items()):
+        try:
+            values = callback()
+        except Exception as e:
+            logger.warning(f"Metrics gauge {name} failed: {str(e)}")
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for label_value, value in sorted(values.items()):
+            lines.append(f'{name}{{{label}="{_escape(label_value)}"}} {float(value):g}')
+    return "\n".join(lines) + "\n"
@@ -8,6 +8,8 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import Runnable
 from langchain_groq import ChatGroq
 
+from profile_extractor import REQUIRED_FIELDS, extract_profile_fields, validate_field
+
 # Logging setup
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -18,27 +20,21 @@ llm = ChatGroq(
     api_key="Your Groq api key here"
 )
 
-# Define prompt to extract user details
+# Define prompt to collect the fields the local extractor could not resolve
 prompt = ChatPromptTemplate.from_template("""
-You're a friendly chatbot helg collect user details for government scheme recommendations.
+You're a friendly chatbot helping collect user details for government scheme recommendations.
+
+Already collected: {known_fields}
+Still missing: {missing_fields}
 
 Instructions:
-- Ask questions one by one conversationally to collect: name, state, gender, caste, occupation, category (like SC/ST/OBC), income.
-- Be warm and friendly.
-- At the end, respond with a JSON like:
-{{
-    "name": "...",
-    "state": "...",
-    "gender": "...",
-    "caste": "...",
-    "occupation": "...",
-    "category": "...",
-    "income": "...",
-    "additional_details": "..."  # optional
-}}
-
-Conversation so far:
-{chat_history}
+- Pick up any of the missing fields from the user's latest message.
+- Then warmly ask for the next missing field, one question at a time.
+- End your reply with a JSON object containing only the missing fields you could fill, like:
+{{"field": "value"}}
+  Use {{}} if the message did not contain any of them.
+
+Bot's previous message: {last_bot_message}
 User: {user_input}
 Bot:
 """)
@@ -67,18 +63,32 @@ def extract_json(text: str) -> Dict[str, Optional[str]]:
             return {}
     return {}
 
+# Canned follow-up questions used when the extractor already handled the turn
+FIELD_QUESTIONS = {
+    "name": "What's your name?",
+    "state": "Which state do you live in?",
+    "gender": "What's your gender?",
+    "caste": "Which caste category do you belong to (SC/ST/OBC/General)?",
+    "category": "Which category do you belong to (SC/ST/OBC/General)?",
+    "occupation": "What do you do for a living (e.g. student, farmer, self-employed)?",
+    "income": "What's your annual family income (e.g. 'under 1 lakh' or '50000')?"
+}
+
+def strip_json(text: str) -> str:
+    return re.sub(r"\{.*\}", "", text, flags=re.DOTALL).strip()
+
 def collect_user_info():
     print("👋 Welcome to the Government Scheme Finder chatbot!")
     print("Let's get to know you. You can say something like: 'I'm Priya from Tamil Nadu, my income is under 1 lakh.'")
 
-    chat_history = ""
+    last_bot_message = ""
+    expected_field: Optional[str] = None
     additional_info_phase = False
     awaiting_additional_confirmation = False
 
     while True:
         # Check for missing required fields
-        required_fields = ["name", "state", "gender", "caste", "occupation", "category", "income"]
-        missing_fields = [field for field in required_fields if not user_info.get(field)]
+        missing_fields = [field for field in REQUIRED_FIELDS if not user_info.get(field)]
 
         # If all required fields are collected and not already asking for additional details
         if not missing_fields and not additional_info_phase and not awaiting_additional_confirmation:
@@ -112,15 +122,38 @@ def collect_user_info():
                 print("Bot: Please say 'yes' or 'no' (or something like 'not' or 'I don’t want to') to let me know if you want to add more details.")
                 continue
 
-        # Normal LLM interaction for required fields
+        # Required fields: try the local extractor first, fall back to the LLM
         if missing_fields:
-            response = chain.invoke({"user_input": user_input, "chat_history": chat_history})
-            chat_history += f"\nUser: {user_input}\nBot: {response}"
-            # Parse JSON response
-            json_data = extract_json(response)
-            if json_data:
-                user_info.update({k: v for k, v in json_data.items() if v})
-            print(f"Bot: {response.strip()}")
+            extracted = extract_profile_fields(user_input, missing_fields, expected=expected_field)
+            user_info.update(extracted)
+            missing_fields = [field for field in REQUIRED_FIELDS if not user_info.get(field)]
+            if extracted:
+                logger.info(f"Extracted {sorted(extracted)} without an LLM call")
+                if not missing_fields:
+                    continue
+                expected_field = missing_fields[0]
+                last_bot_message = f"Got it! {FIELD_QUESTIONS[expected_field]}"
+                print(f"Bot: {last_bot_message}")
+                continue
+
+            known_fields = {field: user_info[field] for field in REQUIRED_FIELDS if user_info.get(field)}
+            response = chain.invoke({
+                "known_fields": json.dumps(known_fields) if known_fields else "nothing yet",
+                "missing_fields": ", ".join(missing_fields),
+                "last_bot_message": last_bot_message or "(none)",
+                "user_input": user_input
+            })
+            # Only accept values for missing fields that pass the same checks as the extractor
+            for field, value in extract_json(response).items():
+                if field in missing_fields:
+                    value = validate_field(field, value)
+                    if value:
+                        user_info[field] = value
+            missing_fields = [field for field in REQUIRED_FIELDS if not user_info.get(field)]
+            expected_field = missing_fields[0] if missing_fields else None
+            last_bot_message = strip_json(response) or (FIELD_QUESTIONS[expected_field] if expected_field else "")
+            if last_bot_message:
+                print(f"Bot: {last_bot_message}")
 
     # Save to file
     with open("user_details.json", "w") as f:
@@ -0,0 +1,73 @@
+import re
+import json
+import hashlib
+from typing import Any, Dict
+
+from eligibility_rules import parse_income_range
+from profile_extractor import find_caste, find_gender, find_occupation, find_state
+
+# Fields that shape the search query and ranking; the user's name deliberately is not one of them
+CANONICAL_FIELDS = ('state', 'gender', 'caste', 'occupation', 'income', 'additional_details')
+
+def _clean(value: Any) -> str:
+    return re.sub(r'\s+', ' ', str(value or '')).strip()
+
+def canonical_profile(user_details: Dict[str, Any]) -> Dict[str, str]:
+    """Normalize a profile so equivalent spellings ("tamilnadu", "Tamil Nadu ") compare equal."""
+    state = _clean(user_details.get('state'))
+    gender = _clean(user_details.get('gender'))
+    caste = _clean(user_details.get('caste') or user_details.get('category'))
+    category = _clean(user_details.get('category'))
+    occupation = _clean(user_details.get('occupation'))
+    return {
+        'state': find_state(state) or state.title(),
+        'gender': find_gender(gender) or gender.title(),
+        # A sub-caste in `caste` ("Madiga") still maps through a reservation `category` ("SC")
+        'caste': find_caste(caste) or find_caste(category) or caste.upper(),
+        'occupation': find_occupation(occupation) or occupation.title(),
+        'income': _clean(user_details.get('income')).lower(),
+        'additional_details': _clean(user_details.get('additional_details')).lower()
+    }
+
+def profile_key(user_details: Dict[str, Any]) -> str:
+    """Stable hash of the canonical profile, used as a cache key."""
+    payload = json.dumps(canonical_profile(user_details), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# Upper bounds (annual INR) of the income brackets used for recommendation caching; they
+# follow the limits schemes most often use (1, 2.5, 5 and 8 lakh)
+INCOME_BRACKETS = (100000, 250000, 500000, 800000)
+
+def income_bracket(income: Any) -> str:
+    """Map a free-text income onto a bracket label such as "1L-2.5L" or "8L+".
+
+    The upper end of a stated range decides the bracket; text that cannot be
+    parsed is kept (normalized) as its own bracket.
+    """
+    text = _clean(income).lower()
+    income_range = parse_income_range(text) if text else None
+    if not income_range:
+        return text
+    low, high = income_range
+    open_ended = high == float('inf')
+    lower = 0
+    for upper in INCOME_BRACKETS:
+        # "Above 5 lakh" lies strictly above its stated amount
+        if (low < upper) if open_ended else (high <= upper):
+            return f"{_lakh(lower)}-{_lakh(upper)}" if lower else f"under {_lakh(upper)}"
+        lower = upper
+    return f"{_lakh(lower)}+"
+
+def _lakh(amount: float) -> str:
+    return f"{amount / 100000:g}L"
+
+def recommendation_key(user_details: Dict[str, Any]) -> str:
+    """Cache key for full recommendation results: the canonical profile with income bucketed.
+
+    Profiles that differ only in spelling, case, caste/category aliases or
+    income within a bracket share a key.
+    """
+    profile = canonical_profile(user_details)
+    profile['income'] = income_bracket(user_details.get('income'))
+    payload = json.dumps(profile, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
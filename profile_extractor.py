@@ -0,0 +1,276 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+from eligibility_rules import parse_income_range
+
+# Canonical state/UT names with the spellings users commonly type
+STATE_ALIASES: Dict[str, List[str]] = {
+    "Andhra Pradesh": ["andhra pradesh", "andhra"],
+    "Arunachal Pradesh": ["arunachal pradesh", "arunachal"],
+    "Assam": ["assam"],
+    "Bihar": ["bihar"],
+    "Chhattisgarh": ["chhattisgarh", "chattisgarh", "chhatisgarh"],
+    "Goa": ["goa"],
+    "Gujarat": ["gujarat"],
+    "Haryana": ["haryana"],
+    "Himachal Pradesh": ["himachal pradesh", "himachal"],
+    "Jharkhand": ["jharkhand"],
+    "Karnataka": ["karnataka"],
+    "Kerala": ["kerala", "keralam"],
+    "Madhya Pradesh": ["madhya pradesh"],
+    "Maharashtra": ["maharashtra"],
+    "Manipur": ["manipur"],
+    "Meghalaya": ["meghalaya"],
+    "Mizoram": ["mizoram"],
+    "Nagaland": ["nagaland"],
+    "Odisha": ["odisha", "orissa"],
+    "Punjab": ["punjab"],
+    "Rajasthan": ["rajasthan"],
+    "Sikkim": ["sikkim"],
+    "Tamil Nadu": ["tamil nadu", "tamilnadu"],
+    "Telangana": ["telangana", "telengana"],
+    "Tripura": ["tripura"],
+    "Uttar Pradesh": ["uttar pradesh"],
+    "Uttarakhand": ["uttarakhand", "uttaranchal"],
+    "West Bengal": ["west bengal", "bengal"],
+    "Andaman and Nicobar Islands": ["andaman and nicobar islands", "andaman and nicobar", "andaman"],
+    "Chandigarh": ["chandigarh"],
+    "Dadra and Nagar Haveli and Daman and Diu": [
+        "dadra and nagar haveli and daman and diu", "dadra and nagar haveli", "daman and diu"
+    ],
+    "Delhi": ["delhi", "new delhi", "nct of delhi", "nct delhi", "national capital territory of delhi"],
+    "Jammu and Kashmir": ["jammu and kashmir", "jammu & kashmir", "j&k", "kashmir"],
+    "Ladakh": ["ladakh"],
+    "Lakshadweep": ["lakshadweep"],
+    "Puducherry": ["puducherry", "pondicherry"],
+}
+
+# Scheme "state" values that mean the scheme is open nationwide
+NATIONAL_LEVEL = "All India"
+NATIONAL_ALIASES: List[str] = [
+    "all india", "all-india", "pan india", "pan-india", "nationwide", "central government", "central govt",
+    "union government", "government of india"
+]
+# Words that only mean nationwide as the whole value: "Centre" is national, "Central Institute ..." or
+# "National Capital Territory of Delhi" is not
+NATIONAL_WHOLE_VALUES = {"national", "central", "centre", "center"}
+
+CASTE_ALIASES: Dict[str, List[str]] = {
+    "SC": ["scheduled caste", "scheduled castes", "sc", "dalit"],
+    "ST": ["scheduled tribe", "scheduled tribes", "st", "tribal", "adivasi"],
+    "OBC": ["other backward class", "other backward classes", "other backward caste", "backward class",
+            "backward caste", "most backward class", "obc", "bc", "mbc", "sebc"],
+    "General": ["general", "gen", "open category", "oc", "unreserved", "forward caste"],
+}
+
+GENDER_ALIASES: Dict[str, List[str]] = {
+    "Female": ["female", "woman", "women", "girl", "lady", "f"],
+    "Male": ["male", "man", "men", "boy", "gentleman", "m"],
+    "Other": ["transgender", "non-binary", "nonbinary", "other gender", "third gender"],
+}
+
+OCCUPATIONS: List[str] = [
+    "software engineer", "software intern", "government employee", "private employee", "daily wage worker",
+    "construction worker", "domestic worker", "street vendor", "self-employed", "self employed",
+    "student", "farmer", "fisherman", "fisherwoman", "teacher", "unemployed", "labourer", "laborer",
+    "business owner", "businessman", "entrepreneur", "artisan", "weaver", "driver", "housewife",
+    "homemaker", "retired", "engineer", "doctor", "nurse", "intern", "shopkeeper", "tailor", "carpenter",
+    "electrician", "plumber", "mechanic", "researcher", "athlete", "artist",
+]
+
+REQUIRED_FIELDS = ["name", "state", "gender", "caste", "occupation", "category", "income"]
+
+_NAME_STOPWORDS = {
+    "a", "an", "the", "from", "and", "in", "of", "my", "is", "am", "living", "working", "looking",
+    "here", "not", "very", "also", "currently", "studying"
+}
+# Words that mark an "I am ..." phrase as a description rather than a name ("I am poor", "I am earning ...")
+_NOT_NAME_WORDS = {
+    "earning", "earn", "earns", "making", "getting", "paid", "salaried", "income", "salary", "under", "below",
+    "above", "over", "less", "more", "than", "around", "about", "poor", "rich", "broke", "jobless", "needy",
+    "married", "unmarried", "single", "widow", "widowed", "divorced", "disabled", "handicapped", "blind", "deaf",
+    "orphan", "old", "young", "aged", "years", "year", "fine", "good", "ok", "okay", "well", "happy", "sad",
+    "sure", "sorry", "interested", "eligible", "going", "trying", "planning", "applying", "searching"
+}
+_INCOME_CONTEXT = re.compile(
+    r'income|earn|salary|stipend|lakh|lac|crore|rupees|\brs\b|₹|per\s+month|per\s+annum|a\s+year|monthly|annual', re.I
+)
+_INCOME_PHRASE = re.compile(
+    r'(?:(?:under|below|less\s+than|above|over|more\s+than|up\s*to|upto|around|about|approx(?:imately)?)\s+)?'
+    r'(?:₹|rs\.?\s*|inr\s*)?\d[\d,]*(?:\.\d+)?\s*(?:-|to)?\s*(?:\d[\d,]*(?:\.\d+)?)?\s*'
+    r'(?:k|thousand|lakhs?|lacs?|crores?)?\b(?:\s*(?:rupees|rs))?'
+    r'(?:\s*(?:per\s+month|a\s+month|monthly|per\s+annum|per\s+year|a\s+year|annually|yearly))?',
+    re.I
+)
+
+def _alias_pattern(alias: str) -> re.Pattern:
+    return re.compile(r'(?<![\w&])' + re.escape(alias) + r'(?![\w&])', re.I)
+
+def _token_pattern(alias: str) -> re.Pattern:
+    # Short aliases must be standalone tokens: "B.Sc" does not contain SC
+    if len(alias) > 3:
+        return _alias_pattern(alias)
+    return re.compile(r'(?<![\w.&])' + re.escape(alias) + r'(?![\w&]|\.\w)', re.I)
+
+def _build_lookup(aliases: Dict[str, List[str]], pattern=_alias_pattern):
+    # Longest aliases first so "west bengal" wins over "bengal"
+    pairs = [(alias, canonical) for canonical, names in aliases.items() for alias in names]
+    pairs.sort(key=lambda pair: len(pair[0]), reverse=True)
+    return [(pattern(alias), canonical) for alias, canonical in pairs]
+
+_STATE_LOOKUP = _build_lookup(STATE_ALIASES)
+_CASTE_LOOKUP = _build_lookup(CASTE_ALIASES, pattern=_token_pattern)
+_GENDER_LOOKUP = _build_lookup(GENDER_ALIASES)
+_OCCUPATION_LOOKUP = [(_alias_pattern(o), o.title()) for o in sorted(OCCUPATIONS, key=len, reverse=True)]
+
+def _lookup(text: str, table) -> Optional[str]:
+    for pattern, canonical in table:
+        if pattern.search(text):
+            return canonical
+    return None
+
+def find_state(text: str) -> Optional[str]:
+    """Return the canonical Indian state/UT named in text, if any."""
+    return _lookup(text, _STATE_LOOKUP)
+
+# States first, so "National Capital Territory of Delhi" is taken as Delhi before any national alias
+_STATE_LEVEL_LOOKUP = _STATE_LOOKUP + _build_lookup({NATIONAL_LEVEL: NATIONAL_ALIASES})
+
+def find_states(text: str) -> List[str]:
+    """Return every canonical state/UT (or NATIONAL_LEVEL) named in text, in lookup order.
+
+    Matched spans are blanked out so "West Bengal" is not counted again as "Bengal".
+    """
+    if re.sub(r'[^a-z]+', ' ', str(text or '').lower()).strip() in NATIONAL_WHOLE_VALUES:
+        return [NATIONAL_LEVEL]
+    found: List[str] = []
+    remaining = text or ""
+    for pattern, canonical in _STATE_LEVEL_LOOKUP:
+        if pattern.search(remaining):
+            remaining = pattern.sub(" ", remaining)
+            if canonical not in found:
+                found.append(canonical)
+    return found
+
+def normalize_state(value: str) -> str:
+    """Canonical form of a state/level value; unknown values are whitespace-normalized and title-cased."""
+    states = find_states(value)
+    if states:
+        return states[0]
+    return re.sub(r'\s+', ' ', str(value or '')).strip().title()
+
+def find_caste(text: str) -> Optional[str]:
+    """Return SC, ST, OBC or General if the text names a caste category."""
+    return _lookup(text, _CASTE_LOOKUP)
+
+def find_gender(text: str) -> Optional[str]:
+    """Return Male, Female or Other if the text states a gender."""
+    # Single-letter aliases only count as a whole answer ("M", "F")
+    stripped = text.strip().lower()
+    if stripped in ("m", "f"):
+        return "Male" if stripped == "m" else "Female"
+    table = [(p, c) for p, c in _GENDER_LOOKUP if p.pattern not in (_alias_pattern("m").pattern, _alias_pattern("f").pattern)]
+    return _lookup(text, table)
+
+def find_occupation(text: str) -> Optional[str]:
+    """Return a known occupation mentioned in text."""
+    return _lookup(text, _OCCUPATION_LOOKUP)
+
+def find_income(text: str, expected: bool = False) -> Optional[str]:
+    """Return the income expression in text (e.g. 'under 1 lakh', '18,000 per month').
+
+    Bare numbers only count when the text talks about income or the bot just asked for it.
+    """
+    if not expected and not _INCOME_CONTEXT.search(text):
+        return None
+    for match in _INCOME_PHRASE.finditer(text):
+        phrase = match.group(0).strip()
+        if not re.search(r'\d', phrase):
+            continue
+        # Ignore ages and years ("22 years old", "class 12") that happen to be numbers
+        tail = text[match.end():match.end() + 12].lower()
+        if re.match(r'\s*(?:years?|yrs?|yo\b|th\b|st\b|nd\b|rd\b)', tail):
+            continue
+        if parse_income_range(phrase) is not None:
+            return phrase
+    return None
+
+def find_name(text: str, expected: bool = False) -> Optional[str]:
+    """Return the user's name from phrases like "I'm Priya" or "my name is Ravi Kumar"."""
+    match = re.search(r"\b(?:my\s+name\s+is|name\s*[:\-]|i\s+am|i'm|im|this\s+is|call\s+me)\s+([a-z][a-z.]*(?:\s+[a-z][a-z.]*){0,2})",
+                      text, re.I)
+    if match:
+        candidate = match.group(1)
+    elif expected and re.fullmatch(r"\s*[a-z][a-z.]*(?:\s+[a-z][a-z.]*){0,2}\s*", text, re.I):
+        candidate = text
+    else:
+        return None
+    words = []
+    for word in candidate.split():
+        if word.lower() in _NAME_STOPWORDS:
+            break
+        words.append(word)
+    name = " ".join(words)
+    if any(word.lower() in _NOT_NAME_WORDS for word in words):
+        return None
+    if not name or find_state(name) or find_caste(name) or find_gender(name) or find_occupation(name):
+        return None
+    return name.title()
+
+def extract_profile_fields(text: str, fields: Optional[Iterable[str]] = None, expected: Optional[str] = None) -> Dict[str, str]:
+    """Deterministically extract profile fields from one user message.
+
+    Only fields in `fields` (default: all required fields) are returned, and only
+    when they can be resolved with confidence. `expected` names the field the bot
+    just asked about, which allows bare answers such as "Priya" or "50000".
+    """
+    wanted = set(fields) if fields is not None else set(REQUIRED_FIELDS)
+    text = text or ""
+    found: Dict[str, str] = {}
+    if "state" in wanted:
+        state = find_state(text)
+        if state:
+            found["state"] = state
+    if wanted & {"caste", "category"}:
+        caste = find_caste(text)
+        if caste:
+            # The app treats caste and category as the same field
+            for field in ("caste", "category"):
+                if field in wanted:
+                    found[field] = caste
+    if "gender" in wanted:
+        gender = find_gender(text)
+        if gender:
+            found["gender"] = gender
+    if "income" in wanted:
+        income = find_income(text, expected=expected == "income")
+        if income:
+            found["income"] = income
+    if "occupation" in wanted:
+        occupation = find_occupation(text)
+        if not occupation and expected == "occupation" and 0 < len(text.split()) <= 5:
+            occupation = text.strip().title()
+        if occupation:
+            found["occupation"] = occupation
+    if "name" in wanted:
+        name = find_name(text, expected=expected == "name")
+        if name:
+            found["name"] = name
+    return found
+
+def validate_field(field: str, value: Optional[str]) -> Optional[str]:
+    """Normalize an LLM-proposed value, or return None if it does not fit the field."""
+    if not value or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if field == "state":
+        return find_state(value) or None
+    if field in ("caste", "category"):
+        return find_caste(value) or None
+    if field == "gender":
+        return find_gender(value) or None
+    if field == "income":
+        return value if parse_income_range(value) is not None else None
+    if field == "name":
+        return None if (find_gender(value) or find_caste(value) or re.search(r'\d', value)) else value
+    return value
@@ -0,0 +1,87 @@
+from typing import Any, Dict, List
+
+from eligibility_rules import parse_income_range
+from profile_canonical import canonical_profile
+
+# Dataset tags that usually describe schemes relevant to an occupation
+OCCUPATION_TAGS: Dict[str, List[str]] = {
+    'Student': ['Education', 'Scholarship', 'Student Finance'],
+    'Farmer': ['Agriculture', 'Farmer', 'Crop Insurance', 'Subsidy'],
+    'Fisherman': ['Fisheries', 'Fishermen', 'Boat'],
+    'Fisherwoman': ['Fisheries', 'Fishermen', 'Women'],
+    'Teacher': ['Education', 'Teacher'],
+    'Unemployed': ['Employment', 'Skill Development', 'Unemployment Allowance'],
+    'Labourer': ['Labour', 'Unorganized Worker', 'Social Security'],
+    'Laborer': ['Labour', 'Unorganized Worker', 'Social Security'],
+    'Daily Wage Worker': ['Labour', 'Unorganized Worker', 'Social Security'],
+    'Construction Worker': ['Construction Worker', 'Labour', 'Welfare Board'],
+    'Domestic Worker': ['Unorganized Worker', 'Social Security'],
+    'Street Vendor': ['Street Vendor', 'Loan', 'Livelihood'],
+    'Self-Employed': ['Self Employment', 'Loan', 'Entrepreneurship'],
+    'Self Employed': ['Self Employment', 'Loan', 'Entrepreneurship'],
+    'Business Owner': ['Business', 'Loan', 'MSME'],
+    'Businessman': ['Business', 'Loan', 'MSME'],
+    'Entrepreneur': ['Entrepreneurship', 'Startup', 'Loan'],
+    'Artisan': ['Artisan', 'Handicraft', 'Skill Development'],
+    'Weaver': ['Handloom', 'Weaver', 'Artisan'],
+    'Driver': ['Transport', 'Driver', 'Insurance'],
+    'Housewife': ['Women', 'Financial Assistance'],
+    'Homemaker': ['Women', 'Financial Assistance'],
+    'Retired': ['Pension', 'Senior Citizen'],
+    'Software Engineer': ['Employment', 'Skill Development'],
+    'Software Intern': ['Internship', 'Skill Development', 'Student'],
+    'Intern': ['Internship', 'Skill Development'],
+    'Athlete': ['Sports', 'Financial Assistance'],
+    'Artist': ['Art', 'Culture', 'Pension'],
+}
+
+CASTE_TAGS: Dict[str, List[str]] = {
+    'SC': ['Scheduled Caste', 'SC'],
+    'ST': ['Scheduled Tribe', 'ST', 'Tribal'],
+    'OBC': ['Other Backward Class', 'OBC', 'Backward Classes'],
+}
+
+# Annual income (INR) at or below which welfare and financial-assistance schemes are likely
+LOW_INCOME_THRESHOLD = 250000
+
+def _dedupe(values: List[str]) -> List[str]:
+    seen = set()
+    return [v for v in values if v and not (v.lower() in seen or seen.add(v.lower()))]
+
+def build_template_query(user_details: Dict[str, Any]) -> str:
+    """Build a search query in the same 'Tags/State/Eligibility' style as the embedded scheme passages.
+
+    Deterministic, so identical profiles always produce the same query (and the
+    same cached embedding).
+    """
+    profile = canonical_profile(user_details)
+    occupation = profile['occupation']
+    caste = profile['caste']
+    gender = profile['gender']
+
+    tags = list(OCCUPATION_TAGS.get(occupation, [occupation] if occupation else []))
+    tags += CASTE_TAGS.get(caste, [])
+    if gender == 'Female':
+        tags.append('Women')
+    income_range = parse_income_range(profile['income']) if profile['income'] else None
+    if income_range and income_range[1] is not None and income_range[1] <= LOW_INCOME_THRESHOLD:
+        tags += ['BPL', 'Financial Assistance']
+    tags = _dedupe(tags)
+
+    eligibility = []
+    if gender:
+        eligibility.append(gender)
+    if caste:
+        eligibility.append(f"{caste} category" if caste != 'General' else "all categories")
+    else:
+        eligibility.append("all castes, including SC")
+    if occupation:
+        eligibility.append(occupation)
+    if profile['income']:
+        eligibility.append(f"income {profile['income']}")
+
+    subject = f"Government schemes for {occupation.lower()} applicants" if occupation else "Government schemes"
+    query = f"{subject}. Tags: {', '.join(tags)}. State: {profile['state'] or 'All India'}. Eligibility: {', '.join(eligibility)}."
+    if profile['additional_details']:
+        query += f" {profile['additional_details']}"
+    return query
@@ -0,0 +1,184 @@
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from metrics import STAGE_SECONDS, record_event
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle; "retrieving" and "ranking" mirror the pipeline stage currently running
+JOB_STATES = ("queued", "retrieving", "ranking", "done", "failed")
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while every worker is busy and the queue is full."""
+
+class RecommendationJob:
+    """One recommendation request and its (partial) results."""
+
+    def __init__(self, session_id: Optional[str]):
+        self.job_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.status = "queued"
+        self.schemes: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def update(self, status: str, schemes: Optional[List[Dict[str, Any]]] = None):
+        """Move to a pipeline stage, optionally publishing partial results (e.g. vector-ranked candidates)."""
+        if status not in JOB_STATES:
+            raise ValueError(f"Unknown job state: {status}")
+        with self._lock:
+            if self.finished:
+                # A late progress report (e.g. relayed from a shared search) must not reopen the job
+                return
+            self.status = status
+            if schemes is not None:
+                self.schemes = list(schemes)
+            self.updated_at = time.time()
+
+    def finish(self, schemes: List[Dict[str, Any]]):
+        self.update("done", schemes)
+
+    def fail(self, error: str):
+        with self._lock:
+            self.status = "failed"
+            self.error = error
+            self.updated_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-ready view for the status endpoint. Results are partial until the job is done."""
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'partial': self.status != "done",
+                'schemes': list(self.schemes),
+                'error': self.error
+            }
+
+class JobManager:
+    """Runs recommendation jobs on a bounded worker pool with admission control.
+
+    At most ``workers`` jobs run at once and at most ``queue_size`` more wait;
+    further submissions raise JobQueueFull so the caller can shed load. Jobs
+    run on a thread pool (``submit``) or as tasks on the running event loop
+    (``submit_async``) under the same limits. Finished jobs are kept for
+    ``result_ttl`` seconds so clients can collect the results.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 32, result_ttl: float = 600):
+        if workers <= 0 or queue_size < 0:
+            raise ValueError("workers must be positive and queue_size non-negative")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommend")
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self._jobs: Dict[str, RecommendationJob] = {}
+        self._lock = threading.Lock()
+        self._active = 0  # queued + running
+
+    def _purge_expired_locked(self, now: float):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.updated_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _admit(self, session_id: Optional[str]) -> RecommendationJob:
+        with self._lock:
+            self._purge_expired_locked(time.time())
+            if self._active >= self.workers + self.queue_size:
+                record_event("job_rejected")
+                logger.warning(f"Recommendation queue full ({self._active} active jobs), rejecting job")
+                raise JobQueueFull("Too many recommendation requests in progress, please retry shortly")
+            self._active += 1
+            job = RecommendationJob(session_id)
+            self._jobs[job.job_id] = job
+        logger.info(f"Queued recommendation job {job.job_id}")
+        return job
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    def _started(self, job: RecommendationJob):
+        STAGE_SECONDS.observe(time.time() - job.created_at, "job_queue_wait")
+
+    def _failed(self, job: RecommendationJob, e: Exception):
+        logger.error(f"Recommendation job {job.job_id} failed: {str(e)}")
+        record_event("job_failed")
+        job.fail(str(e))
+
+    def submit(self, session_id: Optional[str], run: Callable[[RecommendationJob], List[Dict[str, Any]]]) -> RecommendationJob:
+        """Queue run(job) on the worker pool; it returns the final schemes and may call job.update()."""
+        job = self._admit(session_id)
+        try:
+            self._executor.submit(self._run, job, run)
+        except RuntimeError:
+            self._release()
+            raise
+        return job
+
+    def _run(self, job: RecommendationJob, run: Callable[[RecommendationJob], List[Dict[str, Any]]]):
+        self._started(job)
+        try:
+            job.finish(run(job))
+            logger.info(f"Recommendation job {job.job_id} finished with {len(job.schemes)} schemes")
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            self._release()
+
+    def submit_async(
+        self,
+        session_id: Optional[str],
+        run: Callable[[RecommendationJob], Awaitable[List[Dict[str, Any]]]]
+    ) -> RecommendationJob:
+        """Like submit, but run(job) is a coroutine function scheduled on the running event loop."""
+        job = self._admit(session_id)
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.workers)
+        task = asyncio.get_running_loop().create_task(self._run_async(job, run))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run_async(self, job: RecommendationJob, run: Callable[[RecommendationJob], Awaitable[List[Dict[str, Any]]]]):
+        try:
+            async with self._async_slots:
+                self._started(job)
+                job.finish(await run(job))
+                logger.info(f"Recommendation job {job.job_id} finished with {len(job.schemes)} schemes")
+        except Exception as e:
+            self._failed(job, e)
+        finally:
+            self._release()
+
+    def get(self, job_id: str, session_id: Optional[str]) -> Optional[RecommendationJob]:
+        """Look up a job submitted by the given session (other sessions' jobs are not returned)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.session_id != session_id:
+            return None
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {state: 0 for state in JOB_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            counts['active'] = self._active
+            return counts
@@ -0,0 +1,127 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Profile fields that do not influence relevance and would only fragment the cache
+FINGERPRINT_EXCLUDED_FIELDS = {'name'}
+
+def profile_fingerprint(user_details: Dict[str, Any]) -> str:
+    """Canonical hash of a sanitized user profile (case and whitespace insensitive)."""
+    canonical = {
+        str(k).strip().lower(): re.sub(r'\s+', ' ', str(v or '')).strip().lower()
+        for k, v in user_details.items()
+        if str(k).strip().lower() not in FINGERPRINT_EXCLUDED_FIELDS
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def scheme_fingerprint(metadata: Dict[str, Any]) -> str:
+    """Hash of the scheme content shown to the LLM; changes whenever the scheme row changes."""
+    payload = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class RerankScoreCache:
+    """SQLite-backed cache of LLM relevance scores keyed by (profile fingerprint, scheme_id)."""
+
+    def __init__(self, db_path: str = "rerank_cache.db", ttl_seconds: float = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS rerank_scores (
+                profile_fingerprint TEXT NOT NULL,
+                scheme_id TEXT NOT NULL,
+                scheme_hash TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (profile_fingerprint, scheme_id)
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rerank_scores_scheme ON rerank_scores(scheme_id)")
+        self._conn.commit()
+
+    def get_many(self, fingerprint: str, schemes: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Return {scheme_id: score} for fresh entries whose scheme content is unchanged."""
+        if not schemes:
+            return {}
+        expected = {str(s['metadata']['scheme_id']): scheme_fingerprint(s['metadata']) for s in schemes}
+        placeholders = ', '.join('?' * len(expected))
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT scheme_id, scheme_hash, score FROM rerank_scores "
+                    f"WHERE profile_fingerprint = ? AND created_at >= ? AND scheme_id IN ({placeholders})",
+                    (fingerprint, cutoff, *expected.keys())
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Rerank cache read failed: {str(e)}")
+            rows = []
+        cached = {scheme_id: score for scheme_id, scheme_hash, score in rows if expected.get(scheme_id) == scheme_hash}
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(expected) - len(cached)
+        return cached
+
+    def put_many(self, fingerprint: str, scored: Iterable[Tuple[Dict[str, Any], int]]):
+        """Store LLM scores for (scheme, score) pairs under a profile fingerprint."""
+        now = time.time()
+        rows = [
+            (fingerprint, str(scheme['metadata']['scheme_id']), scheme_fingerprint(scheme['metadata']), int(score), now)
+            for scheme, score in scored
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rerank_scores (profile_fingerprint, scheme_id, scheme_hash, score, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Rerank cache write failed: {str(e)}")
+
+    def invalidate_schemes(self, scheme_ids: Iterable[Any]) -> int:
+        """Drop cached scores for the given schemes, e.g. after their rows were updated."""
+        ids = [str(scheme_id) for scheme_id in scheme_ids]
+        if not ids:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM rerank_scores WHERE scheme_id IN ({', '.join('?' * len(ids))})", ids
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete entries older than the TTL."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM rerank_scores WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def create_rerank_cache() -> RerankScoreCache:
+    """Create the rerank score cache configured through environment variables."""
+    return RerankScoreCache(
+        db_path=os.getenv("RERANK_CACHE_PATH", "rerank_cache.db"),
+        ttl_seconds=float(os.getenv("RERANK_CACHE_TTL", str(7 * 24 * 3600)))
+    )
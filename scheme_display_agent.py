@@ -3,11 +3,14 @@ import sqlite3
 import os
 import hashlib
 import warnings
-from typing import Dict, List
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
+from conversation_memory import WindowedConversationMemory
+from scheme_store import get_scheme_store
+from scheme_documents import DOCUMENT_SECTIONS, compact_scheme_document, render_scheme_document
+from metrics import record_llm_response, timed
 
 # Suppress LangChain deprecation warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="langchain")
@@ -67,26 +70,26 @@ def load_recommended_schemes(json_path: str = "recommended_schemes.json") -> Lis
 
 # Fetch scheme details from SQLite database
 def fetch_scheme_details(scheme_id: str, db_path: str = "new_schemes.db") -> Dict:
-    """Fetch detailed information for a scheme from the SQLite database."""
+    """Fetch detailed information for a scheme from the SQLite database.
+
+    Besides the raw text columns, the result carries the pre-split sections
+    (description_items, eligibility_items, application_steps, document_items).
+    """
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        query = """
-        SELECT scheme_name, detailed_description, eligibility_criteria, application_process, documents_required
-        FROM schemes
-        WHERE scheme_id = ?
-        """
-        cursor.execute(query, (scheme_id,))
-        result = cursor.fetchone()
-        conn.close()
+        store = get_scheme_store(db_path)
+        result = store.fetch(scheme_id)
         if result:
-            return {
-                "scheme_name": result[0] or "Not available",
-                "detailed_description": result[1] or "Not available",
-                "eligibility_criteria": result[2] or "Not available",
-                "application_process": result[3] or "Not available",
-                "documents_required": result[4] or "Not available"
+            details = {
+                "scheme_name": result['scheme_name'] or "Not available",
+                "detailed_description": result['detailed_description'] or "Not available",
+                "eligibility_criteria": result['eligibility_criteria'] or "Not available",
+                "application_process": result['application_process'] or "Not available",
+                "documents_required": result['documents_required'] or "Not available"
             }
+            document = store.fetch_document(scheme_id) or {}
+            for key, _, _ in DOCUMENT_SECTIONS:
+                details[key] = document.get(key, [])
+            return details
         else:
             return None
     except sqlite3.Error as e:
@@ -111,10 +114,20 @@ class SchemeDisplayAgent:
                 metadata['scheme_id'] = f"SCH-{state[:3].upper()}-{hash_value:04d}"
         if not self.schemes:
             raise ValueError("No valid schemes provided with required metadata")
+        # Load every recommended scheme's details and documents up front so selections hit the cache
+        try:
+            scheme_ids = [scheme['metadata']['scheme_id'] for scheme in self.schemes]
+            get_scheme_store().fetch_many(scheme_ids)
+            get_scheme_store().fetch_documents(scheme_ids)
+        except sqlite3.Error as e:
+            print(f"Database error while prefetching scheme details: {str(e)}")
         self.selected_scheme = None
         self.scheme_details = None
         self.state = "list_schemes"
-        self.memory = ConversationBufferMemory(return_messages=True)
+        self.memory = WindowedConversationMemory(
+            max_tokens=int(os.getenv("DISPLAY_HISTORY_MAX_TOKENS", "600")),
+            window_turns=int(os.getenv("DISPLAY_HISTORY_TURNS", "4"))
+        )
 
         self.prompt_template = PromptTemplate(
             input_variables=["history", "input", "scheme_details"],
@@ -160,7 +173,13 @@ Respond only with the assistant's reply, without repeating the user input or his
         return scheme_list
 
     def format_scheme_details(self) -> str:
-        """Format the scheme details as a string to pass to the LLM."""
+        """Format the scheme details as a string to pass to the LLM.
+
+        Sent with every turn about the selected scheme, so the pre-split sections are
+        used when available (one line per section, without the raw text's padding).
+        """
+        if any(self.scheme_details.get(key) for key, _, _ in DOCUMENT_SECTIONS):
+            return compact_scheme_document(self.scheme_details)
         details = (
             f"Scheme Name: {self.scheme_details['scheme_name']}\n"
             f"Detailed Description: {self.scheme_details['detailed_description']}\n"
@@ -170,15 +189,20 @@ Respond only with the assistant's reply, without repeating the user input or his
         )
         return details
 
-    def handle_input(self, user_input: str) -> str:
-        """Handle the user's input and manage the conversation state."""
+    def _route_input(self, user_input: str) -> Tuple[Optional[str], Optional[str], str, bool]:
+        """Advance the conversation state for the user's input.
+
+        Returns (reply, prompt, normalized_input, is_detail_view): exactly one of
+        reply and prompt is set; a prompt means the answer has to be generated by the LLM.
+        is_detail_view marks the (directly rendered) scheme detail view.
+        """
         user_input = user_input.strip().lower()
-        history = "\n".join([str(msg) for msg in self.memory.chat_memory.messages])
+        history = self.memory.render()
 
         if self.state == "list_schemes":
             if user_input == "quit":
                 self.state = "exit"
-                return "Goodbye! If you need help later, feel free to come back."
+                return "Goodbye! If you need help later, feel free to come back.", None, user_input, False
             
             try:
                 choice = int(user_input)
@@ -189,47 +213,106 @@ Respond only with the assistant's reply, without repeating the user input or his
                     if not self.scheme_details:
                         self.selected_scheme = None
                         return (f"Sorry, I couldn't find more details for scheme ID '{scheme_id}' in the database.\n\n"
-                                "Let's try another one. " + self.display_schemes())
+                                "Let's try another one. " + self.display_schemes()), None, user_input, False
                     self.state = "select_detail"
-                    scheme_details_str = self.format_scheme_details()
-                    prompt = self.prompt_template.format(history=history, input="Show the details of the selected scheme", scheme_details=scheme_details_str)
-                    response = llm.invoke(prompt).content.strip()
-                    self.memory.chat_memory.add_user_message(user_input)
-                    self.memory.chat_memory.add_ai_message(response)
-                    return response
+                    # The details are pre-split into sections, so the view is rendered without an LLM call
+                    return render_scheme_document(self.scheme_details), None, user_input, True
                 else:
-                    return f"Hmm, please enter a number between 1 and {len(self.schemes)}.\n\n" + self.display_schemes()
+                    return f"Hmm, please enter a number between 1 and {len(self.schemes)}.\n\n" + self.display_schemes(), None, user_input, False
             except ValueError:
-                return "I didn't understand that. Please enter the number of the scheme you'd like to learn more about, or say 'quit' to exit.\n\n" + self.display_schemes()
+                return "I didn't understand that. Please enter the number of the scheme you'd like to learn more about, or say 'quit' to exit.\n\n" + self.display_schemes(), None, user_input, False
 
         elif self.state == "select_detail":
             if user_input == "quit":
                 self.state = "exit"
-                return "Goodbye! If you need help later, feel free to come back."
+                return "Goodbye! If you need help later, feel free to come back.", None, user_input, False
             elif user_input in ["back", "go back", "return"]:
                 self.selected_scheme = None
                 self.scheme_details = None
                 self.state = "list_schemes"
-                return "Sure, let's go back to the scheme list.\n\n" + self.display_schemes()
+                return "Sure, let's go back to the scheme list.\n\n" + self.display_schemes(), None, user_input, False
             elif any(keyword in user_input for keyword in ["eligible", "eligibility", "caste", "oc", "sc", "st", "obc"]):
                 scheme_details_str = self.format_scheme_details()
                 prompt = self.prompt_template.format(history=history, input=user_input, scheme_details=scheme_details_str)
-                response = llm.invoke(prompt).content.strip()
-                self.memory.chat_memory.add_user_message(user_input)
-                self.memory.chat_memory.add_ai_message(response)
-                return response
+                return None, prompt, user_input, False
             elif user_input == "tell me":
                 scheme_details_str = self.format_scheme_details()
                 prompt = self.prompt_template.format(history=history, input="Could you clarify what you'd like to know? For now, I'll summarize the eligibility criteria.", scheme_details=scheme_details_str)
-                response = llm.invoke(prompt).content.strip()
-                self.memory.chat_memory.add_user_message(user_input)
-                self.memory.chat_memory.add_ai_message(response)
-                return response
+                return None, prompt, user_input, False
             else:
-                return "I'm not sure what you'd like to do. Would you like to go back to the scheme list to explore another scheme, or would you like to quit?"
+                return "I'm not sure what you'd like to do. Would you like to go back to the scheme list to explore another scheme, or would you like to quit?", None, user_input, False
 
         else:
-            return "Goodbye! If you need help later, feel free to come back."
+            return "Goodbye! If you need help later, feel free to come back.", None, user_input, False
+
+    def _remember_turn(self, user_input: str, response: str, is_detail_view: bool = False):
+        # The scheme details travel in their own prompt section, so a detail view is stored as a short marker
+        detail_of = self.scheme_details['scheme_name'] if is_detail_view and self.scheme_details else None
+        self.memory.add_turn(user_input, response, detail_of=detail_of)
+
+    def _direct_reply(self, user_input: str, reply: str, is_detail_view: bool) -> str:
+        # Detail views go into the history so follow-up questions know which scheme is open
+        if is_detail_view:
+            self._remember_turn(user_input, reply, is_detail_view)
+        return reply
+
+    def handle_input(self, user_input: str) -> str:
+        """Handle the user's input and manage the conversation state."""
+        reply, prompt, user_input, is_detail_view = self._route_input(user_input)
+        if prompt is None:
+            return self._direct_reply(user_input, reply, is_detail_view)
+        with timed("display_llm"):
+            message = llm.invoke(prompt)
+        record_llm_response("display", message)
+        response = message.content.strip()
+        self._remember_turn(user_input, response, is_detail_view)
+        return response
+
+    def handle_input_stream(self, user_input: str) -> Iterator[str]:
+        """Like handle_input, but yield the reply in chunks as the LLM generates it."""
+        reply, prompt, user_input, is_detail_view = self._route_input(user_input)
+        if prompt is None:
+            yield self._direct_reply(user_input, reply, is_detail_view)
+            return
+        chunks = []
+        last_chunk = None
+        with timed("display_llm_stream"):
+            for chunk in llm.stream(prompt):
+                last_chunk = chunk
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        record_llm_response("display", last_chunk)
+        self._remember_turn(user_input, "".join(chunks).strip(), is_detail_view)
+
+    async def ahandle_input(self, user_input: str) -> str:
+        """Async version of handle_input for the ASGI app."""
+        reply, prompt, user_input, is_detail_view = self._route_input(user_input)
+        if prompt is None:
+            return self._direct_reply(user_input, reply, is_detail_view)
+        with timed("display_llm"):
+            message = await llm.ainvoke(prompt)
+        record_llm_response("display", message)
+        response = message.content.strip()
+        self._remember_turn(user_input, response, is_detail_view)
+        return response
+
+    async def ahandle_input_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Async version of handle_input_stream for the ASGI app."""
+        reply, prompt, user_input, is_detail_view = self._route_input(user_input)
+        if prompt is None:
+            yield self._direct_reply(user_input, reply, is_detail_view)
+            return
+        chunks = []
+        last_chunk = None
+        with timed("display_llm_stream"):
+            async for chunk in llm.astream(prompt):
+                last_chunk = chunk
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        record_llm_response("display", last_chunk)
+        self._remember_turn(user_input, "".join(chunks).strip(), is_detail_view)
 
     def run(self):
         """Run the conversational agent."""
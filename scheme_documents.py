@@ -0,0 +1,134 @@
+import re
+from typing import Any, Dict, List
+
+# Bump when the splitting rules change so stored documents are rebuilt
+DOCUMENTS_VERSION = 1
+
+# Sections of a structured detail document, in display order: (key, source column, heading)
+DOCUMENT_SECTIONS = [
+    ('description_items', 'detailed_description', 'Detailed Description'),
+    ('eligibility_items', 'eligibility_criteria', 'Eligibility Criteria'),
+    ('application_steps', 'application_process', 'Application Process'),
+    ('document_items', 'documents_required', 'Documents Required'),
+]
+# How each section's text is split (see split_items); application steps are rendered numbered
+SECTION_KINDS = {'application_steps': 'steps', 'document_items': 'documents'}
+
+_NOT_AVAILABLE = "Not available"
+
+# Leading list markers: "1.", "1)", "(a)", "Step 2:", "•", "-", "*"
+_MARKER = re.compile(r'^\s*(?:step\s*\d+\s*[:.)-]?|\(?\d{1,2}[.)]|\([a-z]\)|[a-z][.)](?=\s)|[•●▪◦*-])\s*', re.I)
+# Inline enumerations: "... 1. The applicant ... 2. The applicant" or "Step 1: ... Step 2: ..."
+_INLINE_STEP = re.compile(r'(?:(?<=\s)|^)step\s*(\d+)\s*[:.)-]', re.I)
+_INLINE_NUMBER = re.compile(r'(?:(?<=[\s.;:])|^)\(?(\d{1,2})[.)](?=\s+\S)')
+# Sentence ends, except after common abbreviations and inside amounts like "Rs. 5,000" or "2.5"
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9("₹])')
+_ABBREVIATIONS = re.compile(
+    r'(?:\b(?:rs|no|nos|sr|dr|mr|mrs|ms|govt|dept|st|e\.g|i\.e|etc|viz|approx|max|min|yr|yrs|vs|u/s)|\b[a-z])\.$', re.I
+)
+
+def _clean_item(item: str) -> str:
+    item = _MARKER.sub('', item.strip())
+    return re.sub(r'\s+', ' ', item).strip(' ;')
+
+def _split_sentences(text: str) -> List[str]:
+    sentences: List[str] = []
+    for piece in _SENTENCE_END.split(text):
+        if sentences and _ABBREVIATIONS.search(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+def _split_enumerated(text: str, pattern: "re.Pattern") -> List[str]:
+    """Split at markers numbered 1, 2, 3, ... in order; stray numbers ("Class 9.") are not markers."""
+    starts, expected = [], 1
+    for match in pattern.finditer(text):
+        if int(match.group(1)) == expected:
+            starts.append(match.start())
+            expected += 1
+    if len(starts) < 2:
+        return []
+    bounds = starts + [len(text)]
+    head = text[:starts[0]]
+    pieces = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    return ([head] if head.strip() else []) + pieces
+
+def _split_top_level(text: str, separators: str) -> List[str]:
+    """Split on separator characters that are not inside parentheses."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth = max(depth - 1, 0)
+        if char in separators and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+def split_items(text: Any, kind: str = 'bullets') -> List[str]:
+    """Split free text into display items.
+
+    Explicit structure wins: separate lines, then inline "Step N" or "N."
+    enumerations. Otherwise prose is split into sentences, and document lists
+    ("Aadhaar Card, Income Certificate") on commas and semicolons. For
+    ``bullets`` each listed item is further split into sentences; ``steps``
+    keep multi-sentence steps together.
+    """
+    text = str(text or '').replace('\r\n', '\n').strip()
+    if not text or text.lower() == _NOT_AVAILABLE.lower():
+        return []
+    lines = [line for line in text.split('\n') if line.strip()]
+    if len(lines) > 1:
+        pieces = lines
+    else:
+        pieces = _split_enumerated(text, _INLINE_STEP) or _split_enumerated(text, _INLINE_NUMBER)
+        if not pieces:
+            if kind == 'documents' and not re.search(r'[.!?]\s+[A-Z]', text):
+                pieces = _split_top_level(text, ',;')
+            else:
+                pieces = _split_sentences(text)
+    items = [_clean_item(piece) for piece in pieces]
+    if kind == 'bullets':
+        items = [_clean_item(sentence) for item in items for sentence in _split_sentences(item)]
+    return [item for item in items if item]
+
+def build_scheme_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Structured, pre-split detail document for one scheme row."""
+    document: Dict[str, Any] = {
+        'version': DOCUMENTS_VERSION,
+        'scheme_name': str(row.get('scheme_name') or _NOT_AVAILABLE)
+    }
+    for key, column, _ in DOCUMENT_SECTIONS:
+        document[key] = split_items(row.get(column), kind=SECTION_KINDS.get(key, 'bullets'))
+    return document
+
+def render_scheme_document(document: Dict[str, Any]) -> str:
+    """Plain-text detail view for the chat: bullets, numbered steps and a follow-up question."""
+    lines = [f"Here are the details of {document.get('scheme_name') or 'the selected scheme'}:", ""]
+    for key, _, heading in DOCUMENT_SECTIONS:
+        items = document.get(key) or []
+        lines.append(f"{heading}:")
+        if not items:
+            lines.append(f"- {_NOT_AVAILABLE}")
+        for number, item in enumerate(items, 1):
+            lines.append(f"{number}. {item}" if SECTION_KINDS.get(key) == 'steps' else f"- {item}")
+        lines.append("")
+    lines.append("Would you like to go back to the scheme list to explore another scheme, or would you like to quit?")
+    return "\n".join(lines)
+
+def compact_scheme_document(document: Dict[str, Any]) -> str:
+    """Compact prompt text of a detail document: one line per section, items separated by semicolons."""
+    lines = [f"Scheme Name: {document.get('scheme_name') or _NOT_AVAILABLE}"]
+    for key, _, heading in DOCUMENT_SECTIONS:
+        items = document.get(key) or []
+        if SECTION_KINDS.get(key) == 'steps':
+            text = " ".join(f"({number}) {item}" for number, item in enumerate(items, 1))
+        else:
+            text = "; ".join(items)
+        lines.append(f"{heading}: {text or _NOT_AVAILABLE}")
+    return "\n".join(lines)
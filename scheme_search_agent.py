@@ -1,16 +1,31 @@
 import os
 import json
 import logging
-import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Tuple
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
-from langchain_groq import ChatGroq
 from langchain.prompts import PromptTemplate
+from lazy_resource import LazyResource, warmup_resources
+from local_vector_index import load_local_index
+from embedding_cache import create_query_cache
+from encoders import create_encoder, encoder_cache_name
+from rate_limiter import TokenBucket
+from rerank_cache import create_rerank_cache, profile_fingerprint
+from eligibility_rules import prune_ineligible
+from profile_canonical import profile_key, recommendation_key
+from recommendation_cache import RecommendationCache, SingleFlight, copy_schemes
+from query_builder import build_template_query
+from hybrid_retriever import reciprocal_rank_fusion, search_fts
+from profile_extractor import NATIONAL_LEVEL, find_states, normalize_state
+from scheme_store import get_scheme_store
+from metrics import record_event, record_llm_response, timed
 import re
 import sys
+import asyncio
 import hashlib
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 # Logging setup: Console shows only ERROR, file captures all
 logging.basicConfig(
@@ -31,39 +46,139 @@ for handler in logging.getLogger().handlers:
 load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not PINECONE_API_KEY or not GROQ_API_KEY:
+# Vector backend: "pinecone" (remote index), "local" (in-process memory-mapped index), or
+# "local-int8" / "local-binary" (local index searched through compact codes, then re-scored exactly)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").strip().lower()
+VECTOR_BACKENDS = ("pinecone", "local", "local-int8", "local-binary")
+if VECTOR_BACKEND not in VECTOR_BACKENDS:
+    logger.error(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+    raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}. Use one of {', '.join(VECTOR_BACKENDS)}")
+if not GROQ_API_KEY or (VECTOR_BACKEND == "pinecone" and not PINECONE_API_KEY):
     logger.error("PINECONE_API_KEY or GROQ_API_KEY not found in .env file")
     raise ValueError("PINECONE_API_KEY or GROQ_API_KEY not found in .env file")
 
-# Initialize Pinecone
-try:
+EMBEDDING_MODEL_NAME = 'BAAI/bge-large-en-v1.5'
+
+PINECONE_INDEX_NAME = "scheme-data" # pinecone db index name
+PINECONE_INDEX_HOST = "Pinecone DB hosting link"
+
+# Expensive clients are created lazily on first use (or by warmup()) so importing
+# this module stays cheap for app.py, main.py and test collection.
+def _create_vector_index():
+    if VECTOR_BACKEND.startswith("local"):
+        return load_local_index(quantization=VECTOR_BACKEND.partition("-")[2] or None)
+    from pinecone import Pinecone
     pc = Pinecone(api_key=PINECONE_API_KEY)
-    index_name = "scheme-data" # pinecone db index name
-    index = pc.Index(
-        name=index_name,
-        host="Pinecone DB hosting link"
+    return pc.Index(
+        name=PINECONE_INDEX_NAME,
+        host=PINECONE_INDEX_HOST
     )
-except Exception as e:
-    logger.error(f"Failed to initialize Pinecone: {str(e)}")
-    raise
-
-# Initialize embedding model
-try:
-    model = SentenceTransformer('BAAI/bge-large-en-v1.5')
-except Exception as e:
-    logger.error(f"Failed to initialize SentenceTransformer: {str(e)}")
-    raise
-
-# Initialize Groq LLM
-try:
-    llm = ChatGroq(
+
+def _create_embedding_model():
+    # SentenceTransformer (PyTorch) or the exported ONNX model, per ENCODER_BACKEND
+    return create_encoder(EMBEDDING_MODEL_NAME)
+
+def _create_llm():
+    from langchain_groq import ChatGroq
+    return ChatGroq(
         model_name="llama3-70b-8192",
         api_key=GROQ_API_KEY,
-        temperature=0.7
+        temperature=0.7,
+        # Bound each HTTP request so a hung call frees its rerank worker
+        timeout=RERANK_BATCH_TIMEOUT,
+        max_retries=GROQ_MAX_RETRIES
+    )
+
+index = LazyResource(f"{VECTOR_BACKEND} vector index", _create_vector_index)
+model = LazyResource("query encoder", _create_embedding_model)
+llm = LazyResource("ChatGroq", _create_llm)
+# Query embedding cache (in-memory LRU backed by an on-disk store)
+query_cache = LazyResource("query embedding cache", lambda: create_query_cache(encoder_cache_name(EMBEDDING_MODEL_NAME)))
+# Persistent cache of LLM rerank scores per (profile, scheme)
+rerank_cache = LazyResource("rerank score cache", create_rerank_cache)
+
+# Scheme database generation the local index was last checked against. --atomic rebuilds
+# swap the embedding store in just before the database, so a new generation is the cue
+# to check whether the loaded vectors were replaced too.
+_index_generation: Optional[int] = None
+_index_generation_lock = threading.Lock()
+
+def _refresh_local_index():
+    """Drop the loaded local vector index if its store was swapped out, so the next query reloads it."""
+    global _index_generation
+    if not VECTOR_BACKEND.startswith("local") or not index.loaded:
+        return
+    generation = get_scheme_store().generation
+    if generation == _index_generation:
+        return
+    with _index_generation_lock:
+        if generation == _index_generation:
+            return
+        _index_generation = generation
+        # Stand-ins set with index.override() have no store to check
+        store_replaced = getattr(index.instance(), 'store_replaced', None)
+        if store_replaced is not None and store_replaced():
+            logger.info(f"{VECTOR_BACKEND} vector store was replaced, reloading the index")
+            index.reset()
+
+def warmup(background: bool = True):
+    """Create all search resources ahead of the first request.
+
+    With background=True the work runs on a daemon thread, which is returned.
+    """
+    return warmup_resources(
+        [index, model, llm, query_cache, rerank_cache],
+        background=background,
+        # Run one encode so the first real query does not pay for lazy kernel setup
+        after=lambda: model.encode("warmup", normalize_embeddings=True)
     )
-except Exception as e:
-    logger.error(f"Failed to initialize ChatGroq: {str(e)}")
-    raise
+
+# Pinecone's asyncio client is bound to the event loop that opened it, so the ASGI app
+# opens it at startup; until then (and for the local backend) async searches run the
+# synchronous query in a worker thread.
+_async_index = None
+
+async def open_async_vector_index():
+    """Open the asyncio Pinecone index client for the running event loop."""
+    global _async_index
+    if VECTOR_BACKEND != "pinecone" or _async_index is not None:
+        return
+    try:
+        from pinecone import Pinecone
+        _async_index = Pinecone(api_key=PINECONE_API_KEY).IndexAsyncio(host=PINECONE_INDEX_HOST)
+        logger.info("Opened asyncio Pinecone index client")
+    except Exception as e:
+        logger.warning(f"Asyncio Pinecone client unavailable, using threaded queries: {str(e)}")
+
+async def close_async_vector_index():
+    global _async_index
+    if _async_index is not None:
+        try:
+            await _async_index.close()
+        except Exception as e:
+            logger.warning(f"Failed to close asyncio Pinecone client: {str(e)}")
+        _async_index = None
+
+# Rerank dispatch: concurrency cap, per-batch timeout and Groq request quota
+RERANK_MAX_CONCURRENCY = int(os.getenv("RERANK_MAX_CONCURRENCY", "4"))
+RERANK_BATCH_TIMEOUT = float(os.getenv("RERANK_BATCH_TIMEOUT", "20"))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "1"))
+groq_rate_limiter = TokenBucket(rate=GROQ_REQUESTS_PER_MINUTE / 60.0, capacity=max(RERANK_MAX_CONCURRENCY, 1))
+
+# Hybrid retrieval: fuse BM25 keyword hits from the schemes_fts index with the dense results
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1").strip().lower() not in ("0", "false", "no", "off")
+FTS_TOP_K = int(os.getenv("FTS_TOP_K", "20"))
+# Candidates handed to the reranker, and the ceiling for adaptive top_k expansion
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RETRIEVAL_MAX_TOP_K = int(os.getenv("RETRIEVAL_MAX_TOP_K", "160"))
+
+# Full ranked results per canonical profile; identical searches in flight run the pipeline once
+recommendation_cache = RecommendationCache(
+    ttl_seconds=float(os.getenv("RECOMMENDATION_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "2048"))
+)
+_search_flights = SingleFlight()
 
 def sanitize_input(text: str) -> str:
     """Sanitize input to prevent injection attacks."""
@@ -71,20 +186,24 @@ def sanitize_input(text: str) -> str:
         return ""
     return re.sub(r'[^\w\s.,-]', '', text)
 
+def sanitize_user_details(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and sanitize a raw user profile dict."""
+    required_fields = ['state', 'gender', 'occupation', 'income']
+    missing_fields = [field for field in required_fields if field not in data]
+    if missing_fields:
+        logger.error(f"Missing required fields in user profile: {missing_fields}")
+        raise ValueError(f"Missing required fields: {missing_fields}")
+    sanitized_data = {k: sanitize_input(str(v)) for k, v in data.items()}
+    sanitized_data['caste'] = sanitized_data.get('caste', sanitized_data.get('category', ''))
+    return sanitized_data
+
 def load_user_details(json_path: str) -> Dict[str, Any]:
     """Load and validate user details from JSON file."""
     logger.info(f"Loading user details from {json_path}")
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        required_fields = ['state', 'gender', 'occupation', 'income']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            logger.error(f"Missing required fields in user_details.json: {missing_fields}")
-            raise ValueError(f"Missing required fields: {missing_fields}")
-        sanitized_data = {k: sanitize_input(str(v)) for k, v in data.items()}
-        sanitized_data['caste'] = sanitized_data.get('caste', sanitized_data.get('category', ''))
-        return sanitized_data
+        return sanitize_user_details(data)
     except FileNotFoundError:
         logger.error(f"User details file not found: {json_path}")
         raise
@@ -92,9 +211,22 @@ def load_user_details(json_path: str) -> Dict[str, Any]:
         logger.error(f"Invalid JSON format in {json_path}")
         raise
 
-def generate_query(user_details: Dict[str, Any]) -> str:
-    """Generate a natural language query using Groq LLM."""
-    logger.info("Generating query with Groq LLM")
+# Optional LLM enrichment of the template query: "off" (default), "background" or "inline"
+QUERY_LLM_ENRICHMENT = os.getenv("QUERY_LLM_ENRICHMENT", "off").strip().lower()
+QUERY_ENRICHMENT_CACHE_SIZE = int(os.getenv("QUERY_ENRICHMENT_CACHE_SIZE", "1024"))
+_enriched_queries: "OrderedDict[str, str]" = OrderedDict()
+_enrichment_pending = set()
+_enrichment_lock = threading.Lock()
+_enrichment_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enrich")
+
+def _cached_enriched_query(key: str) -> Optional[str]:
+    with _enrichment_lock:
+        query = _enriched_queries.get(key)
+        if query is not None:
+            _enriched_queries.move_to_end(key)
+        return query
+
+def _enrichment_prompt(user_details: Dict[str, Any]) -> str:
     prompt_template = PromptTemplate(
         input_variables=["state", "gender", "caste", "occupation", "income", "additional_details"],
         template="Generate a concise search query for government schemes, styled like: 'Scheme Name. Tags: [tags]. State: [state]. Eligibility: [criteria].' "
@@ -102,7 +234,7 @@ def generate_query(user_details: Dict[str, Any]) -> str:
                  "Occupation: {occupation}, Income: {income}, Additional Details: {additional_details}. "
                  "If caste is empty, include schemes for all castes, including SC."
     )
-    prompt = prompt_template.format(
+    return prompt_template.format(
         state=user_details.get('state', ''),
         gender=user_details.get('gender', ''),
         caste=user_details.get('caste', ''),
@@ -110,81 +242,249 @@ def generate_query(user_details: Dict[str, Any]) -> str:
         income=user_details.get('income', ''),
         additional_details=user_details.get('additional_details', '')
     )
+
+def _store_enriched_query(key: str, query: Optional[str]):
+    with _enrichment_lock:
+        _enrichment_pending.discard(key)
+        if query:
+            _enriched_queries[key] = query
+            _enriched_queries.move_to_end(key)
+            while len(_enriched_queries) > QUERY_ENRICHMENT_CACHE_SIZE:
+                _enriched_queries.popitem(last=False)
+
+def _enrich_query_with_llm(key: str, user_details: Dict[str, Any]) -> Optional[str]:
+    """Ask the LLM for a richer query and cache it under the canonical profile key."""
+    prompt = _enrichment_prompt(user_details)
     try:
-        response = llm.invoke(prompt)
+        with timed("query_enrichment_llm"):
+            response = llm.invoke(prompt)
+        record_llm_response("query_enrichment", response)
         query = response.content.strip()
-        logger.info(f"Generated query: {query}")
-        return query
+        logger.info(f"Generated enriched query: {query}")
     except Exception as e:
         logger.error(f"Failed to generate query with Groq: {str(e)}")
-        fields = [
-            str(user_details.get('state', '')),
-            str(user_details.get('gender', '')),
-            str(user_details.get('caste', 'all castes')),
-            str(user_details.get('occupation', '')),
-            str(user_details.get('income', '')),
-            str(user_details.get('additional_details', ''))
-        ]
-        return ". ".join(filter(None, fields))
+        query = None
+    _store_enriched_query(key, query)
+    return query
 
-def search_pinecone(query: str, top_k: int = 20) -> List[Dict[str, Any]]:
-    """Search Pinecone index for relevant schemes."""
-    logger.info(f"Searching Pinecone with query: {query}")
+async def _aenrich_query_with_llm(key: str, user_details: Dict[str, Any]) -> Optional[str]:
+    """Async version of _enrich_query_with_llm."""
+    prompt = _enrichment_prompt(user_details)
     try:
-        embedding = model.encode(query, normalize_embeddings=True).tolist()
-        results = index.query(
-            vector=embedding,
-            top_k=top_k,
-            include_metadata=True
-        )
-        schemes = []
-        for match in results['matches']:
-            metadata = match.get('metadata', {})
-            if not metadata.get('scheme_name'):
-                logger.warning(f"Skipping scheme with missing scheme_name: {match}")
-                continue
-            scheme_id = None
-            possible_keys = ['scheme_id', 'schemeId', 'SchemeID', 'id', 'scheme_id ']
-            for key in possible_keys:
-                if key in metadata:
-                    scheme_id = metadata[key]
-                    logger.info(f"Found scheme_id with key '{key}' for scheme '{metadata.get('scheme_name')}': {scheme_id}")
-                    break
-            if scheme_id is None:
-                scheme_name = metadata.get('scheme_name', 'unknown')
-                state = metadata.get('state', 'unknown')
-                combined = f"{scheme_name}_{state}".encode()
-                hash_object = hashlib.md5(combined)
-                hash_value = int(hash_object.hexdigest(), 16) % 10000
-                scheme_id = f"SCH-{state[:3].upper()}-{hash_value:04d}"
-                logger.warning(f"No scheme_id found in metadata for scheme '{scheme_name}' (state: {state}). Generated placeholder: {scheme_id}")
-            schemes.append({
-                'id': match['id'],
-                'score': match['score'],
-                'metadata': {
-                    'scheme_id': str(scheme_id),
-                    'scheme_name': metadata.get('scheme_name', ''),
-                    'brief_description': metadata.get('brief_description', ''),
-                    'eligibility_criteria': metadata.get('eligibility_criteria', ''),
-                    'state': metadata.get('state', ''),
-                    'tags': metadata.get('tags', ''),
-                    'category': metadata.get('category', '')
-                }
-            })
-        logger.info(f"Retrieved {len(schemes)} schemes from Pinecone")
-        return schemes
+        with timed("query_enrichment_llm"):
+            response = await llm.ainvoke(prompt)
+        record_llm_response("query_enrichment", response)
+        query = response.content.strip()
+        logger.info(f"Generated enriched query: {query}")
     except Exception as e:
-        logger.error(f"Pinecone query failed: {str(e)}")
+        logger.error(f"Failed to generate query with Groq: {str(e)}")
+        query = None
+    _store_enriched_query(key, query)
+    return query
+
+def generate_query(user_details: Dict[str, Any]) -> str:
+    """Build the search query for a profile.
+
+    The deterministic template query is used unless an LLM-enriched query for
+    the same canonical profile is already cached. With QUERY_LLM_ENRICHMENT set
+    to "background" the enrichment runs off the request path for later
+    searches; "inline" waits for it (the old behaviour, one Groq call per new
+    profile).
+    """
+    with timed("generate_query"):
+        return _generate_query(user_details)
+
+def _generate_query(user_details: Dict[str, Any]) -> str:
+    if QUERY_LLM_ENRICHMENT in ("background", "inline"):
+        key = profile_key(user_details)
+        cached = _cached_enriched_query(key)
+        if cached:
+            logger.info(f"Using cached enriched query: {cached}")
+            return cached
+        if QUERY_LLM_ENRICHMENT == "inline":
+            with _enrichment_lock:
+                _enrichment_pending.add(key)
+            enriched = _enrich_query_with_llm(key, user_details)
+            if enriched:
+                return enriched
+        else:
+            with _enrichment_lock:
+                schedule = key not in _enrichment_pending
+                _enrichment_pending.add(key)
+            if schedule:
+                _enrichment_executor.submit(_enrich_query_with_llm, key, dict(user_details))
+    query = build_template_query(user_details)
+    logger.info(f"Generated template query: {query}")
+    return query
+
+async def agenerate_query(user_details: Dict[str, Any]) -> str:
+    """Async version of generate_query; only the "inline" enrichment mode awaits the LLM."""
+    with timed("generate_query"):
+        if QUERY_LLM_ENRICHMENT == "inline":
+            key = profile_key(user_details)
+            cached = _cached_enriched_query(key)
+            if cached:
+                logger.info(f"Using cached enriched query: {cached}")
+                return cached
+            with _enrichment_lock:
+                _enrichment_pending.add(key)
+            enriched = await _aenrich_query_with_llm(key, user_details)
+            if enriched:
+                return enriched
+            query = build_template_query(user_details)
+            logger.info(f"Generated template query: {query}")
+            return query
+        return _generate_query(user_details)
+
+def _query_embedding(query: str) -> List[float]:
+    def encode(text: str):
+        with timed("embed"):
+            return model.encode(text, normalize_embeddings=True)
+    return query_cache.get_or_compute(query, encode).tolist()
+
+def _parse_matches(results: Any) -> List[Dict[str, Any]]:
+    """Turn index query matches into scheme dicts with normalized metadata."""
+    schemes = []
+    for match in results['matches']:
+        metadata = match.get('metadata', {})
+        if not metadata.get('scheme_name'):
+            logger.warning(f"Skipping scheme with missing scheme_name: {match}")
+            continue
+        scheme_id = None
+        possible_keys = ['scheme_id', 'schemeId', 'SchemeID', 'id', 'scheme_id ']
+        for key in possible_keys:
+            if key in metadata:
+                scheme_id = metadata[key]
+                logger.info(f"Found scheme_id with key '{key}' for scheme '{metadata.get('scheme_name')}': {scheme_id}")
+                break
+        if scheme_id is None:
+            scheme_name = metadata.get('scheme_name', 'unknown')
+            state = metadata.get('state', 'unknown')
+            combined = f"{scheme_name}_{state}".encode()
+            hash_object = hashlib.md5(combined)
+            hash_value = int(hash_object.hexdigest(), 16) % 10000
+            scheme_id = f"SCH-{state[:3].upper()}-{hash_value:04d}"
+            logger.warning(f"No scheme_id found in metadata for scheme '{scheme_name}' (state: {state}). Generated placeholder: {scheme_id}")
+        schemes.append({
+            'id': match['id'],
+            'score': match['score'],
+            'metadata': {
+                'scheme_id': str(scheme_id),
+                'scheme_name': metadata.get('scheme_name', ''),
+                'brief_description': metadata.get('brief_description', ''),
+                'eligibility_criteria': metadata.get('eligibility_criteria', ''),
+                'state': metadata.get('state', ''),
+                'tags': metadata.get('tags', ''),
+                'category': metadata.get('category', '')
+            }
+        })
+    logger.info(f"Retrieved {len(schemes)} schemes from {VECTOR_BACKEND} index")
+    return schemes
+
+def search_pinecone(query: str, top_k: int = 20, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Search the configured vector index (Pinecone or local) for relevant schemes.
+
+    `filter` is a Pinecone metadata filter, e.g. {"state": {"$in": [...]}}.
+    """
+    logger.info(f"Searching {VECTOR_BACKEND} index with query: {query} (top_k={top_k}, filter={filter})")
+    try:
+        embedding = _query_embedding(query)
+        query_kwargs = {'filter': filter} if filter else {}
+        _refresh_local_index()
+        with timed("vector_query"):
+            results = index.query(
+                vector=embedding,
+                top_k=top_k,
+                include_metadata=True,
+                **query_kwargs
+            )
+        return _parse_matches(results)
+    except Exception as e:
+        logger.error(f"{VECTOR_BACKEND} index query failed: {str(e)}")
         return []
 
-def rerank_with_llm(
-    schemes: List[Dict[str, Any]],
-    user_details: Dict[str, Any],
-    top_k: int = 20,
-    batch_size: int = 5
-) -> List[Dict[str, Any]]:
-    """Re-rank schemes using Groq LLM in batches based on user profile similarity."""
-    logger.info(f"Re-ranking {len(schemes)} schemes with Groq LLM in batches of {batch_size}")
+async def asearch_pinecone(query: str, top_k: int = 20, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Async version of search_pinecone.
+
+    Embedding runs in a worker thread (it is CPU-bound); the query uses the
+    asyncio Pinecone client when it is open and a worker thread otherwise.
+    """
+    logger.info(f"Searching {VECTOR_BACKEND} index with query: {query} (top_k={top_k}, filter={filter})")
+    try:
+        embedding = await asyncio.to_thread(_query_embedding, query)
+        query_kwargs = {'filter': filter} if filter else {}
+        _refresh_local_index()
+        with timed("vector_query"):
+            if _async_index is not None:
+                results = await _async_index.query(vector=embedding, top_k=top_k, include_metadata=True, **query_kwargs)
+            else:
+                results = await asyncio.to_thread(
+                    index.query, vector=embedding, top_k=top_k, include_metadata=True, **query_kwargs
+                )
+        return _parse_matches(results)
+    except Exception as e:
+        logger.error(f"{VECTOR_BACKEND} index query failed: {str(e)}")
+        return []
+
+def _vector_fallback_score(vector_score: float) -> int:
+    """Map a cosine similarity onto the 0-100 LLM score scale."""
+    return min(max(int(round(float(vector_score) * 100)), 0), 100)
+
+def _parse_scores(response_text: str, batch_size: int) -> List[int]:
+    try:
+        scores = json.loads(response_text.strip())
+    except json.JSONDecodeError:
+        logger.warning(f"Invalid JSON response from LLM")
+        raise ValueError("Invalid JSON response from LLM")
+    if not isinstance(scores, list) or len(scores) != batch_size:
+        raise ValueError(f"Invalid scores format or count: {scores}")
+    return [min(max(int(score), 0), 100) for score in scores]
+
+def _score_batch(prompt: str, batch_size: int, timeout: float) -> List[int]:
+    """Score one rerank batch with Groq, respecting the shared rate limiter."""
+    if not groq_rate_limiter.acquire(timeout=timeout):
+        raise TimeoutError("Groq rate limit wait exceeded batch timeout")
+    with timed("rerank_batch"):
+        response = llm.invoke(prompt)
+    record_llm_response("rerank", response)
+    return _parse_scores(response.content, batch_size)
+
+async def _ascore_batch(prompt: str, batch_size: int, timeout: float) -> Optional[List[int]]:
+    """Async version of _score_batch; returns None if the LLM call exceeds the timeout.
+
+    The rate limiter wait and the LLM call share one deadline, so a batch never takes longer than `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    if not await groq_rate_limiter.acquire_async(timeout=timeout):
+        raise TimeoutError("Groq rate limit wait exceeded batch timeout")
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    try:
+        with timed("rerank_batch"):
+            response = await asyncio.wait_for(llm.ainvoke(prompt), remaining)
+    except asyncio.TimeoutError:
+        return None
+    record_llm_response("rerank", response)
+    return _parse_scores(response.content, batch_size)
+
+def _ranked_entry(scheme: Dict[str, Any], score: int, fallback: bool = False) -> Dict[str, Any]:
+    entry = {
+        'id': scheme['id'],
+        'llm_score': min(max(int(score), 0), 100),
+        'pinecone_score': scheme['score'],
+        'metadata': scheme['metadata']
+    }
+    if fallback:
+        # Not scored by the LLM (timeout or failure); such results are not cached
+        entry['score_fallback'] = True
+    return entry
+
+def _prepare_rerank(schemes: List[Dict[str, Any]], user_details: Dict[str, Any], batch_size: int):
+    """Split schemes into already-scored entries and LLM batches.
+
+    Returns (fingerprint, ranked_schemes, batches, prompts).
+    """
     prompt_template = PromptTemplate(
         input_variables=["user_details", "schemes"],
         template="""Score the relevance of each government scheme for the user (0-100). 
@@ -197,40 +497,158 @@ def rerank_with_llm(
     ranked_schemes = []
     user_details_str = json.dumps(user_details, indent=2, ensure_ascii=False)
 
-    for i in range(0, len(schemes), batch_size):
-        batch = schemes[i:i + batch_size]
+    # Reuse scores already computed for this profile; only uncached schemes go to the LLM
+    fingerprint = profile_fingerprint(user_details)
+    cached_scores = rerank_cache.get_many(fingerprint, schemes)
+    for scheme in schemes:
+        scheme_id = str(scheme['metadata']['scheme_id'])
+        if scheme_id in cached_scores:
+            ranked_schemes.append(_ranked_entry(scheme, cached_scores[scheme_id]))
+    uncached = [scheme for scheme in schemes if str(scheme['metadata']['scheme_id']) not in cached_scores]
+    logger.info(f"Rerank cache: {len(cached_scores)} cached, {len(uncached)} to score with LLM")
+
+    batches = [uncached[i:i + batch_size] for i in range(0, len(uncached), batch_size)]
+
+    prompts = []
+    for batch in batches:
         batch_schemes = [json.dumps(scheme['metadata'], indent=2, ensure_ascii=False) for scheme in batch]
         schemes_str = "\n\n".join([f"Scheme {j+1}: {s}" for j, s in enumerate(batch_schemes)])
-        prompt = prompt_template.format(
+        prompts.append(prompt_template.format(
             user_details=user_details_str,
             schemes=schemes_str
-        )
-        try:
-            response = llm.invoke(prompt)
-            response_text = response.content.strip()
-            try:
-                scores = json.loads(response_text)
-                if not isinstance(scores, list) or len(scores) != len(batch):
-                    raise ValueError(f"Invalid scores format or count: {scores}")
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON response from LLM")
-                scores = [0] * len(batch)  # Fallback: assign 0 scores
-        except Exception as e:
-            logger.warning(f"Failed to re-rank batch {i+1}-{i+len(batch)}: {str(e)}")
+        ))
+    return fingerprint, ranked_schemes, batches, prompts
+
+def _collect_batches(
+    ranked_schemes: List[Dict[str, Any]],
+    batches: List[List[Dict[str, Any]]],
+    outcomes: List[Any],
+    batch_size: int
+) -> List[Any]:
+    """Add every batch's schemes to ranked_schemes and return the (scheme, score) pairs worth caching.
+
+    Each outcome is the batch's score list, None if it timed out, or the exception it raised.
+    """
+    to_cache = []
+    for position, (batch, outcome) in enumerate(zip(batches, outcomes)):
+        first = position * batch_size + 1
+        last = position * batch_size + len(batch)
+        if outcome is None:
+            logger.warning(f"Re-ranking batch {first}-{last} timed out, falling back to vector scores")
+            record_event("rerank_batch_timeout")
+            scores = [_vector_fallback_score(scheme['score']) for scheme in batch]
+        elif isinstance(outcome, TimeoutError):
+            logger.warning(f"Re-ranking batch {first}-{last} timed out ({str(outcome)}), falling back to vector scores")
+            record_event("rerank_rate_limit_timeout")
+            scores = [_vector_fallback_score(scheme['score']) for scheme in batch]
+        elif isinstance(outcome, BaseException):
+            logger.warning(f"Failed to re-rank batch {first}-{last}: {str(outcome)}")
+            record_event("rerank_batch_failed")
             scores = [0] * len(batch)  # Fallback: assign 0 scores
-        for scheme, score in zip(batch, scores):
-            ranked_schemes.append({
-                'id': scheme['id'],
-                'llm_score': min(max(int(score), 0), 100),
-                'pinecone_score': scheme['score'],
-                'metadata': scheme['metadata']
-            })
-        logger.info(f"Successfully re-ranked batch {i+1}-{i+len(batch)}")
+        else:
+            scores = outcome
+            to_cache.extend(zip(batch, scores))
+            logger.info(f"Successfully re-ranked batch {first}-{last}")
+        fallback = scores is not outcome
+        ranked_schemes.extend(_ranked_entry(scheme, score, fallback) for scheme, score in zip(batch, scores))
+    return to_cache
+
+def _wait_with_deadlines(futures: List[Future], started: Dict[int, float], timeout: float) -> List[Any]:
+    """Wait for each future up to `timeout` seconds after it started running.
+
+    started maps a future's position to its start time (set by the worker).
+    Returns each future's result or exception, or None if it missed its deadline.
+    """
+    pending = set(range(len(futures)))
+    while pending:
+        now = time.monotonic()
+        for position in list(pending):
+            if futures[position].done() or (position in started and now - started[position] >= timeout):
+                pending.discard(position)
+        if not pending:
+            break
+        deadlines = [started[position] + timeout - now for position in pending if position in started]
+        # Queued futures have no deadline yet; look again soon so one that starts is not overlooked
+        next_check = min(deadlines) if deadlines else timeout
+        if len(deadlines) < len(pending):
+            next_check = min(next_check, 0.1)
+        wait([futures[position] for position in pending], timeout=max(next_check, 0), return_when=FIRST_COMPLETED)
+    return [(future.exception() or future.result()) if future.done() and not future.cancelled() else None
+            for future in futures]
 
+def _top_ranked(ranked_schemes: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
     ranked_schemes.sort(key=lambda x: (x['llm_score'], x['pinecone_score']), reverse=True)
     logger.info(f"Re-ranked {len(ranked_schemes)} schemes, selecting top {top_k}")
     return ranked_schemes[:top_k]
 
+def rerank_with_llm(
+    schemes: List[Dict[str, Any]],
+    user_details: Dict[str, Any],
+    top_k: int = 20,
+    batch_size: int = 5,
+    max_concurrency: int = None,
+    batch_timeout: float = None
+) -> List[Dict[str, Any]]:
+    """Re-rank schemes using Groq LLM in concurrent batches based on user profile similarity."""
+    max_concurrency = max_concurrency or RERANK_MAX_CONCURRENCY
+    batch_timeout = batch_timeout or RERANK_BATCH_TIMEOUT
+    logger.info(f"Re-ranking {len(schemes)} schemes with Groq LLM in batches of {batch_size} (concurrency {max_concurrency})")
+    fingerprint, ranked_schemes, batches, prompts = _prepare_rerank(schemes, user_details, batch_size)
+
+    # Dispatch all batches at once; each worker waits on the shared Groq token bucket
+    outcomes = []
+    if batches:
+        workers = min(max_concurrency, len(batches))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank")
+        started: Dict[int, float] = {}
+
+        def score(position: int, prompt: str, size: int) -> List[int]:
+            started[position] = time.monotonic()
+            return _score_batch(prompt, size, batch_timeout)
+
+        futures = [
+            executor.submit(score, position, prompt, len(batch))
+            for position, (prompt, batch) in enumerate(zip(prompts, batches))
+        ]
+        # Each batch's timeout starts when a worker picks it up, not when it was queued
+        outcomes = _wait_with_deadlines(futures, started, batch_timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    rerank_cache.put_many(fingerprint, _collect_batches(ranked_schemes, batches, outcomes, batch_size))
+    return _top_ranked(ranked_schemes, top_k)
+
+async def arerank_with_llm(
+    schemes: List[Dict[str, Any]],
+    user_details: Dict[str, Any],
+    top_k: int = 20,
+    batch_size: int = 5,
+    max_concurrency: int = None,
+    batch_timeout: float = None
+) -> List[Dict[str, Any]]:
+    """Async version of rerank_with_llm: batches are awaited concurrently on the event loop.
+
+    A semaphore caps in-flight batches per request (like the thread pool in the
+    sync version) and each batch's timeout starts when it gets a slot.
+    """
+    max_concurrency = max_concurrency or RERANK_MAX_CONCURRENCY
+    batch_timeout = batch_timeout or RERANK_BATCH_TIMEOUT
+    logger.info(f"Re-ranking {len(schemes)} schemes with Groq LLM in batches of {batch_size} (async, concurrency {max_concurrency})")
+    fingerprint, ranked_schemes, batches, prompts = await asyncio.to_thread(_prepare_rerank, schemes, user_details, batch_size)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def score(prompt: str, size: int) -> Optional[List[int]]:
+        async with semaphore:
+            return await _ascore_batch(prompt, size, batch_timeout)
+
+    outcomes = await asyncio.gather(
+        *(score(prompt, len(batch)) for prompt, batch in zip(prompts, batches)),
+        return_exceptions=True
+    )
+    to_cache = _collect_batches(ranked_schemes, batches, list(outcomes), batch_size)
+    await asyncio.to_thread(rerank_cache.put_many, fingerprint, to_cache)
+    return _top_ranked(ranked_schemes, top_k)
+
 def save_recommended_schemes(schemes: List[Dict[str, Any]], output_path: str):
     """Save recommended schemes to JSON file."""
     logger.info(f"Saving {len(schemes)} schemes to {output_path}")
@@ -255,29 +673,312 @@ def save_recommended_schemes(schemes: List[Dict[str, Any]], output_path: str):
     except Exception as e:
         logger.error(f"Failed to save schemes to {output_path}: {str(e)}")
 
+# Single writer thread: keeps persistence off the request path and serializes writes to the same file
+_persistence_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+
+def save_recommended_schemes_async(schemes: List[Dict[str, Any]], output_path: str) -> Future:
+    """Queue recommended schemes to be written to a JSON file in the background."""
+    return _persistence_executor.submit(save_recommended_schemes, list(schemes), output_path)
+
+def flush_persistence(timeout: float = None):
+    """Block until all queued recommendation writes have finished."""
+    _persistence_executor.submit(lambda: None).result(timeout=timeout)
+
+def allowed_states(user_state: str) -> List[str]:
+    """Normalized states whose schemes a user may receive: their own state(s) plus national schemes."""
+    states = [state for state in find_states(user_state) if state != NATIONAL_LEVEL] or [normalize_state(user_state)]
+    return [state for state in states if state] + [NATIONAL_LEVEL]
+
+def _scheme_states(scheme: Dict[str, Any]) -> set:
+    raw_state = str(scheme['metadata'].get('state', ''))
+    return set(find_states(raw_state)) or {normalize_state(raw_state)}
+
+def _filter_candidates(
+    schemes: List[Dict[str, Any]],
+    keyword_hits: Optional[List[Dict[str, Any]]],
+    top_k: int,
+    allowed: set,
+    user_details: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Fuse keyword hits (if any) into the vector results and apply state and eligibility filtering.
+
+    Returns (retrieved, candidates).
+    """
+    if keyword_hits is not None:
+        # Keyword hits catch exact terms ("post-matric", "fisherman") the dense search ranks too low
+        schemes = reciprocal_rank_fusion([schemes, keyword_hits], top_k=top_k)
+    # Safety net for backends that ignored the filter (or when no vocabulary was available)
+    candidates = [scheme for scheme in schemes if _scheme_states(scheme) & allowed]
+    # Drop schemes whose structured eligibility rules clearly exclude this profile before any LLM call
+    candidates = prune_ineligible(candidates, user_details)
+    logger.info(f"top_k={top_k}: {len(schemes)} retrieved, {len(candidates)} candidates after state and eligibility filtering")
+    return schemes, candidates
+
+def _retrieve_candidates(query: str, user_details: Dict[str, Any], needed: int) -> List[Dict[str, Any]]:
+    """Retrieve state-matching, not clearly ineligible schemes, widening top_k until enough are found.
+
+    The state restriction is pushed into the vector (and keyword) query when
+    the state vocabulary is available; otherwise it is applied afterwards and
+    the adaptive expansion makes up for the discarded hits.
+    """
+    states = allowed_states(str(user_details.get('state', '')))
+    raw_states = get_scheme_store().state_values(states)
+    vector_filter = {"state": {"$in": raw_states}} if raw_states else None
+    allowed = set(states)
+    top_k = needed
+    while True:
+        schemes = search_pinecone(query, top_k=top_k, filter=vector_filter)
+        exhausted = len(schemes) < top_k
+        keyword_hits = search_fts(query, top_k=max(FTS_TOP_K, top_k), states=raw_states or None) if HYBRID_SEARCH else None
+        schemes, candidates = _filter_candidates(schemes, keyword_hits, top_k, allowed, user_details)
+        if len(candidates) >= needed or exhausted or top_k >= RETRIEVAL_MAX_TOP_K:
+            # Keep the rerank cost bounded however far top_k was widened
+            return candidates[:needed]
+        top_k = min(top_k * 2, RETRIEVAL_MAX_TOP_K)
+
+async def _aretrieve_candidates(query: str, user_details: Dict[str, Any], needed: int) -> List[Dict[str, Any]]:
+    """Async version of _retrieve_candidates; vector and keyword search run concurrently."""
+    states = allowed_states(str(user_details.get('state', '')))
+    raw_states = await asyncio.to_thread(get_scheme_store().state_values, states)
+    vector_filter = {"state": {"$in": raw_states}} if raw_states else None
+    allowed = set(states)
+    top_k = needed
+    while True:
+        vector_search = asearch_pinecone(query, top_k=top_k, filter=vector_filter)
+        if HYBRID_SEARCH:
+            keyword_search = asyncio.to_thread(search_fts, query, top_k=max(FTS_TOP_K, top_k), states=raw_states or None)
+            schemes, keyword_hits = await asyncio.gather(vector_search, keyword_search)
+        else:
+            schemes, keyword_hits = await vector_search, None
+        exhausted = len(schemes) < top_k
+        # Eligibility pruning reads rules from SQLite, so it stays off the event loop too
+        schemes, candidates = await asyncio.to_thread(_filter_candidates, schemes, keyword_hits, top_k, allowed, user_details)
+        if len(candidates) >= needed or exhausted or top_k >= RETRIEVAL_MAX_TOP_K:
+            return candidates[:needed]
+        top_k = min(top_k * 2, RETRIEVAL_MAX_TOP_K)
+
+# Progress callback: called with "retrieving", then "ranking" and the vector-ranked candidates
+SearchProgress = Callable[[str, Optional[List[Dict[str, Any]]]], None]
+
+def _run_pipeline(user_details: Dict[str, Any], progress: Optional[SearchProgress] = None) -> List[Dict[str, Any]]:
+    """Run query generation, retrieval, filtering and reranking for sanitized user details."""
+    with timed("search_total"):
+        query = generate_query(user_details)
+        with timed("retrieval"):
+            candidates = _retrieve_candidates(query, user_details, needed=RETRIEVAL_CANDIDATES)
+        if progress:
+            progress("ranking", candidates)
+        if not candidates:
+            logger.warning("No schemes found after state and eligibility filtering")
+            record_event("no_candidates")
+            return []
+        with timed("rerank"):
+            return rerank_with_llm(candidates, user_details, top_k=RETRIEVAL_CANDIDATES)
+
+async def _arun_pipeline(user_details: Dict[str, Any], progress: Optional[SearchProgress] = None) -> List[Dict[str, Any]]:
+    """Async version of _run_pipeline."""
+    with timed("search_total"):
+        query = await agenerate_query(user_details)
+        with timed("retrieval"):
+            candidates = await _aretrieve_candidates(query, user_details, needed=RETRIEVAL_CANDIDATES)
+        if progress:
+            progress("ranking", candidates)
+        if not candidates:
+            logger.warning("No schemes found after state and eligibility filtering")
+            record_event("no_candidates")
+            return []
+        with timed("rerank"):
+            return await arerank_with_llm(candidates, user_details, top_k=RETRIEVAL_CANDIDATES)
+
+def _cacheable(ranked_schemes: List[Dict[str, Any]]) -> bool:
+    return bool(ranked_schemes) and not any(scheme.get('score_fallback') for scheme in ranked_schemes)
+
+def _for_profile(schemes: List[Dict[str, Any]], user_details: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Copy schemes computed for another profile with the same key, dropping those this profile is not eligible for.
+
+    The key buckets income into brackets, so a result can include schemes whose
+    income limit falls between the two profiles' exact incomes.
+    """
+    return prune_ineligible(copy_schemes(schemes), user_details)
+
+class _SharedProgress:
+    """Relays the leading search's "ranking" candidates to callers that joined it.
+
+    Callers register before joining a flight and unregister when they have
+    their result, so a late delivery never reaches a finished search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watchers: Dict[Tuple[str, int], List[list]] = {}
+        self._published: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+    def _deliver(self, watchers: List[list], candidates: List[Dict[str, Any]]):
+        def notify():
+            for watcher in watchers:
+                progress, user_details, active = watcher
+                if active:
+                    progress("ranking", _for_profile(candidates, user_details))
+        try:
+            # Pruning reads SQLite, so keep it off the event loop
+            asyncio.get_running_loop().run_in_executor(None, notify)
+        except RuntimeError:
+            notify()
+
+    def watch(self, flight: Tuple[str, int], progress: Optional[SearchProgress], user_details: Dict[str, Any]) -> Optional[list]:
+        if progress is None:
+            return None
+        watcher = [progress, user_details, True]
+        with self._lock:
+            published = self._published.get(flight)
+            if published is None:
+                self._watchers.setdefault(flight, []).append(watcher)
+        if published is not None:
+            self._deliver([watcher], published)
+        return watcher
+
+    def unwatch(self, flight: Tuple[str, int], watcher: Optional[list]):
+        if watcher is None:
+            return
+        with self._lock:
+            watcher[2] = False
+            watchers = self._watchers.get(flight, [])
+            if watcher in watchers:
+                watchers.remove(watcher)
+
+    def publish(self, flight: Tuple[str, int], candidates: List[Dict[str, Any]]):
+        with self._lock:
+            self._published[flight] = candidates
+            watchers = self._watchers.pop(flight, [])
+        if watchers:
+            self._deliver(watchers, candidates)
+
+    def finish(self, flight: Tuple[str, int]):
+        with self._lock:
+            self._published.pop(flight, None)
+            self._watchers.pop(flight, None)
+
+_shared_progress = _SharedProgress()
+
+def _leader_progress(flight: Tuple[str, int], progress: Optional[SearchProgress]) -> SearchProgress:
+    def report(stage: str, candidates: Optional[List[Dict[str, Any]]]):
+        if progress:
+            progress(stage, candidates)
+        if stage == "ranking" and candidates is not None:
+            _shared_progress.publish(flight, candidates)
+    return report
+
+def _cached_recommendations(user_details: Dict[str, Any]) -> Tuple[str, int, Optional[List[Dict[str, Any]]]]:
+    key = recommendation_key(user_details)
+    generation = get_scheme_store().generation
+    cached = recommendation_cache.get(key, generation)
+    if cached is not None:
+        logger.info(f"Serving cached recommendations for profile key {key[:12]}")
+        record_event("recommendation_cache_hit")
+        cached = prune_ineligible(cached, user_details)
+    return key, generation, cached
+
+def _share_result(
+    key: str,
+    generation: int,
+    ranked_schemes: List[Dict[str, Any]],
+    leader: bool,
+    user_details: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    if leader:
+        if _cacheable(ranked_schemes):
+            recommendation_cache.put(key, generation, ranked_schemes)
+        return ranked_schemes
+    logger.info(f"Joined an in-flight search for profile key {key[:12]}")
+    record_event("search_coalesced")
+    return _for_profile(ranked_schemes, user_details)
+
+def _search_for_details(
+    user_details: Dict[str, Any],
+    output_path: Optional[str] = None,
+    progress: Optional[SearchProgress] = None
+) -> List[Dict[str, Any]]:
+    """Recommend schemes for sanitized user details.
+
+    Results are cached per canonical profile (see profile_canonical.recommendation_key)
+    and concurrent searches for the same key share one pipeline run. Shared
+    results are re-checked against this profile's eligibility rules.
+    """
+    if progress:
+        progress("retrieving", None)
+    key, generation, ranked_schemes = _cached_recommendations(user_details)
+    if ranked_schemes is None:
+        flight = (key, generation)
+        watcher = _shared_progress.watch(flight, progress, user_details)
+
+        def lead():
+            _shared_progress.unwatch(flight, watcher)
+            try:
+                return _run_pipeline(user_details, _leader_progress(flight, progress))
+            finally:
+                _shared_progress.finish(flight)
+
+        try:
+            ranked_schemes, leader = _search_flights.do(flight, lead)
+        finally:
+            _shared_progress.unwatch(flight, watcher)
+        ranked_schemes = _share_result(key, generation, ranked_schemes, leader, user_details)
+    if output_path:
+        save_recommended_schemes_async(ranked_schemes, output_path)
+    return ranked_schemes
+
+def search_schemes_for_profile(
+    profile: Dict[str, Any],
+    output_path: Optional[str] = None,
+    progress: Optional[SearchProgress] = None
+) -> List[Dict[str, Any]]:
+    """Search schemes for an in-memory user profile.
+
+    Nothing touches the disk unless output_path is given, in which case the
+    results are written to it asynchronously. `progress` is notified as the
+    pipeline moves from retrieval to reranking.
+    """
+    return _search_for_details(sanitize_user_details(profile), output_path, progress)
+
+async def asearch_schemes_for_profile(
+    profile: Dict[str, Any],
+    output_path: Optional[str] = None,
+    progress: Optional[SearchProgress] = None
+) -> List[Dict[str, Any]]:
+    """Async version of search_schemes_for_profile for the ASGI app.
+
+    LLM calls are awaited on the event loop and blocking work (embedding,
+    SQLite, local vector search) runs in worker threads, so a request holds no
+    thread while it waits on Groq or Pinecone.
+    """
+    user_details = sanitize_user_details(profile)
+    if progress:
+        progress("retrieving", None)
+    key, generation, ranked_schemes = await asyncio.to_thread(_cached_recommendations, user_details)
+    if ranked_schemes is None:
+        flight = (key, generation)
+        watcher = _shared_progress.watch(flight, progress, user_details)
+
+        async def lead():
+            _shared_progress.unwatch(flight, watcher)
+            try:
+                return await _arun_pipeline(user_details, _leader_progress(flight, progress))
+            finally:
+                _shared_progress.finish(flight)
+
+        try:
+            ranked_schemes, leader = await _search_flights.ado(flight, lead)
+        finally:
+            _shared_progress.unwatch(flight, watcher)
+        ranked_schemes = await asyncio.to_thread(_share_result, key, generation, ranked_schemes, leader, user_details)
+    if output_path:
+        save_recommended_schemes_async(ranked_schemes, output_path)
+    return ranked_schemes
+
 def search_schemes(json_path: str, output_path: str = "recommended_schemes2.json") -> List[Dict[str, Any]]:
     """Main function to execute search for schemes based on user details."""
     user_details = load_user_details(json_path)
-    query = generate_query(user_details)
-    schemes = search_pinecone(query, top_k=20)
-    if not schemes:
-        logger.warning("No schemes found in Pinecone search")
-        save_recommended_schemes([], output_path)
-        return []
-    user_state = str(user_details.get('state', '')).lower()
-    filtered_schemes = [
-        scheme for scheme in schemes
-        if user_state == str(scheme['metadata'].get('state', '')).lower() or
-           any(term in str(scheme['metadata'].get('state', '')).lower() for term in ['all india', 'central', 'nationwide'])
-    ]
-    logger.info(f"Filtered to {len(filtered_schemes)} schemes with matching state or Central")
-    if not filtered_schemes:
-        logger.warning("No schemes found after state filtering")
-        save_recommended_schemes([], output_path)
-        return []
-    ranked_schemes = rerank_with_llm(filtered_schemes, user_details, top_k=20)
-    save_recommended_schemes(ranked_schemes, output_path)
-    return ranked_schemes
+    return _search_for_details(user_details, output_path)
 
 def main():
     """Test the scheme search agent with filtered query."""
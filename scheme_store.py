@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from metrics import timed
+from scheme_documents import build_scheme_document, DOCUMENTS_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Columns loaded for a scheme detail view
+DETAIL_COLUMNS = [
+    'scheme_id', 'scheme_name', 'detailed_description', 'eligibility_criteria',
+    'application_process', 'documents_required'
+]
+
+# Fixed SQL text so each thread's connection reuses its prepared statements
+_FETCH_ONE_SQL = f"SELECT {', '.join(DETAIL_COLUMNS)} FROM schemes WHERE scheme_id = ?"
+# json_each lets one prepared statement serve id lists of any length
+_FETCH_MANY_SQL = (
+    f"SELECT {', '.join(DETAIL_COLUMNS)} FROM schemes "
+    f"WHERE scheme_id IN (SELECT value FROM json_each(?))"
+)
+_FETCH_DOCUMENTS_SQL = (
+    "SELECT scheme_id, document FROM scheme_documents "
+    "WHERE scheme_id IN (SELECT value FROM json_each(?))"
+)
+_FETCH_RULES_SQL = (
+    "SELECT scheme_id, rules FROM scheme_eligibility_rules "
+    "WHERE scheme_id IN (SELECT value FROM json_each(?))"
+)
+
+# Columns returned for keyword search hits (the same keys as the vector index metadata)
+SEARCH_COLUMNS = ['scheme_id', 'scheme_name', 'brief_description', 'eligibility_criteria', 'state', 'tags', 'category']
+# bm25() weights for scheme_id (unindexed), scheme_name, tags, brief_description, eligibility_criteria, benefits
+_FTS_WEIGHTS = "0.0, 4.0, 3.0, 1.5, 1.0, 0.75"
+_SEARCH_SQL = (
+    f"SELECT {', '.join('s.' + c for c in SEARCH_COLUMNS)}, bm25(schemes_fts, {_FTS_WEIGHTS}) AS rank "
+    f"FROM schemes_fts JOIN schemes s ON s.scheme_id = schemes_fts.scheme_id "
+    f"WHERE schemes_fts MATCH ? ORDER BY rank LIMIT ?"
+)
+_SEARCH_IN_STATES_SQL = _SEARCH_SQL.replace(
+    "ORDER BY rank", "AND s.state IN (SELECT value FROM json_each(?)) ORDER BY rank"
+)
+
+def _normalize_id(scheme_id: Any) -> Any:
+    text = str(scheme_id).strip()
+    return int(text) if text.lstrip('-').isdigit() else text
+
+def _copy_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: list(value) if isinstance(value, list) else value for key, value in document.items()}
+
+class SchemeStore:
+    """Read-only access to the schemes table with per-thread connections and a row LRU.
+
+    Connections are opened read-only once per thread and reused. If the database
+    file is replaced (e.g. by a reload), connections and cached rows are
+    refreshed on the next lookup.
+    """
+
+    def __init__(self, db_path: str = "new_schemes.db", cache_size: int = 2048, reload_check_interval: float = 1.0):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.reload_check_interval = reload_check_interval
+        self._local = threading.local()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._file_signature = self._signature()
+        self._last_reload_check = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self._fts_warned = False
+        self._documents_warned = False
+        self._state_vocabulary: Optional[Dict[str, List[str]]] = None
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.db_path)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _check_reload(self):
+        """Detect a replaced or rewritten database file and drop stale state."""
+        now = time.monotonic()
+        if now - self._last_reload_check < self.reload_check_interval:
+            return
+        self._last_reload_check = now
+        signature = self._signature()
+        if signature != self._file_signature:
+            with self._lock:
+                self._file_signature = signature
+                self._generation += 1
+                self._cache.clear()
+                self._state_vocabulary = None
+            logger.info(f"Detected change to {self.db_path}, refreshed scheme store")
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped whenever the database file is replaced or rewritten."""
+        self._check_reload()
+        return self._generation
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        if conn is not None:
+            conn.close()
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, cached_statements=64)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        self._local.conn = conn
+        self._local.generation = self._generation
+        return conn
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._cache.get(key)
+            if row is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return row
+
+    def _cache_put(self, key: str, row: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = row
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def fetch(self, scheme_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the detail row for one scheme, or None if it does not exist."""
+        self._check_reload()
+        key = str(scheme_id).strip()
+        row = self._cache_get(key)
+        if row is not None:
+            return dict(row)
+        with timed("sqlite_fetch"):
+            result = self._connection().execute(_FETCH_ONE_SQL, (_normalize_id(scheme_id),)).fetchone()
+        if result is None:
+            return None
+        row = dict(result)
+        self._cache_put(key, row)
+        return dict(row)
+
+    def fetch_many(self, scheme_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Return {scheme_id: row} for all existing schemes among ids, using a single query for cache misses."""
+        self._check_reload()
+        rows: Dict[str, Dict[str, Any]] = {}
+        missing: List[Any] = []
+        for scheme_id in scheme_ids:
+            key = str(scheme_id).strip()
+            row = self._cache_get(key)
+            if row is not None:
+                rows[key] = dict(row)
+            else:
+                missing.append(_normalize_id(scheme_id))
+        if missing:
+            with timed("sqlite_fetch_many"):
+                results = self._connection().execute(_FETCH_MANY_SQL, (json.dumps(missing),)).fetchall()
+            for result in results:
+                row = dict(result)
+                key = str(row['scheme_id'])
+                self._cache_put(key, row)
+                rows[key] = dict(row)
+        return rows
+
+    def fetch_documents(self, scheme_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Return {scheme_id: structured detail document} (see scheme_documents) for existing schemes.
+
+        Documents come from the scheme_documents table; schemes without a current
+        stored document (table not built yet, or built by an older splitter) are
+        split from their detail row on the fly.
+        """
+        self._check_reload()
+        documents: Dict[str, Dict[str, Any]] = {}
+        missing: List[Any] = []
+        for scheme_id in scheme_ids:
+            key = str(scheme_id).strip()
+            document = self._cache_get(f"doc:{key}")
+            if document is not None:
+                documents[key] = _copy_document(document)
+            else:
+                missing.append(_normalize_id(scheme_id))
+        if not missing:
+            return documents
+        try:
+            with timed("sqlite_fetch_documents"):
+                results = self._connection().execute(_FETCH_DOCUMENTS_SQL, (json.dumps(missing),)).fetchall()
+        except sqlite3.OperationalError as e:
+            if not self._documents_warned:
+                logger.warning(f"Pre-rendered scheme documents unavailable, splitting on the fly: {str(e)}")
+                self._documents_warned = True
+            results = []
+        for scheme_id, stored in results:
+            document = json.loads(stored)
+            if document.get('version') == DOCUMENTS_VERSION:
+                documents[str(scheme_id)] = document
+        unbuilt = [scheme_id for scheme_id in missing if str(scheme_id) not in documents]
+        for key, row in self.fetch_many(unbuilt).items():
+            documents[key] = build_scheme_document(row)
+        for scheme_id in missing:
+            document = documents.get(str(scheme_id))
+            if document is not None:
+                self._cache_put(f"doc:{scheme_id}", document)
+                documents[str(scheme_id)] = _copy_document(document)
+        return documents
+
+    def fetch_document(self, scheme_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the structured detail document for one scheme, or None if it does not exist."""
+        return self.fetch_documents([scheme_id]).get(str(scheme_id).strip())
+
+    def fetch_rules(self, scheme_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Return {scheme_id: extracted eligibility rules} (see eligibility_rules) for schemes that have them."""
+        self._check_reload()
+        rules_by_id: Dict[str, Dict[str, Any]] = {}
+        missing: List[Any] = []
+        for scheme_id in scheme_ids:
+            key = str(scheme_id).strip()
+            rules = self._cache_get(f"rules:{key}")
+            if rules is not None:
+                rules_by_id[key] = dict(rules)
+            else:
+                missing.append(_normalize_id(scheme_id))
+        if not missing:
+            return rules_by_id
+        with timed("sqlite_fetch_rules"):
+            results = self._connection().execute(_FETCH_RULES_SQL, (json.dumps(missing),)).fetchall()
+        for scheme_id, stored in results:
+            rules = json.loads(stored)
+            self._cache_put(f"rules:{scheme_id}", rules)
+            rules_by_id[str(scheme_id)] = dict(rules)
+        return rules_by_id
+
+    def state_values(self, normalized_states: Iterable[str]) -> Optional[List[str]]:
+        """Return the raw schemes.state values that normalize to any of the given states.
+
+        Returns None if the state vocabulary has not been built, so callers can
+        fall back to unfiltered retrieval.
+        """
+        self._check_reload()
+        vocabulary = self._state_vocabulary
+        if vocabulary is None:
+            try:
+                rows = self._connection().execute(
+                    "SELECT state_norm, raw_state FROM scheme_state_vocabulary"
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"State vocabulary unavailable: {str(e)}")
+                return None
+            vocabulary = {}
+            for state_norm, raw_state in rows:
+                vocabulary.setdefault(state_norm, []).append(raw_state)
+            self._state_vocabulary = vocabulary
+        values: List[str] = []
+        for state in normalized_states:
+            values.extend(v for v in vocabulary.get(state, []) if v not in values)
+        return values
+
+    def search_text(self, match_query: str, limit: int = 20, states: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Run an FTS5 MATCH query against schemes_fts, best BM25 match first.
+
+        `states` restricts hits to those raw schemes.state values. Returns an
+        empty list if the keyword index has not been built.
+        """
+        self._check_reload()
+        try:
+            if states is None:
+                rows = self._connection().execute(_SEARCH_SQL, (match_query, limit)).fetchall()
+            else:
+                rows = self._connection().execute(
+                    _SEARCH_IN_STATES_SQL, (match_query, json.dumps(states), limit)
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            if not self._fts_warned:
+                logger.warning(f"Keyword search unavailable: {str(e)}")
+                self._fts_warned = True
+            return []
+        return [dict(row) for row in rows]
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached_rows': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+_stores: Dict[str, SchemeStore] = {}
+_stores_lock = threading.Lock()
+
+def get_scheme_store(db_path: str = "new_schemes.db") -> SchemeStore:
+    """Return the shared SchemeStore for a database path."""
+    key = os.path.abspath(db_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = SchemeStore(db_path, cache_size=int(os.getenv("SCHEME_ROW_CACHE_SIZE", "2048")))
+                _stores[key] = store
+    return store
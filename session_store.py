@@ -0,0 +1,177 @@
+import sys
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate deep memory footprint of an object graph in bytes."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or isinstance(obj, (type, type(sys), type(estimate_size))):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, (str, bytes)):
+        size += estimate_size(vars(obj), seen)
+    return size
+
+def _state_size(state: Dict[str, Any]) -> int:
+    return estimate_size({k: v for k, v in state.items() if k not in ('lock', 'async_lock')})
+
+def new_session_state() -> Dict[str, Any]:
+    """Per-conversation state held for one browser session."""
+    return {
+        'schemes': [],
+        'agent': None,
+        'selected_scheme': None,
+        # Id of the latest recommendation job; only that job may attach its agent
+        'job_id': None,
+        # Serializes agent calls when the same session sends overlapping requests
+        # (the ASGI app adds an 'async_lock' on its event loop, see asgi_app.get_session_state)
+        'lock': threading.RLock()
+    }
+
+def start_session_job(state: Dict[str, Any], job_id: str):
+    """Make job_id the session's current job and drop the previous results and agent."""
+    state['job_id'] = job_id
+    state['schemes'] = []
+    state['agent'] = None
+    state['selected_scheme'] = None
+
+class SessionStore:
+    """Bounded, thread-safe store of per-session agent state.
+
+    Sessions are evicted least-recently-used first when the store exceeds
+    ``max_sessions`` or ``max_memory_bytes``, and any session idle for longer
+    than ``idle_ttl`` seconds is dropped.
+    """
+
+    def __init__(self, max_sessions: int = 5000, idle_ttl: float = 1800, max_memory_bytes: Optional[int] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_memory_bytes = max_memory_bytes
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.ttl_evictions = 0
+        self.capacity_evictions = 0
+
+    def _drop(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+
+    def _evict_expired_locked(self, now: float) -> int:
+        evicted = 0
+        # The OrderedDict is in access order, so expired sessions are at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._last_access[oldest] <= self.idle_ttl:
+                break
+            self._drop(oldest)
+            evicted += 1
+        self.ttl_evictions += evicted
+        return evicted
+
+    def _enforce_capacity_locked(self, keep: Optional[str] = None):
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions
+            or (self.max_memory_bytes is not None and self._total_bytes > self.max_memory_bytes)
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(oldest)
+                continue
+            self._drop(oldest)
+            self.capacity_evictions += 1
+
+    def get(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the state for a live session (refreshing its idle timer), or None."""
+        if not session_id:
+            return None
+        now = time.time()
+        with self._lock:
+            self._evict_expired_locked(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = now
+            return state
+
+    def get_or_create(self, session_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        """Return (session_id, state), starting a new session if the id is unknown or expired."""
+        state = self.get(session_id)
+        if state is not None:
+            return session_id, state
+        session_id = uuid.uuid4().hex
+        state = new_session_state()
+        with self._lock:
+            self._sessions[session_id] = state
+            self._last_access[session_id] = time.time()
+            self._sizes[session_id] = _state_size(state)
+            self._total_bytes += self._sizes[session_id]
+            self._enforce_capacity_locked(keep=session_id)
+        logger.info(f"Created session {session_id} ({len(self._sessions)} active)")
+        return session_id, state
+
+    def measure(self, session_id: str):
+        """Recompute the memory footprint of a session after its state changed."""
+        state = self._sessions.get(session_id)
+        if state is None:
+            return
+        # Walk the object graph outside the store lock; it can take a while for long conversations
+        size = _state_size(state)
+        with self._lock:
+            if session_id not in self._sessions:
+                return
+            self._total_bytes += size - self._sizes.get(session_id, 0)
+            self._sizes[session_id] = size
+            self._enforce_capacity_locked(keep=session_id)
+
+    def reset(self, session_id: str):
+        """Clear a session's conversation state but keep the session itself."""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return
+            state.update(schemes=[], agent=None, selected_scheme=None)
+        self.measure(session_id)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._drop(session_id)
+
+    def evict_expired(self) -> int:
+        """Drop all sessions idle for longer than the TTL."""
+        with self._lock:
+            return self._evict_expired_locked(time.time())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        """Session counts, memory accounting and eviction counters."""
+        with self._lock:
+            count = len(self._sessions)
+            return {
+                'sessions': count,
+                'max_sessions': self.max_sessions,
+                'memory_bytes': self._total_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'avg_session_bytes': self._total_bytes // count if count else 0,
+                'ttl_evictions': self.ttl_evictions,
+                'capacity_evictions': self.capacity_evictions
+            }
@@ -0,0 +1,29 @@
+import os
+import sys
+from typing import Any, Dict
+
+import pandas as pd
+import pytest
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from databse_setup import SCHEME_COLUMNS
+
+@pytest.fixture
+def write_dataset(tmp_path):
+    """Write dataset.csv into tmp_path from {scheme_id: {column: value}} and return its path.
+
+    Columns that are not given get placeholder text naming the scheme.
+    """
+    def write(schemes: Dict[int, Dict[str, Any]]) -> str:
+        rows = []
+        for scheme_id, values in schemes.items():
+            row = {'Unnamed: 0': scheme_id}
+            row.update({column: f"{column} of scheme {scheme_id}" for column in SCHEME_COLUMNS[1:]})
+            row.update(values)
+            rows.append(row)
+        path = str(tmp_path / "dataset.csv")
+        pd.DataFrame(rows, columns=['Unnamed: 0'] + SCHEME_COLUMNS[1:]).to_csv(path, index=False)
+        return path
+    return write
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from databse_setup import build_fts_index, invalidate_rerank_scores, setup_sqlite_db
+from rerank_cache import RerankScoreCache
+from scheme_store import get_scheme_store
+
+def _scheme_names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT scheme_id, scheme_name FROM schemes").fetchall())
+    finally:
+        conn.close()
+
+@pytest.fixture
+def rerank_cache_path(tmp_path, monkeypatch):
+    """A rerank cache holding a score for schemes 1-3, configured through RERANK_CACHE_PATH."""
+    path = str(tmp_path / "rerank_cache.db")
+    monkeypatch.setenv("RERANK_CACHE_PATH", path)
+    cache = RerankScoreCache(path)
+    cache.put_many("profile", [({'metadata': {'scheme_id': scheme_id}}, 50) for scheme_id in (1, 2, 3)])
+    cache.close()
+    return path
+
+def _cached_scheme_ids(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(int(scheme_id) for (scheme_id,) in conn.execute("SELECT scheme_id FROM rerank_scores"))
+    finally:
+        conn.close()
+
+def test_reload_counts_only_changed_rows(tmp_path, write_dataset):
+    db_path = str(tmp_path / "schemes.db")
+    csv_path = write_dataset({1: {}, 2: {}, 3: {}})
+    assert setup_sqlite_db(csv_path, db_path) == {'inserted': 3, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    assert setup_sqlite_db(csv_path, db_path) == {'inserted': 0, 'updated': 0, 'unchanged': 3, 'deleted': 0}
+
+    csv_path = write_dataset({1: {'scheme_name': "Renamed scheme"}, 3: {}, 4: {}})
+    assert setup_sqlite_db(csv_path, db_path) == {'inserted': 1, 'updated': 1, 'unchanged': 1, 'deleted': 1}
+    assert _scheme_names(db_path) == {1: "Renamed scheme", 3: "scheme_name of scheme 3", 4: "scheme_name of scheme 4"}
+
+def test_reload_invalidates_rerank_scores_of_changed_schemes(tmp_path, write_dataset, rerank_cache_path):
+    db_path = str(tmp_path / "schemes.db")
+    setup_sqlite_db(write_dataset({1: {}, 2: {}, 3: {}}), db_path)
+    assert _cached_scheme_ids(rerank_cache_path) == [1, 2, 3]
+
+    setup_sqlite_db(write_dataset({1: {'benefits': "Updated benefits"}, 3: {}}), db_path)
+    assert _cached_scheme_ids(rerank_cache_path) == [3]
+
+def test_staged_reload_leaves_invalidation_to_the_caller(tmp_path, write_dataset, rerank_cache_path):
+    db_path = str(tmp_path / "schemes.db")
+    setup_sqlite_db(write_dataset({1: {}, 2: {}, 3: {}}), db_path)
+
+    changed_ids = []
+    stats = setup_sqlite_db(write_dataset({1: {'benefits': "Updated benefits"}, 3: {}}), db_path, changed_ids=changed_ids)
+    assert stats == {'inserted': 0, 'updated': 1, 'unchanged': 1, 'deleted': 1}
+    assert sorted(changed_ids) == [1, 2]
+    assert _cached_scheme_ids(rerank_cache_path) == [1, 2, 3]
+
+    assert invalidate_rerank_scores(changed_ids) == 2
+    assert _cached_scheme_ids(rerank_cache_path) == [3]
+
+def test_keyword_index_follows_reloads(tmp_path, write_dataset):
+    db_path = str(tmp_path / "schemes.db")
+    setup_sqlite_db(write_dataset({1: {}, 2: {'tags': "fishermen boats"}, 3: {}}), db_path)
+    assert build_fts_index(db_path) == 3
+
+    setup_sqlite_db(write_dataset({1: {'scheme_name': "Zebracorn welfare"}, 3: {}}), db_path)
+    assert build_fts_index(db_path) == 2
+    store = get_scheme_store(db_path)
+    assert [row['scheme_id'] for row in store.search_text("zebracorn")] == [1]
+    assert store.search_text("fishermen") == []
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from databse_setup import build_eligibility_rules, setup_sqlite_db
+from eligibility_rules import evaluate_rules, extract_rules, parse_income_range, prune_ineligible
+
+@pytest.mark.parametrize("text, expected", [
+    ("Below 2 lakhs", (0.0, 200000.0)),
+    ("2-5 lakhs", (200000.0, 500000.0)),
+    ("Above 5 lakhs", (500000.0, math.inf)),
+    ("18,000 rupees per month", (216000.0, 216000.0)),
+    ("50000", (50000.0, 50000.0)),
+    ("", None),
+    ("not disclosed", None),
+])
+def test_parse_income_range(text, expected):
+    assert parse_income_range(text) == expected
+
+@pytest.mark.parametrize("criteria, expected", [
+    ("Annual family income should not exceed Rs. 2.5 lakh.", {'income_max': 250000.0}),
+    ("The applicant must belong to Scheduled Caste only.", {'castes': ['SC']}),
+    ("Only women applicants are eligible.", {'genders': ['female']}),
+    ("The applicant should be between 18 and 40 years of age.", {'age_min': 18, 'age_max': 40}),
+    ("Applicants of all castes are eligible.", {}),
+])
+def test_extract_rules(criteria, expected):
+    assert extract_rules(criteria) == expected
+
+def test_evaluate_rules_reports_clear_mismatches():
+    rules = {'income_max': 250000.0, 'castes': ['SC'], 'age_min': 18, 'age_max': 40}
+    assert evaluate_rules(rules, {'caste': 'OBC'}) == "restricted to SC (profile: OBC)"
+    assert evaluate_rules(rules, {'income': '5-8 lakhs'}) == "income ceiling of 250,000 exceeded"
+    assert evaluate_rules(rules, {'age': '16'}) == "minimum age is 18"
+    assert evaluate_rules({'genders': ['female']}, {'gender': 'Male'}) == "restricted to female applicants"
+
+def test_evaluate_rules_keeps_unknown_or_matching_profiles():
+    rules = {'income_max': 250000.0, 'castes': ['SC'], 'age_max': 40}
+    assert evaluate_rules(rules, {'caste': 'Scheduled Caste', 'income': 'Below 2 lakhs', 'age': '30'}) is None
+    # Missing or unparseable fields never prune
+    assert evaluate_rules(rules, {'caste': '', 'income': 'not sure', 'age': 'thirty'}) is None
+    assert evaluate_rules({}, {'caste': 'OBC'}) is None
+
+def test_prune_ineligible_uses_the_rules_built_for_the_database(tmp_path, monkeypatch, write_dataset):
+    csv_path = write_dataset({
+        1: {'eligibility_criteria': "The applicant must belong to Scheduled Caste only."},
+        2: {'eligibility_criteria': "Annual family income should not exceed Rs. 2.5 lakh."},
+        3: {'eligibility_criteria': "Open to all residents."},
+    })
+    # prune_ineligible reads new_schemes.db from the working directory
+    monkeypatch.chdir(tmp_path)
+    setup_sqlite_db(csv_path, "new_schemes.db")
+    build_eligibility_rules("new_schemes.db")
+
+    schemes = [{'metadata': {'scheme_id': scheme_id, 'scheme_name': f"Scheme {scheme_id}"}} for scheme_id in (1, 2, 3, 4)]
+    kept = prune_ineligible(schemes, {'caste': 'OBC', 'income': '5-8 lakhs'})
+    # Scheme 4 has no rules row, so nothing excludes it
+    assert [scheme['metadata']['scheme_id'] for scheme in kept] == [3, 4]
+    kept = prune_ineligible(schemes, {'caste': 'SC', 'income': 'Below 2 lakhs'})
+    assert [scheme['metadata']['scheme_id'] for scheme in kept] == [1, 2, 3, 4]
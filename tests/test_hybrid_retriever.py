@@ -0,0 +1,29 @@
+import pytest
+
+from hybrid_retriever import reciprocal_rank_fusion
+
+def _result(scheme_id, score=None):
+    result = {'id': str(scheme_id), 'metadata': {'scheme_id': scheme_id}}
+    if score is not None:
+        result['score'] = score
+    return result
+
+def test_fusion_ranks_schemes_found_by_both_lists_first():
+    dense = [_result(1, 0.9), _result(2, 0.8), _result(3, 0.7)]
+    keyword = [_result(3), _result(4)]
+    fused = reciprocal_rank_fusion([dense, keyword], k=60)
+
+    assert [entry['metadata']['scheme_id'] for entry in fused] == [3, 1, 2, 4]
+    assert fused[0]['fusion_score'] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[0]['sources'] == [0, 1]
+    # The dense entry keeps its vector score; keyword-only hits get 0.0
+    assert fused[0]['score'] == 0.7
+    assert fused[-1]['score'] == 0.0 and fused[-1]['sources'] == [1]
+
+def test_fusion_deduplicates_and_truncates():
+    fused = reciprocal_rank_fusion([[_result(1, 0.5), _result(2, 0.4)], [_result(2), _result(1)]], top_k=1)
+    assert len(fused) == 1
+
+def test_fusion_weights_lists():
+    fused = reciprocal_rank_fusion([[_result(1, 0.5)], [_result(2)]], weights=[1.0, 2.0])
+    assert [entry['metadata']['scheme_id'] for entry in fused] == [2, 1]
@@ -0,0 +1,57 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from local_vector_index import EMBEDDINGS_FILE, METADATA_FILE, LocalVectorIndex
+
+STATES = ["Kerala", "Kerala", "Bihar", "All India"]
+
+def _write_store(store_dir, build_id="build-1"):
+    os.makedirs(store_dir, exist_ok=True)
+    # Scheme i is closest to the query [1, 0] for small i
+    angles = np.linspace(0.0, 1.2, len(STATES))
+    embeddings = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+    np.save(os.path.join(store_dir, EMBEDDINGS_FILE), embeddings)
+    items = [{'id': str(i), 'metadata': {'scheme_id': i, 'state': state}} for i, state in enumerate(STATES)]
+    with open(os.path.join(store_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'model': 'test', 'build_id': build_id, 'items': items}, f)
+
+@pytest.fixture
+def index(tmp_path):
+    store_dir = str(tmp_path / "scheme_index")
+    _write_store(store_dir)
+    return LocalVectorIndex(store_dir)
+
+def _ids(results):
+    return [match['id'] for match in results['matches']]
+
+def test_query_ranks_by_similarity(index):
+    results = index.query([1.0, 0.0], top_k=3)
+    assert _ids(results) == ['0', '1', '2']
+    assert results['matches'][0]['metadata'] == {'scheme_id': 0, 'state': "Kerala"}
+
+@pytest.mark.parametrize("filter, expected", [
+    ({'state': "Bihar"}, ['2']),
+    ({'state': {'$eq': "Kerala"}}, ['0', '1']),
+    ({'state': {'$in': ["Bihar", "All India"]}}, ['2', '3']),
+    ({'state': {'$nin': ["Kerala"]}}, ['2', '3']),
+])
+def test_query_filters_before_ranking(index, filter, expected):
+    # top_k is clipped to the number of items the filter allows
+    assert _ids(index.query([1.0, 0.0], top_k=10, filter=filter)) == expected
+
+def test_query_rejects_unknown_operators_and_dimensions(index):
+    with pytest.raises(ValueError):
+        index.query([1.0, 0.0], filter={'state': {'$gt': "A"}})
+    with pytest.raises(ValueError):
+        index.query([1.0, 0.0, 0.0])
+
+def test_store_replaced_detects_a_new_build(tmp_path, index):
+    assert index.build_id == "build-1"
+    assert not index.store_replaced()
+    staging_dir = str(tmp_path / "scheme_index.staging")
+    _write_store(staging_dir, build_id="build-2")
+    os.replace(os.path.join(staging_dir, METADATA_FILE), os.path.join(index.store_dir, METADATA_FILE))
+    assert index.store_replaced()
@@ -0,0 +1,23 @@
+import pytest
+
+from profile_canonical import income_bracket, recommendation_key
+
+@pytest.mark.parametrize("income, expected", [
+    ("Below 1 lakh", "under 1L"),
+    ("2 lakh", "1L-2.5L"),
+    ("2-5 lakhs", "2.5L-5L"),
+    # Open-ended incomes lie strictly above the stated amount
+    ("Above 5 lakhs", "5L-8L"),
+    ("Above 8 lakh", "8L+"),
+    ("10 lakh", "8L+"),
+    (" N/A ", "n/a"),
+])
+def test_income_bracket(income, expected):
+    assert income_bracket(income) == expected
+
+def test_recommendation_key_buckets_income():
+    profile = {'name': "Asha", 'state': "Kerala", 'gender': "Female", 'caste': "OBC", 'occupation': "Farmer"}
+    assert (recommendation_key(dict(profile, income="1.5 lakh"))
+            == recommendation_key(dict(profile, income="2 lakhs")))
+    assert (recommendation_key(dict(profile, income="2 lakhs"))
+            != recommendation_key(dict(profile, income="3 lakhs")))
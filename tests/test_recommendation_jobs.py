@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from recommendation_jobs import JobManager, JobQueueFull
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_submissions_beyond_workers_and_queue_are_rejected():
+    manager = JobManager(workers=1, queue_size=1, result_ttl=600)
+    release = threading.Event()
+
+    def blocked(job):
+        release.wait(5)
+        return [{'id': job.job_id}]
+
+    running = manager.submit("session", blocked)
+    queued = manager.submit("session", blocked)
+    with pytest.raises(JobQueueFull):
+        manager.submit("session", blocked)
+    assert manager.stats()['active'] == 2
+
+    release.set()
+    assert _wait_until(lambda: running.finished and queued.finished)
+    assert _wait_until(lambda: manager.stats()['active'] == 0)
+    assert running.snapshot()['status'] == "done" and not running.snapshot()['partial']
+    # Capacity is freed once jobs finish
+    assert manager.submit("session", lambda job: []) is not None
+
+def test_failed_jobs_release_their_slot():
+    manager = JobManager(workers=1, queue_size=0)
+
+    def failing(job):
+        raise RuntimeError("search failed")
+
+    job = manager.submit("session", failing)
+    assert _wait_until(lambda: job.finished)
+    assert job.snapshot()['error'] == "search failed"
+    assert _wait_until(lambda: manager.stats()['active'] == 0)
+
+def test_jobs_are_visible_only_to_their_session():
+    manager = JobManager(workers=1, queue_size=0)
+    job = manager.submit("owner", lambda job: [])
+    assert manager.get(job.job_id, session_id="owner") is job
+    assert manager.get(job.job_id, session_id="someone else") is None
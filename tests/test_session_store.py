@@ -0,0 +1,37 @@
+import session_store as session_store_module
+from session_store import SessionStore
+
+def test_capacity_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2, idle_ttl=3600)
+    first, _ = store.get_or_create(None)
+    second, _ = store.get_or_create(None)
+    # Touch the first session so the second becomes the oldest
+    assert store.get(first) is not None
+    third, _ = store.get_or_create(None)
+
+    assert len(store) == 2
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.stats()['capacity_evictions'] == 1
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store_module.time, 'time', lambda: now[0])
+    store = SessionStore(max_sessions=10, idle_ttl=60)
+    session_id, state = store.get_or_create(None)
+    state['schemes'] = ["kept"]
+
+    now[0] += 30
+    assert store.get_or_create(session_id) == (session_id, state)
+    now[0] += 61
+    new_id, new_state = store.get_or_create(session_id)
+    assert new_id != session_id and new_state['schemes'] == []
+    assert store.stats()['ttl_evictions'] == 1
+
+def test_memory_bound_keeps_the_current_session():
+    store = SessionStore(max_sessions=10, idle_ttl=3600, max_memory_bytes=1)
+    session_id, _ = store.get_or_create(None)
+    # A lone session over the budget is kept; a newer one pushes it out
+    assert len(store) == 1
+    newer_id, _ = store.get_or_create(None)
+    assert len(store) == 1 and store.get(newer_id) is not None and store.get(session_id) is None
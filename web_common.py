@@ -0,0 +1,111 @@
+"""State and helpers shared by the Flask (app.py) and ASGI (asgi_app.py) servers.
+
+Importing this module builds no web framework state: each server creates its own
+app and job manager and registers the jobs gauge with register_job_gauge().
+"""
+import os
+import json
+import logging
+from typing import Dict, List
+from dotenv import load_dotenv
+from scheme_search_agent import warmup, query_cache, rerank_cache, recommendation_cache
+from scheme_display_agent import fetch_scheme_details
+from scheme_store import get_scheme_store
+from session_store import SessionStore
+from recommendation_jobs import JobManager
+from metrics import register_gauge
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+def check_api_keys():
+    """Fail fast when the keys the configured backends need are missing."""
+    vector_backend = os.getenv("VECTOR_BACKEND", "pinecone").strip().lower()
+    if not os.getenv("GROQ_API_KEY") or (vector_backend == "pinecone" and not os.getenv("PINECONE_API_KEY")):
+        logger.error("Missing PINECONE_API_KEY or GROQ_API_KEY in .env")
+        raise ValueError("Missing API keys in .env file")
+
+def start_warmup():
+    """Load the search models and clients in the background so the first /submit is fast."""
+    if os.getenv("WARMUP_ON_STARTUP", "1") != "0":
+        logger.info("Starting background warmup of search resources")
+        warmup(background=True)
+
+def validate_user_profile(profile: Dict) -> bool:
+    required_fields = ['name', 'state', 'gender', 'caste', 'occupation', 'category', 'income']
+    missing_fields = [field for field in required_fields if not profile.get(field)]
+    if missing_fields:
+        logger.error(f"Missing required fields in user profile: {missing_fields}")
+        return False
+    return True
+
+def validate_schemes(schemes: List[Dict]) -> List[Dict]:
+    valid_schemes = [
+        scheme for scheme in schemes
+        if scheme.get('metadata', {}).get('scheme_name')
+    ]
+    if len(valid_schemes) < len(schemes):
+        logger.warning(f"Filtered out {len(schemes) - len(valid_schemes)} schemes with missing scheme_name")
+    return valid_schemes
+
+# Per-session agent state, bounded by count, memory and idle time
+max_session_mb = os.getenv("SESSION_MAX_MEMORY_MB")
+session_store = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX_COUNT", "5000")),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "1800")),
+    max_memory_bytes=int(float(max_session_mb) * 1024 * 1024) if max_session_mb else None
+)
+
+def _cache_hit_ratios() -> Dict[str, float]:
+    # Only report caches that already exist; a scrape must not trigger their lazy initialization
+    ratios = {
+        'scheme_rows': get_scheme_store().stats()['hit_ratio'],
+        'recommendations': recommendation_cache.stats()['hit_ratio']
+    }
+    if query_cache.loaded:
+        ratios['query_embeddings'] = query_cache.stats()['hit_ratio']
+    if rerank_cache.loaded:
+        lookups = rerank_cache.hits + rerank_cache.misses
+        ratios['rerank_scores'] = rerank_cache.hits / lookups if lookups else 0.0
+    return ratios
+
+register_gauge("scheme_saathi_cache_hit_ratio", "Hit ratio of each cache since startup", _cache_hit_ratios, label="cache")
+register_gauge("scheme_saathi_sessions", "Active sessions and their estimated memory",
+               lambda: {'count': len(session_store), 'memory_bytes': session_store.stats()['memory_bytes']},
+               label="measure")
+
+def register_job_gauge(job_manager: JobManager):
+    """Expose the running server's recommendation jobs by state."""
+    register_gauge("scheme_saathi_jobs", "Recommendation jobs by state", job_manager.stats, label="state")
+
+def resolve_chat_action(session_id: str, agent_state: Dict, user_input: str, response: str):
+    """Work out the UI action for a chat message. Returns (response, action, details)."""
+    action = 'none'
+    details = None
+
+    if user_input.lower() == 'show schemes':
+        action = 'show_schemes'
+    elif user_input.lower().startswith('show scheme'):
+        try:
+            scheme_num = int(user_input.split()[-1]) - 1
+            if 0 <= scheme_num < len(agent_state['schemes']):
+                scheme_id = agent_state['schemes'][scheme_num]['metadata']['scheme_id']
+                details = fetch_scheme_details(scheme_id)
+                if details:
+                    action = 'show_details'
+                else:
+                    response = f"Sorry, no details found for scheme number {scheme_num + 1}."
+        except (ValueError, IndexError):
+            response = "Please specify a valid scheme number (e.g., 'show scheme 3')."
+    elif user_input.lower() in ['quit', 'exit']:
+        action = 'exit'
+        session_store.reset(session_id)
+    else:
+        session_store.measure(session_id)
+    return response, action, details
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"